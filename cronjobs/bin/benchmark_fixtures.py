@@ -0,0 +1,41 @@
+"""
+This module contains the fake GitHub data shared by the benchmarks.
+"""
+
+
+def fake_repository(name: str = "repository", branch_protection_rules: int = 1) -> dict:
+    """The raw GitHub data of a repository meeting every standard.
+
+    Arguments:
+        name {str} -- The name of the repository.
+        branch_protection_rules {int} -- The number of branch protection rules, the last of
+        which protects main.
+
+    Returns:
+        dict: The repository, as returned by the GitHub API
+    """
+    return {
+        "branchProtectionRules": {
+            "edges": [
+                {
+                    "node": {
+                        "pattern": (
+                            "main" if index == branch_protection_rules - 1 else f"branch-{index}"),
+                        "requiresApprovingReviews": True,
+                        "isAdminEnforced": True,
+                        "requiredApprovingReviewCount": 1,
+                    }
+                }
+                for index in range(branch_protection_rules)
+            ]
+        },
+        "defaultBranchRef": {"name": "main"},
+        "description": "description",
+        "hasIssuesEnabled": True,
+        "isPrivate": False,
+        "licenseInfo": {"name": "MIT"},
+        "name": name,
+        "pushedAt": "2024-01-01T00:00:00Z",
+        "url": f"https://github.com/ministryofjustice/{name}",
+        "repositoryTopics": {"edges": [{"node": {"topic": {"name": "topic"}}}]},
+    }
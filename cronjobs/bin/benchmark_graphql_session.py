@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import threading
+from statistics import median
+from time import perf_counter
+
+from aiohttp import web
+from gql import Client, gql
+from gql.transport.aiohttp import AIOHTTPTransport
+
+from cronjobs.services.github_service import (GRAPHQL_DOCUMENTS,
+                                              REPOSITORIES_PER_TYPE_QUERY)
+from cronjobs.services.graphql_session import PersistentGraphQLSession
+
+PAGE = {
+    "data": {
+        "rateLimit": {"cost": 1, "limit": 5000, "remaining": 4999, "resetAt": "2030-01-01T00:00:00Z"},
+        "search": {
+            "repositoryCount": 1,
+            "repos": [],
+            "pageInfo": {"hasNextPage": False, "endCursor": None},
+        },
+    }
+}
+
+VARIABLE_VALUES = {
+    "the_query": "org:benchmark, archived:false, is:public",
+    "page_size": 80,
+    "after_cursor": None,
+}
+
+
+def __add_arguments():
+    parser = argparse.ArgumentParser(
+        description="Compare the per page overhead of parsing the query and connecting for every page with a cached document and one persistent session, against a local stub of the GraphQL API"
+    )
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=200,
+        help="The number of pages to request in each mode",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="The local port to serve the stub GraphQL API on",
+    )
+    return parser.parse_args()
+
+
+def __start_stub_server(port: int) -> None:
+    async def graphql(_request):
+        return web.json_response(PAGE)
+
+    app = web.Application()
+    app.router.add_post("/graphql", graphql)
+    started = threading.Event()
+
+    def serve():
+        runner = web.AppRunner(app, access_log=None)
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    started.wait()
+
+
+def __new_client(port: int) -> Client:
+    return Client(
+        transport=AIOHTTPTransport(url=f"http://127.0.0.1:{port}/graphql"),
+        execute_timeout=120,
+    )
+
+
+def __time_pages(pages: int, request_page) -> list[float]:
+    timings = []
+    for _ in range(pages):
+        started = perf_counter()
+        request_page()
+        timings.append(perf_counter() - started)
+    return timings
+
+
+def main():
+    args = __add_arguments()
+    __start_stub_server(args.port)
+
+    client = __new_client(args.port)
+    per_page = __time_pages(
+        args.pages,
+        lambda: client.execute(
+            gql(REPOSITORIES_PER_TYPE_QUERY), variable_values=VARIABLE_VALUES
+        ),
+    )
+
+    graphql_session = PersistentGraphQLSession(__new_client(args.port))
+    try:
+        persistent = __time_pages(
+            args.pages,
+            lambda: graphql_session.execute(
+                GRAPHQL_DOCUMENTS["repositories_per_type"], VARIABLE_VALUES
+            ),
+        )
+    finally:
+        graphql_session.close()
+
+    saved = median(per_page) - median(persistent)
+    print(f"Parse and connect per page:       median {median(per_page) * 1000:.2f}ms per page")
+    print(f"Cached document, one session:     median {median(persistent) * 1000:.2f}ms per page")
+    print(f"Overhead saved:                   {saved * 1000:.2f}ms per page, {saved * args.pages:.2f}s over {args.pages} pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import json
+from statistics import median
+from timeit import repeat
+
+from cronjobs.bin.benchmark_fixtures import fake_repository
+from cronjobs.services.report_wire_format import (JSON_CONTENT_TYPE,
+                                                  WIRE_FORMATS, compress_body,
+                                                  decode_reports,
+                                                  encode_reports)
+from cronjobs.services.standards_service import RepositoryReport
+
+
+def __add_arguments():
+    parser = argparse.ArgumentParser(
+        description="Compare the size and decoding cost of a chunk of reports uploaded as a list of indented json strings and in the compact wire formats, with and without gzip"
+    )
+    parser.add_argument(
+        "--reports",
+        type=int,
+        default=10,
+        help="The number of reports in the chunk",
+    )
+    return parser.parse_args()
+
+
+def __microseconds_to_decode(decode) -> float:
+    return median(repeat(decode, number=1000, repeat=5)) / 1000 * 1_000_000
+
+
+def main():
+    args = __add_arguments()
+    reports = [
+        RepositoryReport(fake_repository(f"repository-{index}")) for index in range(args.reports)]
+
+    # The body the client sent before the wire format: a json list of indented json strings
+    legacy = json.dumps([report.output for report in reports]).encode()
+    print(f"Indented json strings: {len(legacy)} bytes, "
+          f"{__microseconds_to_decode(lambda: decode_reports(legacy, JSON_CONTENT_TYPE)):.1f}us to decode")
+
+    for content_type in WIRE_FORMATS.values():
+        body = encode_reports([report.data for report in reports], content_type)
+        # Bound as defaults, so the decode timed is the one of this format
+        decode_microseconds = __microseconds_to_decode(
+            lambda body=body, content_type=content_type: decode_reports(body, content_type))
+        print(f"{content_type}: {len(body)} bytes, {decode_microseconds:.1f}us to decode")
+        print(f"{content_type} with gzip: {len(compress_body(body))} bytes")
+
+
+if __name__ == "__main__":
+    main()
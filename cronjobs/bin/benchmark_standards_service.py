@@ -0,0 +1,51 @@
+import argparse
+from statistics import median
+from timeit import repeat
+
+from cronjobs.bin.benchmark_fixtures import fake_repository
+from cronjobs.services.standards_service import (COMPLIANCE_RULES,
+                                                 RepositoryReport,
+                                                 evaluate_compliance_rules)
+
+
+def __add_arguments():
+    parser = argparse.ArgumentParser(
+        description="Measure the cost of checking one repository against the standards"
+    )
+    parser.add_argument(
+        "--repositories",
+        type=int,
+        default=10000,
+        help="The number of repositories to evaluate per measurement",
+    )
+    parser.add_argument(
+        "--branch-protection-rules",
+        type=int,
+        default=10,
+        help="The number of branch protection rules each repository has",
+    )
+    return parser.parse_args()
+
+
+def __microseconds_per_repository(statement, repositories: int) -> float:
+    timings = repeat(statement, number=repositories, repeat=5)
+    return median(timings) / repositories * 1_000_000
+
+
+def main():
+    args = __add_arguments()
+    repository = fake_repository(branch_protection_rules=args.branch_protection_rules)
+
+    rules = __microseconds_per_repository(
+        lambda: evaluate_compliance_rules(repository), args.repositories)
+    report = __microseconds_per_repository(
+        lambda: RepositoryReport(repository).output, args.repositories)
+
+    print(f"{len(COMPLIANCE_RULES)} rules, "
+          f"{args.branch_protection_rules} branch protection rules per repository")
+    print(f"Evaluating the rules: {rules:.2f}us per repository")
+    print(f"Building the report:  {report:.2f}us per repository")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
 import argparse
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
 
+from cronjobs.config.logging_config import logging
+from cronjobs.services.crawl_state import CrawlState, PaginationCheckpoint
 from cronjobs.services.github_service import GithubService
 from cronjobs.services.operations_engineering_reports import \
     OperationsEngineeringReportsService as reports_service
-from cronjobs.services.standards_service import RepositoryReport
+from cronjobs.services.operations_engineering_reports import UploadOptions
+from cronjobs.services.report_pipeline import ReportPipeline
+from cronjobs.services.report_wire_format import WIRE_FORMATS
+from cronjobs.services.standards_service import (RepositoryReport,
+                                                 evaluate_repositories)
 
 
 def __add_arguments():
@@ -43,9 +51,244 @@ def __add_arguments():
         help="The API key to use for the operations-engineering-reports endpoint",
     )
 
+    parser.add_argument(
+        "--concurrent",
+        action="store_true",
+        help="Fetch the repository types concurrently over a single asynchronous GraphQL session",
+    )
+
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=GithubService.DEFAULT_MAX_CONCURRENCY,
+        help="The maximum number of GraphQL pages in flight when --concurrent is used",
+    )
+
+    parser.add_argument(
+        "--all-organisations",
+        action="store_true",
+        help="Crawl every organisation in the enterprise concurrently instead of only --org",
+    )
+
+    parser.add_argument(
+        "--enumeration",
+        choices=["search", "organisation", "two-phase"],
+        default="search",
+        help=(
+            "Enumerate repositories with a search per repository type, with a single pass over "
+            "organization.repositories, or by listing repository ids and then fetching their "
+            "details in batches"
+        ),
+    )
+
+    parser.add_argument(
+        "--compare-enumerations",
+        action="store_true",
+        help=(
+            "Crawl --org with both the search and the organisation enumeration and log the "
+            "GraphQL requests and repositories of each, without uploading any reports"
+        ),
+    )
+
+    parser.add_argument(
+        "--repos",
+        type=lambda names: [name.strip() for name in names.split(",") if name.strip()],
+        help=(
+            "A comma separated list of repository names in --org. Only these repositories are "
+            "fetched, evaluated and uploaded"
+        ),
+    )
+
+    parser.add_argument(
+        "--wire-format",
+        choices=list(WIRE_FORMATS),
+        default="json",
+        help="The format the reports are uploaded in",
+    )
+
+    parser.add_argument(
+        "--no-gzip",
+        action="store_true",
+        help="Upload the reports without compressing them",
+    )
+
+    parser.add_argument(
+        "--chunk-size",
+        type=lambda value: None if value == "auto" else int(value),
+        default=UploadOptions.DEFAULT_CHUNK_SIZE,
+        help=(
+            "The number of reports uploaded in each request, or auto to fit as many as "
+            "--max-chunk-bytes allows"
+        ),
+    )
+
+    parser.add_argument(
+        "--max-chunk-bytes",
+        type=int,
+        default=UploadOptions.DEFAULT_MAX_CHUNK_BYTES,
+        help="The largest an upload may be before it is compressed, when --chunk-size is auto",
+    )
+
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=1,
+        help=(
+            "The number of chunks of reports uploaded at once. Above 1, failed chunks are retried "
+            "on their own and the run reports every range of reports that was not sent"
+        ),
+    )
+
+    parser.add_argument(
+        "--no-wait-for-jobs",
+        action="store_true",
+        help=(
+            "Do not wait for the API to finish storing the reports it accepted for background "
+            "storage"
+        ),
+    )
+
+    parser.add_argument(
+        "--differential",
+        action="store_true",
+        help=(
+            "Only upload the reports that differ from the ones the API holds, and delete the "
+            "reports of repositories that are gone"
+        ),
+    )
+
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help=(
+            "Upload the reports to a new generation and publish it once every report is stored, "
+            "so the API switches to the new reports at once"
+        ),
+    )
+
+    parser.add_argument(
+        "--state-file",
+        type=str,
+        help=(
+            "A JSON file holding the repositories from the last successful run. When given, only "
+            "repositories pushed since that run are fetched and merged into it"
+        ),
+    )
+
+    parser.add_argument(
+        "--full-crawl-every",
+        type=float,
+        default=7,
+        help=(
+            "The number of days after which a --state-file run crawls every repository again, to "
+            "pick up changes made without a push and drop archived and deleted repositories"
+        ),
+    )
+
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help=(
+            "Only fetch repositories pushed after this ISO 8601 time, overriding the time held in "
+            "--state-file"
+        ),
+    )
+
+    parser.add_argument(
+        "--checkpoint-file",
+        type=str,
+        help=(
+            "A JSON file the crawl records its position to after each page. A restarted run "
+            "resumes from it"
+        ),
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Evaluate and upload the repositories of each page as it is fetched, instead of after "
+            "the whole crawl"
+        ),
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help=(
+            "Like --stream, but fetch, evaluate and upload run concurrently, connected by bounded "
+            "queues"
+        ),
+    )
+
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=4,
+        help="The number of pages each --pipeline queue holds before the stage feeding it waits",
+    )
+
     return parser.parse_args()
 
 
+# The options each option cannot be combined with, as named by __given_options
+INCOMPATIBLE_OPTIONS = {
+    "--stream": [
+        "--concurrent", "--checkpoint-file", "--enumeration organisation",
+        "--enumeration two-phase"],
+    "--pipeline": [
+        "--concurrent", "--checkpoint-file", "--enumeration organisation",
+        "--enumeration two-phase"],
+    "--all-organisations": [
+        "--stream", "--pipeline", "--checkpoint-file", "--state-file", "--enumeration organisation",
+        "--enumeration two-phase", "--differential", "--snapshot"],
+    # --repos fetches only the named repositories, so supports no other crawl option
+    "--repos": [
+        "--stream", "--pipeline", "--all-organisations", "--concurrent", "--checkpoint-file",
+        "--state-file", "--since", "--enumeration organisation", "--enumeration two-phase"],
+    # --differential and --snapshot need the reports of every repository
+    "--differential": ["--stream", "--pipeline", "--repos", "--since without --state-file"],
+    "--snapshot": [
+        "--differential", "--stream", "--pipeline", "--repos", "--since without --state-file"],
+    # --compare-enumerations crawls with every enumeration and uploads nothing
+    "--compare-enumerations": [
+        "--stream", "--pipeline", "--all-organisations", "--repos", "--concurrent",
+        "--checkpoint-file", "--state-file", "--differential", "--snapshot"],
+    "--enumeration two-phase": ["--concurrent", "--checkpoint-file"],
+}
+
+
+def __given_options(args):
+    given = {
+        "--stream": args.stream,
+        "--pipeline": args.pipeline,
+        "--concurrent": args.concurrent,
+        "--all-organisations": args.all_organisations,
+        "--repos": args.repos is not None,
+        "--checkpoint-file": args.checkpoint_file is not None,
+        "--state-file": args.state_file is not None,
+        "--since": args.since is not None,
+        "--since without --state-file": args.since is not None and args.state_file is None,
+        "--differential": args.differential,
+        "--snapshot": args.snapshot,
+        "--compare-enumerations": args.compare_enumerations,
+        "--enumeration organisation": args.enumeration == "organisation",
+        "--enumeration two-phase": args.enumeration == "two-phase",
+    }
+    return {option for option, is_given in given.items() if is_given}
+
+
+def __validate_options(args):
+    if args.repos is not None and not args.repos:
+        raise ValueError("--repos requires at least one repository name")
+
+    given = __given_options(args)
+    for option, incompatible_options in INCOMPATIBLE_OPTIONS.items():
+        conflicts = [other for other in incompatible_options if other in given]
+        if option in given and conflicts:
+            raise ValueError(f"{option} does not support {', '.join(conflicts)}")
+
+
 def __parse_args(args):
     if args.url[-1] == "/":
         args.url = args.url[:-1]
@@ -53,17 +296,199 @@ def __parse_args(args):
     if args.endpoint[0] == "/":
         args.endpoint = args.endpoint[1:]
 
+    if args.since is not None and args.since.tzinfo is None:
+        args.since = args.since.replace(tzinfo=timezone.utc)
+
+    __validate_options(args)
     return args
 
 
+def __reports_service_client(args):
+    return reports_service(args.url, args.endpoint, args.api_key, options=UploadOptions(
+        wire_format=args.wire_format, compress=not args.no_gzip, chunk_size=args.chunk_size,
+        max_chunk_bytes=args.max_chunk_bytes, max_in_flight=args.max_in_flight,
+        wait_for_jobs=not args.no_wait_for_jobs))
+
+
+def __warn_of_shared_repository_names(repos_per_organisation):
+    organisations_per_name = {}
+    for organisation, organisation_repos in repos_per_organisation.items():
+        for repo in organisation_repos:
+            organisations_per_name.setdefault(repo["name"], []).append(organisation)
+    for name, organisations in organisations_per_name.items():
+        if len(organisations) > 1:
+            logging.warning(
+                f"{name} is in {', '.join(organisations)}, reports are stored by name "
+                f"so only the report from {organisations[-1]} is kept")
+
+
+def __reports_per_organisation(repo_reports, repos_per_organisation):
+    start = 0
+    for organisation, organisation_repos in repos_per_organisation.items():
+        yield organisation, repo_reports[start:start + len(organisation_repos)]
+        start += len(organisation_repos)
+
+
+def __merged_into_crawl_state(pages, crawl_state):
+    for repos in pages:
+        if crawl_state is not None:
+            crawl_state.merge(repos)
+        yield repos
+
+
+def __evaluate(repos):
+    compliance = evaluate_repositories(repos)
+    logging.info(
+        f"{compliance.compliant.count(True)} of {len(repos)} repositories are compliant")
+    for rule, failures in compliance.failure_counts.items():
+        logging.info(f"{failures} repositories fail {rule}")
+    return compliance.report_data()
+
+
+def __compare_enumerations(args, pushed_after):
+    enumerations = {
+        "search": GithubService.fetch_all_repositories_in_org,
+        "organisation": GithubService.fetch_all_repositories_in_org_single_pass,
+    }
+    request_counts = {}
+    for enumeration, fetch in enumerations.items():
+        # A service per enumeration, so each counts only its own requests
+        github_service = GithubService(args.oauth_token, args.org)
+        repos = fetch(github_service, pushed_after)
+        request_counts[enumeration] = github_service.graphql_request_count
+        unique_names = len({repo["name"] for repo in repos})
+        logging.info(
+            f"{enumeration:>12} enumeration: {request_counts[enumeration]} GraphQL requests, "
+            f"{len(repos)} repositories, {unique_names} unique")
+    logging.info(
+        f"GraphQL requests per enumeration: search {request_counts['search']}, "
+        f"organisation {request_counts['organisation']}")
+
+
+def __stream_reports(args, crawl_state, pushed_after):
+    if crawl_state is not None and pushed_after is None:
+        crawl_state.replace([])
+
+    github_service = GithubService(args.oauth_token, args.org)
+    pages = __merged_into_crawl_state(
+        github_service.iter_repositories_in_org(pushed_after), crawl_state)
+    with closing(__reports_service_client(args)) as reports_service_client:
+        if args.pipeline:
+            ReportPipeline(
+                pages,
+                lambda repo: RepositoryReport(repo).data,
+                reports_service_client.override_repository_standards_reports,
+                args.queue_size,
+            ).run()
+        else:
+            for repos in pages:
+                reports_service_client.override_repository_standards_reports(
+                    evaluate_repositories(repos).report_data())
+
+    logging.info(
+        f"Streamed repositories with {github_service.graphql_request_count} GraphQL requests "
+        f"using {args.enumeration} enumeration")
+
+
+def __report_on_all_organisations(args, pushed_after):
+    github_service = GithubService(args.oauth_token, args.org)
+    repos_per_organisation = github_service.fetch_all_repositories_in_enterprise(
+        args.max_concurrency, pushed_after)
+    for organisation, organisation_repos in repos_per_organisation.items():
+        logging.info(f"Fetched {len(organisation_repos)} repositories in {organisation}")
+    __warn_of_shared_repository_names(repos_per_organisation)
+    repos = [
+        repo
+        for organisation_repos in repos_per_organisation.values()
+        for repo in organisation_repos
+    ]
+    logging.info(
+        f"Fetched {len(repos)} repositories with "
+        f"{github_service.graphql_request_count} GraphQL requests")
+
+    repo_reports = __evaluate(repos)
+    with closing(__reports_service_client(args)) as reports_service_client:
+        # Each organisation is uploaded in turn, so a report stored under a name shared by two
+        # organisations is always the one from the last
+        for organisation, organisation_reports in __reports_per_organisation(
+                repo_reports, repos_per_organisation):
+            logging.info(f"Uploading {len(organisation_reports)} reports of {organisation}")
+            reports_service_client.override_repository_standards_reports(organisation_reports)
+
+
+def __fetch_organisation_repositories(args, github_service, pushed_after, checkpoint):
+    if args.repos:
+        return github_service.fetch_named_repositories(args.repos)
+    if args.enumeration == "organisation":
+        return github_service.fetch_all_repositories_in_org_single_pass(pushed_after, checkpoint)
+    if args.enumeration == "two-phase":
+        return github_service.fetch_all_repositories_in_org_two_phase(pushed_after)
+    if args.concurrent:
+        return github_service.fetch_all_repositories_in_org_concurrently(
+            args.max_concurrency, pushed_after, checkpoint)
+    return github_service.fetch_all_repositories_in_org(pushed_after, checkpoint)
+
+
+def __upload_reports(args, repo_reports, fetched_every_repository):
+    with closing(__reports_service_client(args)) as reports_service_client:
+        if args.differential:
+            reports_service_client.synchronise_repository_standards_reports(
+                repo_reports, delete_missing=fetched_every_repository)
+        # Publishing a generation without every repository would prune the reports of the rest,
+        # so an incomplete snapshot is uploaded over the published reports instead
+        elif args.snapshot and fetched_every_repository:
+            reports_service_client.publish_repository_standards_reports(repo_reports)
+        else:
+            reports_service_client.override_repository_standards_reports(repo_reports)
+
+
+def __report_on_organisation(args, crawl_state, pushed_after):
+    checkpoint = PaginationCheckpoint(
+        args.checkpoint_file, args.org, pushed_after) if args.checkpoint_file else None
+
+    github_service = GithubService(args.oauth_token, args.org)
+    repos = __fetch_organisation_repositories(args, github_service, pushed_after, checkpoint)
+    logging.info(
+        f"Fetched {len(repos)} repositories with {github_service.graphql_request_count} "
+        f"GraphQL requests using {args.enumeration} enumeration")
+
+    if crawl_state is not None:
+        repos = crawl_state.merge(repos) if pushed_after else crawl_state.replace(repos)
+    repo_reports = __evaluate(repos)
+
+    # A search stream cut short at the search result limit leaves repositories out of the run,
+    # whose stored reports must not be treated as gone
+    fetched_every_repository = not github_service.truncated_streams
+    if not fetched_every_repository:
+        logging.warning(
+            f"Searches of {', '.join(sorted(github_service.truncated_streams))} were cut short, "
+            "so no stored reports are deleted")
+
+    __upload_reports(args, repo_reports, fetched_every_repository)
+    if checkpoint is not None:
+        checkpoint.clear()
+
+
 def main():
     args = __parse_args(__add_arguments())
-    repos = GithubService(
-        args.oauth_token, args.org).fetch_all_repositories_in_org()
-    repo_reports = [RepositoryReport(repo).output for repo in repos]
+    run_started_at = datetime.now(timezone.utc)
+    crawl_state = CrawlState(
+        args.state_file, timedelta(days=args.full_crawl_every)) if args.state_file else None
+    pushed_after = args.since
+    if pushed_after is None and crawl_state is not None and not crawl_state.full_crawl_due():
+        pushed_after = crawl_state.last_successful_run
+
+    if args.compare_enumerations:
+        __compare_enumerations(args, pushed_after)
+    elif args.stream or args.pipeline:
+        __stream_reports(args, crawl_state, pushed_after)
+    elif args.all_organisations:
+        __report_on_all_organisations(args, pushed_after)
+    else:
+        __report_on_organisation(args, crawl_state, pushed_after)
 
-    reports_service(args.url, args.endpoint, args.api_key). \
-        override_repository_standards_reports(repo_reports)
+    if crawl_state is not None:
+        crawl_state.save(run_started_at)
 
 
 if __name__ == "__main__":
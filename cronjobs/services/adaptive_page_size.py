@@ -0,0 +1,55 @@
+"""
+This module contains the page size controller used by each stream of the repository crawl.
+"""
+from cronjobs.config.logging_config import logging
+
+
+class AdaptivePageSize:
+    """Adapt the page size of a paginated GraphQL stream to what the API will sustain. The page
+    size grows by a fixed step after every fast response and halves after a timeout or server
+    error, so a stream runs at the largest page size that does not fail.
+
+    Arguments:
+        initial {int} -- The page size to start with.
+        minimum {int} -- The smallest page size to shrink to before giving up.
+        maximum {int} -- The largest page size to grow to.
+        fast_response_seconds {float} -- Responses quicker than this grow the page size.
+        growth_step {int} -- How much a fast response grows the page size by.
+
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int = 10,
+        maximum: int = 100,
+        fast_response_seconds: float = 10.0,
+        growth_step: int = 10,
+    ) -> None:
+        if not minimum <= initial <= maximum:
+            raise ValueError(
+                f"Initial page size {initial} must be between {minimum} and {maximum}"
+            )
+        self.page_size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.fast_response_seconds = fast_response_seconds
+        self.growth_step = growth_step
+
+    def record_response(self, elapsed_seconds: float) -> None:
+        """Grow the page size if the response was fast."""
+        if elapsed_seconds < self.fast_response_seconds and self.page_size < self.maximum:
+            self.page_size = min(self.page_size + self.growth_step, self.maximum)
+            logging.debug(f"Growing page size to {self.page_size}")
+
+    def shrink(self) -> bool:
+        """Halve the page size after a failed request.
+
+        Returns:
+            bool: False if the page size was already at the minimum, so the request should not be retried
+        """
+        if self.page_size <= self.minimum:
+            return False
+        self.page_size = max(self.page_size // 2, self.minimum)
+        logging.warning(f"Shrinking page size to {self.page_size}")
+        return True
@@ -0,0 +1,232 @@
+"""
+This module contains the classes used to persist state between runs of the repository crawl, so
+that a run can build on the work done by the previous one instead of starting from scratch.
+"""
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from cronjobs.config.logging_config import logging
+
+
+def _write_json_atomically(path: str, data: Any) -> None:
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+    os.replace(temporary_path, path)
+
+
+class CrawlState:
+    """The result of the last successful repository crawl. Used by incremental runs to only fetch
+    repositories pushed since that crawl and merge them into the repositories it stored.
+
+    An incremental run only sees repositories whose pushedAt moved, so changes made without a
+    push, to the branch protection, description, license or issue settings, are not fetched, and
+    repositories that are archived or deleted remain in the stored set. A full crawl that
+    replaces the stored set is therefore due once the last one is older than full_crawl_every,
+    which bounds how stale a stored repository can be.
+
+    Arguments:
+        path {str} -- The path of the JSON file the state is kept in.
+        full_crawl_every {timedelta} -- How long the stored set is built on before a full crawl is due.
+
+    """
+
+    def __init__(self, path: str, full_crawl_every: timedelta = timedelta(days=7)) -> None:
+        self.path = path
+        self.full_crawl_every = full_crawl_every
+        self.last_successful_run: datetime | None = None
+        self.last_full_crawl: datetime | None = None
+        self.repositories: dict[str, dict[str, Any]] = {}
+        # Whether this run replaced the stored set, making it a full crawl
+        self.__replaced = False
+        self.__load()
+
+    def __load(self) -> None:
+        if not os.path.exists(self.path):
+            logging.info(f"No crawl state found at {self.path}, a full crawl is required")
+            return
+
+        with open(self.path, encoding="utf-8") as file:
+            state = json.load(file)
+
+        self.last_successful_run = datetime.fromisoformat(state["last_successful_run"])
+        # States saved before full crawls were recorded are treated as never having had one
+        if state.get("last_full_crawl") is not None:
+            self.last_full_crawl = datetime.fromisoformat(state["last_full_crawl"])
+        self.repositories = {repo["name"]: repo for repo in state["repositories"]}
+        logging.info(
+            f"Loaded crawl state with {len(self.repositories)} repositories, last successful run {self.last_successful_run}"
+        )
+
+    def full_crawl_due(self) -> bool:
+        """Whether the next run must crawl every repository and replace the stored set."""
+        if self.last_full_crawl is None or self.last_full_crawl < datetime.now(timezone.utc) - self.full_crawl_every:
+            logging.info(f"A full crawl is due, the last one was {self.last_full_crawl}")
+            return True
+        return False
+
+    def merge(self, repositories: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Replace the stored copy of each given repository with the given one.
+
+        Returns:
+            list: Every repository known to the state after the merge
+        """
+        for repo in repositories:
+            self.repositories[repo["name"]] = repo
+        return list(self.repositories.values())
+
+    def replace(self, repositories: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Discard the stored repositories in favour of the result of a full crawl.
+
+        Returns:
+            list: Every repository known to the state after the replacement
+        """
+        self.repositories = {}
+        self.__replaced = True
+        return self.merge(repositories)
+
+    def save(self, run_started_at: datetime) -> None:
+        """Record a successful run, as a full crawl if it replaced the stored set. The start time,
+        rather than the finish time, is stored so that repositories pushed to while the crawl was
+        in progress are fetched again next time.
+        """
+        self.last_successful_run = run_started_at
+        if self.__replaced:
+            self.last_full_crawl = run_started_at
+        _write_json_atomically(
+            self.path,
+            {
+                "last_successful_run": run_started_at.isoformat(),
+                "last_full_crawl": self.last_full_crawl.isoformat() if self.last_full_crawl else None,
+                "repositories": list(self.repositories.values()),
+            },
+        )
+        logging.info(f"Saved crawl state with {len(self.repositories)} repositories")
+
+
+class PaginationCheckpoint:
+    """The position reached by each repository type stream of an in-progress crawl, together with
+    the repositories collected so far. It is written after every page, so a crawl that is
+    interrupted, by the rate limit or by the job being killed, continues from where it stopped
+    instead of starting again from the first page.
+
+    The created: windows each repository type was split into are recorded too, as they depend on
+    when they were computed, so a resumed crawl paginates the same streams it started.
+
+    A checkpoint is only resumed by a crawl with the same organisation and pushed_after, and
+    only while it is younger than max_age.
+
+    Arguments:
+        path {str} -- The path of the JSON file the checkpoint is kept in.
+        organisation {str} -- The organisation being crawled.
+        pushed_after {datetime} -- The pushed:> qualifier of the crawl, if any.
+        max_age {timedelta} -- How long a checkpoint may be resumed for.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        organisation: str,
+        pushed_after: datetime | None = None,
+        max_age: timedelta = timedelta(days=1),
+    ) -> None:
+        self.path = path
+        self.__crawl = {
+            "organisation": organisation,
+            "pushed_after": pushed_after.isoformat() if pushed_after else None,
+        }
+        self.__started_at = datetime.now(timezone.utc)
+        self.__streams: dict[str, dict[str, Any]] = {}
+        self.__created_windows: dict[str, list[list[str] | None]] = {}
+        self.__load(max_age)
+
+    def __load(self, max_age: timedelta) -> None:
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, encoding="utf-8") as file:
+            checkpoint = json.load(file)
+
+        started_at = datetime.fromisoformat(checkpoint["started_at"])
+        if checkpoint["crawl"] != self.__crawl or started_at < datetime.now(timezone.utc) - max_age:
+            logging.info(f"Discarding checkpoint at {self.path} as it belongs to another crawl")
+            return
+
+        self.__started_at = started_at
+        self.__streams = checkpoint["streams"]
+        self.__created_windows = checkpoint.get("created_windows", {})
+        logging.info(
+            f"Resuming crawl from checkpoint with {sum(len(stream['repositories']) for stream in self.__streams.values())} repositories"
+        )
+
+    def created_windows(
+        self, repo_type: str
+    ) -> list[tuple[datetime, datetime] | None] | None:
+        """The created: windows a repository type was split into, or None if it has not been yet.
+        A None window is the whole repository type.
+        """
+        created_windows = self.__created_windows.get(repo_type)
+        if created_windows is None:
+            return None
+        return [
+            None if window is None else (
+                datetime.fromisoformat(window[0]), datetime.fromisoformat(window[1]))
+            for window in created_windows
+        ]
+
+    def record_created_windows(
+        self, repo_type: str, created_windows: list[tuple[datetime, datetime] | None]
+    ) -> None:
+        """Save the created: windows a repository type was split into."""
+        self.__created_windows[repo_type] = [
+            None if window is None else [window[0].isoformat(), window[1].isoformat()]
+            for window in created_windows
+        ]
+        self.__save()
+
+    def position(self, repo_type: str) -> tuple[str | None, bool, list[dict[str, Any]]]:
+        """The position to continue a repository type stream from.
+
+        Returns:
+            tuple: The cursor to fetch after, whether there are pages left and the repositories collected so far
+        """
+        stream = self.__streams.get(repo_type)
+        if stream is None:
+            return None, True, []
+        return stream["after_cursor"], stream["has_next_page"], list(stream["repositories"])
+
+    def record_page(
+        self,
+        repo_type: str,
+        after_cursor: str | None,
+        has_next_page: bool,
+        repositories: list[dict[str, Any]],
+    ) -> None:
+        """Save the position of a repository type stream after a page has been collected."""
+        self.__streams[repo_type] = {
+            "after_cursor": after_cursor,
+            "has_next_page": has_next_page,
+            "repositories": repositories,
+        }
+        self.__save()
+
+    def __save(self) -> None:
+        _write_json_atomically(
+            self.path,
+            {
+                "crawl": self.__crawl,
+                "started_at": self.__started_at.isoformat(),
+                "streams": self.__streams,
+                "created_windows": self.__created_windows,
+            },
+        )
+
+    def clear(self) -> None:
+        """Remove the checkpoint once the run it belongs to has succeeded."""
+        self.__streams = {}
+        self.__created_windows = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,20 +1,374 @@
 # pylint: disable=E1136, E1135, W0718, C0411
 
+import asyncio
+import math
+from copy import copy
 from calendar import timegm
-from time import gmtime, sleep
-from typing import Any, Callable
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from time import gmtime, monotonic, sleep
+from typing import Any, Awaitable, Callable, Iterator
 
 from github import Github, RateLimitExceededException
 from gql import Client, gql
+from gql.client import AsyncClientSession
 from gql.transport.aiohttp import AIOHTTPTransport
-from gql.transport.exceptions import TransportServerError
+from gql.transport.exceptions import TransportQueryError, TransportServerError
+from graphql import DocumentNode
 from requests import Session
 
 from cronjobs.config.logging_config import logging
+from cronjobs.services.adaptive_page_size import AdaptivePageSize
+from cronjobs.services.crawl_state import PaginationCheckpoint
+from cronjobs.services.graphql_session import PersistentGraphQLSession
+from cronjobs.services.rate_limit_scheduler import GraphQLRateLimitScheduler
 
 logging.getLogger("gql").setLevel(logging.WARNING)
 
 
+REPOSITORY_FIELDS_FRAGMENT = """
+fragment RepositoryFields on Repository {
+    id
+    isArchived
+    isDisabled
+    isPrivate
+    isLocked
+    name
+    pushedAt
+    url
+    description
+    hasIssuesEnabled
+    repositoryTopics(first: 10) {
+        edges {
+            node {
+                topic {
+                    name
+                }
+            }
+        }
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+    }
+    defaultBranchRef {
+        name
+    }
+    collaborators(affiliation: DIRECT) {
+        totalCount
+    }
+    licenseInfo {
+        name
+    }
+    branchProtectionRules(first: 10) {
+        edges {
+            node {
+                isAdminEnforced
+                pattern
+                requiredApprovingReviewCount
+                requiresApprovingReviews
+            }
+        }
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+    }
+}
+"""
+
+REPOSITORIES_PER_TYPE_QUERY = """
+query($page_size: Int!, $after_cursor: String, $the_query: String!) {
+    rateLimit {
+        cost
+        limit
+        remaining
+        resetAt
+    }
+    search(
+        type: REPOSITORY
+        query: $the_query
+        first: $page_size
+        after: $after_cursor
+    ) {
+        repositoryCount
+        repos: edges {
+            repo: node {
+                ...RepositoryFields
+            }
+        }
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+    }
+}
+""" + REPOSITORY_FIELDS_FRAGMENT
+
+ORGANISATION_REPOSITORIES_QUERY = """
+query($organisation: String!, $page_size: Int!, $after_cursor: String, $order_by: RepositoryOrder) {
+    rateLimit {
+        cost
+        limit
+        remaining
+        resetAt
+    }
+    organization(login: $organisation) {
+        repositories(
+            isArchived: false
+            first: $page_size
+            after: $after_cursor
+            orderBy: $order_by
+        ) {
+            totalCount
+            nodes {
+                ...RepositoryFields
+            }
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+        }
+    }
+}
+""" + REPOSITORY_FIELDS_FRAGMENT
+
+REPOSITORY_COUNT_QUERY = """
+query($the_query: String!) {
+    rateLimit {
+        cost
+        limit
+        remaining
+        resetAt
+    }
+    search(type: REPOSITORY, query: $the_query, first: 1) {
+        repositoryCount
+    }
+}
+"""
+
+REPOSITORY_IDS_PER_TYPE_QUERY = """
+query($page_size: Int!, $after_cursor: String, $the_query: String!) {
+    rateLimit {
+        cost
+        limit
+        remaining
+        resetAt
+    }
+    search(
+        type: REPOSITORY
+        query: $the_query
+        first: $page_size
+        after: $after_cursor
+    ) {
+        repositoryCount
+        repos: edges {
+            repo: node {
+                ... on Repository {
+                    id
+                    isDisabled
+                    isLocked
+                }
+            }
+        }
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+    }
+}
+"""
+
+REPOSITORY_DETAILS_QUERY = """
+query($ids: [ID!]!) {
+    rateLimit {
+        cost
+        limit
+        remaining
+        resetAt
+    }
+    nodes(ids: $ids) {
+        ...RepositoryFields
+    }
+}
+""" + REPOSITORY_FIELDS_FRAGMENT
+
+REPOSITORY_BRANCH_PROTECTION_RULES_QUERY = """
+query($id: ID!, $page_size: Int!, $after_cursor: String) {
+    rateLimit {
+        cost
+        limit
+        remaining
+        resetAt
+    }
+    node(id: $id) {
+        ... on Repository {
+            connection: branchProtectionRules(first: $page_size, after: $after_cursor) {
+                edges {
+                    node {
+                        isAdminEnforced
+                        pattern
+                        requiredApprovingReviewCount
+                        requiresApprovingReviews
+                    }
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+    }
+}
+"""
+
+REPOSITORY_TOPICS_QUERY = """
+query($id: ID!, $page_size: Int!, $after_cursor: String) {
+    rateLimit {
+        cost
+        limit
+        remaining
+        resetAt
+    }
+    node(id: $id) {
+        ... on Repository {
+            connection: repositoryTopics(first: $page_size, after: $after_cursor) {
+                edges {
+                    node {
+                        topic {
+                            name
+                        }
+                    }
+                }
+                pageInfo {
+                    hasNextPage
+                    endCursor
+                }
+            }
+        }
+    }
+}
+"""
+
+# Parsed once at import, rather than every time a page is requested
+GRAPHQL_DOCUMENTS: dict[str, DocumentNode] = {
+    "repositories_per_type": gql(REPOSITORIES_PER_TYPE_QUERY),
+    "organisation_repositories": gql(ORGANISATION_REPOSITORIES_QUERY),
+    "repository_count": gql(REPOSITORY_COUNT_QUERY),
+    "repository_ids_per_type": gql(REPOSITORY_IDS_PER_TYPE_QUERY),
+    "repository_details": gql(REPOSITORY_DETAILS_QUERY),
+    "branch_protection_rules": gql(REPOSITORY_BRANCH_PROTECTION_RULES_QUERY),
+    "repository_topics": gql(REPOSITORY_TOPICS_QUERY),
+}
+
+CreatedWindow = tuple[datetime, datetime]
+
+
+@lru_cache(maxsize=None)
+def _named_repositories_document(repository_count: int) -> DocumentNode:
+    # The document for each batch size is built and parsed once, then reused
+    variables = "".join(f", $name{index}: String!" for index in range(repository_count))
+    aliases = "".join(
+        f"    repository{index}: repository(owner: $owner, name: $name{index}) {{ ...RepositoryFields }}\n"
+        for index in range(repository_count)
+    )
+    return gql(
+        f"""
+query($owner: String!{variables}) {{
+    rateLimit {{
+        cost
+        limit
+        remaining
+        resetAt
+    }}
+{aliases}}}
+"""
+        + REPOSITORY_FIELDS_FRAGMENT
+    )
+
+
+def _github_timestamp(time: datetime) -> str:
+    return f"{time.astimezone(timezone.utc):%Y-%m-%dT%H:%M:%SZ}"
+
+
+def _is_server_error(exception: Exception) -> bool:
+    return isinstance(exception, TransportServerError) and (
+        isinstance(exception.code, int) and exception.code >= 500
+    )
+
+
+def _data_without_missing_repositories(error: TransportQueryError) -> dict[str, Any]:
+    """The data of a query that failed only because some of the repositories it asked for do
+    not exist. Those are returned as null, alongside the others."""
+    if error.data is None or any(
+        query_error.get("type") != "NOT_FOUND" for query_error in error.errors or []
+    ):
+        raise error
+    return error.data
+
+
+def _is_page_too_large_error(exception: Exception) -> bool:
+    return isinstance(exception, TimeoutError) or _is_server_error(exception)
+
+
+def _fetch_page_with_adaptive_size(
+    fetch_page: Callable[[int], dict[str, Any]], page_size: AdaptivePageSize
+) -> dict[str, Any]:
+    while True:
+        started = monotonic()
+        try:
+            data = fetch_page(page_size.page_size)
+        except (TimeoutError, TransportServerError) as exception:
+            if not _is_page_too_large_error(exception) or not page_size.shrink():
+                raise
+            continue
+        page_size.record_response(monotonic() - started)
+        return data
+
+
+async def _fetch_page_with_adaptive_size_async(
+    fetch_page: Callable[[int], Awaitable[dict[str, Any]]], page_size: AdaptivePageSize
+) -> dict[str, Any]:
+    while True:
+        started = monotonic()
+        try:
+            data = await fetch_page(page_size.page_size)
+        except (TimeoutError, TransportServerError) as exception:
+            if not _is_page_too_large_error(exception) or not page_size.shrink():
+                raise
+            continue
+        page_size.record_response(monotonic() - started)
+        return data
+
+
+def _seconds_to_wait_for_rate_limit_reset(github_service, exception: Exception) -> int:
+    logging.warning(
+        f"Caught {type(exception).__name__}, retrying calls when rate limit resets."
+    )
+    rate_limits = github_service.github_client_core_api.get_rate_limit()
+    rate_limit_to_use = (
+        rate_limits.core
+        if isinstance(exception, RateLimitExceededException)
+        else rate_limits.graphql
+    )
+
+    reset_timestamp = timegm(rate_limit_to_use.reset.timetuple())
+    now_timestamp = timegm(gmtime())
+    time_until_core_api_rate_limit_resets = (
+        (reset_timestamp - now_timestamp)
+        if reset_timestamp > now_timestamp
+        else 0
+    )
+
+    wait_time_buffer = 5
+    return (
+        time_until_core_api_rate_limit_resets + wait_time_buffer
+        if time_until_core_api_rate_limit_resets
+        else 0
+    )
+
+
 def retries_github_rate_limit_exception_at_next_reset_once(func: Callable) -> Callable:
     def decorator(*args, **kwargs):
         """
@@ -32,31 +386,78 @@ def retries_github_rate_limit_exception_at_next_reset_once(func: Callable) -> Ca
         try:
             return func(*args, **kwargs)
         except (RateLimitExceededException, TransportServerError) as exception:
-            logging.warning(
-                f"Caught {type(exception).__name__}, retrying calls when rate limit resets."
-            )
-            rate_limits = args[0].github_client_core_api.get_rate_limit()
-            rate_limit_to_use = (
-                rate_limits.core
-                if isinstance(exception, RateLimitExceededException)
-                else rate_limits.graphql
-            )
+            if _is_server_error(exception):
+                raise
+            sleep(_seconds_to_wait_for_rate_limit_reset(args[0], exception))
+            return func(*args, **kwargs)
 
-            reset_timestamp = timegm(rate_limit_to_use.reset.timetuple())
-            now_timestamp = timegm(gmtime())
-            time_until_core_api_rate_limit_resets = (
-                (reset_timestamp - now_timestamp)
-                if reset_timestamp > now_timestamp
-                else 0
-            )
+    return decorator
 
-            wait_time_buffer = 5
-            sleep(
-                time_until_core_api_rate_limit_resets + wait_time_buffer
-                if time_until_core_api_rate_limit_resets
-                else 0
-            )
-            return func(*args, **kwargs)
+
+def retries_github_rate_limit_exception_at_next_reset_once_async(func: Callable) -> Callable:
+    async def decorator(*args, **kwargs):
+        """
+        The coroutine equivalent of retries_github_rate_limit_exception_at_next_reset_once. Only the
+        failing coroutine waits for the reset, other streams on the same event loop carry on.
+        """
+        try:
+            return await func(*args, **kwargs)
+        except (RateLimitExceededException, TransportServerError) as exception:
+            if _is_server_error(exception):
+                raise
+            await asyncio.sleep(_seconds_to_wait_for_rate_limit_reset(args[0], exception))
+            return await func(*args, **kwargs)
+
+    return decorator
+
+
+SERVER_ERROR_ATTEMPTS = 3
+SERVER_ERROR_BACKOFF_SECONDS = 2.0
+
+
+def _server_error_backoff_seconds(attempt: int, exception: TransportServerError) -> float:
+    wait_seconds = SERVER_ERROR_BACKOFF_SECONDS * 2 ** (attempt - 1)
+    logging.warning(
+        f"Caught {type(exception).__name__} {exception.code}, retrying in {wait_seconds} seconds."
+    )
+    return wait_seconds
+
+
+def retries_github_server_error_with_backoff(func: Callable) -> Callable:
+    def decorator(*args, **kwargs):
+        """
+        A decorator to retry the method, up to SERVER_ERROR_ATTEMPTS times with exponential backoff,
+        when GitHub fails with a server error. For the requests that cannot retry a failed page at a
+        smaller size, which retries_github_rate_limit_exception_at_next_reset_once does not retry.
+
+        WARNING: As with retries_github_rate_limit_exception_at_next_reset_once, ensure that the
+        method being decorated is idempotent.
+        """
+        for attempt in range(1, SERVER_ERROR_ATTEMPTS):
+            try:
+                return func(*args, **kwargs)
+            except TransportServerError as exception:
+                if not _is_server_error(exception):
+                    raise
+                sleep(_server_error_backoff_seconds(attempt, exception))
+        return func(*args, **kwargs)
+
+    return decorator
+
+
+def retries_github_server_error_with_backoff_async(func: Callable) -> Callable:
+    async def decorator(*args, **kwargs):
+        """
+        The coroutine equivalent of retries_github_server_error_with_backoff.
+        """
+        for attempt in range(1, SERVER_ERROR_ATTEMPTS):
+            try:
+                return await func(*args, **kwargs)
+            except TransportServerError as exception:
+                if not _is_server_error(exception):
+                    raise
+                await asyncio.sleep(_server_error_backoff_seconds(attempt, exception))
+        return await func(*args, **kwargs)
 
     return decorator
 
@@ -68,6 +469,18 @@ class GithubService:
     GITHUB_GQL_MAX_PAGE_SIZE = 100
     GITHUB_GQL_DEFAULT_PAGE_SIZE = 80
     ENTERPRISE_NAME = "ministry-of-justice-uk"
+    REPOSITORY_TYPES = ["public", "private", "internal", "forks"]
+    DEFAULT_MAX_CONCURRENCY = 4
+    SEARCH_RESULT_LIMIT = 1000
+    REPOSITORY_DETAILS_BATCH_SIZE = 50
+    NAMED_REPOSITORIES_BATCH_SIZE = 50
+    # The nested connections fetched inline with the first 10 items, with the document that
+    # pages through the rest
+    NESTED_CONNECTION_DOCUMENTS = {
+        "branchProtectionRules": "branch_protection_rules",
+        "repositoryTopics": "repository_topics",
+    }
+    EARLIEST_REPOSITORY_CREATED_AT = datetime(2008, 1, 1, tzinfo=timezone.utc)
 
     # Added to stop TypeError on instantiation. See https://github.com/python/cpython/blob/d2340ef25721b6a72d45d4508c672c4be38c67d3/Objects/typeobject.c#L4444
     def __new__(cls, *_, **__):
@@ -78,6 +491,7 @@ class GithubService:
         org_token: str,
         organisation_name: str,
         enterprise_name: str = ENTERPRISE_NAME,
+        rate_limit_scheduler: GraphQLRateLimitScheduler | None = None,
     ) -> None:
         self.organisation_name: str = organisation_name
         self.enterprise_name: str = enterprise_name
@@ -94,6 +508,13 @@ class GithubService:
             ),
             execute_timeout=120,
         )
+        self.rate_limit_scheduler: GraphQLRateLimitScheduler = (
+            rate_limit_scheduler or GraphQLRateLimitScheduler()
+        )
+        self.graphql_request_count: int = 0
+        # The search streams that matched more than SEARCH_RESULT_LIMIT repositories, so were cut short
+        self.truncated_streams: set[str] = set()
+        self.graphql_session: PersistentGraphQLSession | None = None
         self.github_client_rest_api = Session()
         self.github_client_rest_api.headers.update(
             {
@@ -102,93 +523,530 @@ class GithubService:
             }
         )
 
+    @contextmanager
+    def persistent_graphql_session(self) -> Iterator[None]:
+        """Send every synchronous GraphQL request made inside the block over one connected
+        session, reusing its keep-alive connections, instead of connecting for each request.
+        A nested block reuses the session of the outer one.
+        """
+        if self.graphql_session is not None:
+            yield
+            return
+
+        self.graphql_session = PersistentGraphQLSession(self.github_client_gql_api)
+        try:
+            yield
+        finally:
+            graphql_session, self.graphql_session = self.graphql_session, None
+            graphql_session.close()
+
+    def _execute_graphql(
+        self, document_name: str, variable_values: dict[str, Any]
+    ) -> dict[str, Any]:
+        return self._execute_graphql_document(
+            GRAPHQL_DOCUMENTS[document_name], variable_values
+        )
+
+    def _execute_graphql_document(
+        self, document: DocumentNode, variable_values: dict[str, Any]
+    ) -> dict[str, Any]:
+        if self.graphql_session is not None:
+            return self.graphql_session.execute(document, variable_values)
+        return self.github_client_gql_api.execute(
+            document, variable_values=variable_values
+        )
+
+    def _repository_search_variables(
+        self,
+        repo_type: str,
+        after_cursor: str | None,
+        page_size: int,
+        pushed_after: datetime | None = None,
+        created_window: CreatedWindow | None = None,
+    ) -> dict[str, Any]:
+        if page_size > self.GITHUB_GQL_MAX_PAGE_SIZE:
+            raise ValueError(
+                f"Page size of {page_size} is too large. Max page size {self.GITHUB_GQL_MAX_PAGE_SIZE}"
+            )
+        return {
+            "the_query": self._repository_search_query(
+                repo_type, pushed_after, created_window
+            ),
+            "page_size": page_size,
+            "after_cursor": after_cursor,
+        }
+
+    def _repository_search_query(
+        self,
+        repo_type: str,
+        pushed_after: datetime | None = None,
+        created_window: CreatedWindow | None = None,
+    ) -> str:
+        the_query = f"org:{self.organisation_name}, archived:false, is:{repo_type}"
+        if pushed_after is not None:
+            the_query += f", pushed:>{_github_timestamp(pushed_after)}"
+        if created_window is not None:
+            the_query += f", created:{_github_timestamp(created_window[0])}..{_github_timestamp(created_window[1])}"
+        return the_query
+
+    @staticmethod
+    def _stream_name(repo_type: str, created_window: CreatedWindow | None = None) -> str:
+        if created_window is None:
+            return repo_type
+        return f"{repo_type}:{_github_timestamp(created_window[0])}..{_github_timestamp(created_window[1])}"
+
+    @staticmethod
+    def _active_repositories_in_page(data: dict[str, Any]) -> list[dict[str, Any]]:
+        if data["search"]["repos"] is None:
+            return []
+        return [
+            repo["repo"]
+            for repo in data["search"]["repos"]
+            if not (repo["repo"]["isDisabled"] or repo["repo"]["isLocked"])
+        ]
+
     @retries_github_rate_limit_exception_at_next_reset_once
     def get_paginated_list_of_repositories_per_type(
         self,
         repo_type: str,
         after_cursor: str | None,
         page_size: int = GITHUB_GQL_DEFAULT_PAGE_SIZE,
+        pushed_after: datetime | None = None,
+        created_window: CreatedWindow | None = None,
     ) -> dict[str, Any]:
         logging.info(
             f"Getting paginated list of repositories per type {repo_type}. Page size {page_size}, after cursor {bool(after_cursor)}"
         )
+        variable_values = self._repository_search_variables(
+            repo_type, after_cursor, page_size, pushed_after, created_window
+        )
+        self.rate_limit_scheduler.wait()
+        self.graphql_request_count += 1
+        return self._execute_graphql("repositories_per_type", variable_values)
+
+    @retries_github_rate_limit_exception_at_next_reset_once_async
+    async def get_paginated_list_of_repositories_per_type_async(
+        self,
+        session: AsyncClientSession,
+        repo_type: str,
+        after_cursor: str | None,
+        page_size: int = GITHUB_GQL_DEFAULT_PAGE_SIZE,
+        pushed_after: datetime | None = None,
+        created_window: CreatedWindow | None = None,
+    ) -> dict[str, Any]:
+        logging.info(
+            f"Getting paginated list of repositories per type {repo_type} asynchronously. Page size {page_size}, after cursor {bool(after_cursor)}"
+        )
+        variable_values = self._repository_search_variables(
+            repo_type, after_cursor, page_size, pushed_after, created_window
+        )
+        await self.rate_limit_scheduler.wait_async()
+        self.graphql_request_count += 1
+        return await session.execute(
+            GRAPHQL_DOCUMENTS["repositories_per_type"], variable_values=variable_values
+        )
+
+    def _record_page_progress(
+        self,
+        stream_name: str,
+        data: dict[str, Any],
+        connection: dict[str, Any],
+        repos_fetched: int,
+        page_size: int = GITHUB_GQL_DEFAULT_PAGE_SIZE,
+    ) -> None:
+        stream = f"{self.organisation_name}/{stream_name}"
+        self.rate_limit_scheduler.record(data.get("rateLimit"))
+        total_count = connection.get("repositoryCount", connection.get("totalCount"))
+        if not connection["pageInfo"]["hasNextPage"]:
+            self.rate_limit_scheduler.update_demand(stream, 0)
+        elif total_count is not None:
+            self.rate_limit_scheduler.update_demand(
+                stream, math.ceil((total_count - repos_fetched) / page_size)
+            )
+
+        projected_finish_time = self.rate_limit_scheduler.projected_finish_time()
+        if projected_finish_time is not None:
+            logging.info(
+                f"{self.rate_limit_scheduler.pages_remaining} pages remaining, projected to finish at {projected_finish_time:%H:%M:%S}"
+            )
+
+    def _new_adaptive_page_size(self) -> AdaptivePageSize:
+        return AdaptivePageSize(
+            self.GITHUB_GQL_DEFAULT_PAGE_SIZE, maximum=self.GITHUB_GQL_MAX_PAGE_SIZE
+        )
+
+    @staticmethod
+    def _stream_position(
+        checkpoint: PaginationCheckpoint | None, repo_type: str
+    ) -> tuple[str | None, bool, list[dict[str, Any]]]:
+        if checkpoint is None:
+            return None, True, []
+        return checkpoint.position(repo_type)
+
+    @retries_github_rate_limit_exception_at_next_reset_once
+    def get_paginated_list_of_organisation_repositories(
+        self,
+        after_cursor: str | None,
+        page_size: int = GITHUB_GQL_DEFAULT_PAGE_SIZE,
+        order_by_pushed_at: bool = False,
+    ) -> dict[str, Any]:
+        logging.info(
+            f"Getting paginated list of organisation repositories. Page size {page_size}, after cursor {bool(after_cursor)}"
+        )
         if page_size > self.GITHUB_GQL_MAX_PAGE_SIZE:
             raise ValueError(
                 f"Page size of {page_size} is too large. Max page size {self.GITHUB_GQL_MAX_PAGE_SIZE}"
             )
-        the_query = f"org:{self.organisation_name}, archived:false, is:{repo_type}"
-        return self.github_client_gql_api.execute(
-            gql("""
-            query($page_size: Int!, $after_cursor: String, $the_query: String!) {
-                search(
-                    type: REPOSITORY
-                    query: $the_query
-                    first: $page_size
-                    after: $after_cursor
-                ) {
-                repos: edges {
-                    repo: node {
-                        ... on Repository {
-                                isDisabled
-                                isPrivate
-                                isLocked
-                                name
-                                pushedAt
-                                url
-                                description
-                                hasIssuesEnabled
-                                repositoryTopics(first: 10) {
-                                    edges {
-                                        node {
-                                            topic {
-                                                name
-                                            }
-                                        }
-                                    }
-                                }
-                                defaultBranchRef {
-                                    name
-                                }
-                                collaborators(affiliation: DIRECT) {
-                                    totalCount
-                                }
-                                licenseInfo {
-                                    name
-                                }
-                                collaborators(affiliation: DIRECT) {
-                                    totalCount
-                                }
-                                branchProtectionRules(first: 10) {
-                                    edges {
-                                        node {
-                                            isAdminEnforced
-                                            pattern
-                                            requiredApprovingReviewCount
-                                            requiresApprovingReviews
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
-                    pageInfo {
-                        hasNextPage
-                        endCursor
-                    }
-                }
-            }
-        """),
-            variable_values={
-                "the_query": the_query,
+        self.rate_limit_scheduler.wait()
+        self.graphql_request_count += 1
+        return self._execute_graphql(
+            "organisation_repositories",
+            {
+                "organisation": self.organisation_name,
                 "page_size": page_size,
                 "after_cursor": after_cursor,
+                "order_by": (
+                    {"field": "PUSHED_AT", "direction": "DESC"}
+                    if order_by_pushed_at
+                    else None
+                ),
+            },
+        )
+
+    @retries_github_rate_limit_exception_at_next_reset_once
+    def get_paginated_list_of_repository_ids_per_type(
+        self,
+        repo_type: str,
+        after_cursor: str | None,
+        page_size: int = GITHUB_GQL_MAX_PAGE_SIZE,
+        pushed_after: datetime | None = None,
+        created_window: CreatedWindow | None = None,
+    ) -> dict[str, Any]:
+        logging.info(
+            f"Getting paginated list of repository ids per type {repo_type}. Page size {page_size}, after cursor {bool(after_cursor)}"
+        )
+        variable_values = self._repository_search_variables(
+            repo_type, after_cursor, page_size, pushed_after, created_window
+        )
+        self.rate_limit_scheduler.wait()
+        self.graphql_request_count += 1
+        return self._execute_graphql("repository_ids_per_type", variable_values)
+
+    @retries_github_rate_limit_exception_at_next_reset_once
+    def get_repository_details(self, repository_ids: list[str]) -> dict[str, Any]:
+        logging.info(f"Getting details of {len(repository_ids)} repositories")
+        if len(repository_ids) > self.GITHUB_GQL_MAX_PAGE_SIZE:
+            raise ValueError(
+                f"Batch of {len(repository_ids)} repositories is too large. Max batch size {self.GITHUB_GQL_MAX_PAGE_SIZE}"
+            )
+        self.rate_limit_scheduler.wait()
+        self.graphql_request_count += 1
+        try:
+            return self._execute_graphql("repository_details", {"ids": repository_ids})
+        except TransportQueryError as error:
+            # A repository deleted since its id was listed is an error, but the others are still returned
+            return _data_without_missing_repositories(error)
+
+    @retries_github_rate_limit_exception_at_next_reset_once
+    @retries_github_server_error_with_backoff
+    def get_paginated_list_of_repository_connection(
+        self, repository_id: str, connection_name: str, after_cursor: str | None
+    ) -> dict[str, Any]:
+        if connection_name not in self.NESTED_CONNECTION_DOCUMENTS:
+            raise ValueError(f"Unsupported repository connection {connection_name}")
+        logging.info(
+            f"Getting paginated list of {connection_name} of repository {repository_id}, after cursor {bool(after_cursor)}"
+        )
+        self.rate_limit_scheduler.wait()
+        self.graphql_request_count += 1
+        return self._execute_graphql(
+            self.NESTED_CONNECTION_DOCUMENTS[connection_name],
+            {
+                "id": repository_id,
+                "page_size": self.GITHUB_GQL_MAX_PAGE_SIZE,
+                "after_cursor": after_cursor,
             },
         )
 
     @retries_github_rate_limit_exception_at_next_reset_once
-    def fetch_all_repositories_in_org(self) -> list[dict[str, Any]]:
+    @retries_github_server_error_with_backoff
+    def get_named_repositories(self, repository_names: list[str]) -> dict[str, Any]:
+        logging.info(f"Getting {len(repository_names)} named repositories")
+        if len(repository_names) > self.GITHUB_GQL_MAX_PAGE_SIZE:
+            raise ValueError(
+                f"Batch of {len(repository_names)} repositories is too large. Max batch size {self.GITHUB_GQL_MAX_PAGE_SIZE}"
+            )
+        variable_values: dict[str, Any] = {"owner": self.organisation_name}
+        for index, repository_name in enumerate(repository_names):
+            variable_values[f"name{index}"] = repository_name
+        self.rate_limit_scheduler.wait()
+        self.graphql_request_count += 1
+        try:
+            return self._execute_graphql_document(
+                _named_repositories_document(len(repository_names)), variable_values
+            )
+        except TransportQueryError as error:
+            # A repository that does not exist is an error, but the others are still returned
+            return _data_without_missing_repositories(error)
+
+    @retries_github_rate_limit_exception_at_next_reset_once
+    @retries_github_server_error_with_backoff
+    def count_repositories_per_type(
+        self,
+        repo_type: str,
+        pushed_after: datetime | None = None,
+        created_window: CreatedWindow | None = None,
+    ) -> int:
+        self.rate_limit_scheduler.wait()
+        self.graphql_request_count += 1
+        data = self._execute_graphql(
+            "repository_count",
+            {
+                "the_query": self._repository_search_query(
+                    repo_type, pushed_after, created_window
+                )
+            },
+        )
+        self.rate_limit_scheduler.record(data.get("rateLimit"))
+        return data["search"]["repositoryCount"]
+
+    @retries_github_rate_limit_exception_at_next_reset_once_async
+    @retries_github_server_error_with_backoff_async
+    async def count_repositories_per_type_async(
+        self,
+        session: AsyncClientSession,
+        repo_type: str,
+        pushed_after: datetime | None = None,
+        created_window: CreatedWindow | None = None,
+    ) -> int:
+        await self.rate_limit_scheduler.wait_async()
+        self.graphql_request_count += 1
+        data = await session.execute(
+            GRAPHQL_DOCUMENTS["repository_count"],
+            variable_values={
+                "the_query": self._repository_search_query(
+                    repo_type, pushed_after, created_window
+                )
+            },
+        )
+        self.rate_limit_scheduler.record(data.get("rateLimit"))
+        return data["search"]["repositoryCount"]
+
+    def _record_truncated_stream(
+        self, repo_type: str, created_window: CreatedWindow | None, repository_count: int
+    ) -> None:
+        stream_name = self._stream_name(repo_type, created_window)
+        logging.warning(
+            f"{repository_count} {stream_name} repositories found, only the first {self.SEARCH_RESULT_LIMIT} can be fetched"
+        )
+        self.truncated_streams.add(f"{self.organisation_name}/{stream_name}")
+
+    def _record_search_truncation(
+        self, repo_type: str, created_window: CreatedWindow | None, connection: dict[str, Any]
+    ) -> None:
+        # The counts that decided the windows may have grown by the time the window is paginated
+        repository_count = connection.get("repositoryCount", 0)
+        if not connection["pageInfo"]["hasNextPage"] and repository_count > self.SEARCH_RESULT_LIMIT:
+            self._record_truncated_stream(repo_type, created_window, repository_count)
+
+    def _split_created_window(
+        self, repo_type: str, created_window: CreatedWindow, repository_count: int
+    ) -> list[CreatedWindow] | None:
+        """The two halves of a window holding more than SEARCH_RESULT_LIMIT repositories, or
+        None when it is a single second and cannot be split any further."""
+        start, end = created_window
+        if end - start <= timedelta(seconds=1):
+            self._record_truncated_stream(repo_type, created_window, repository_count)
+            return None
+        middle = (start + (end - start) / 2).replace(microsecond=0)
+        return [(start, middle), (middle + timedelta(seconds=1), end)]
+
+    def _divide_created_window(
+        self, repo_type: str, created_window: CreatedWindow | None, repository_count: int
+    ) -> tuple[list[CreatedWindow | None], list[CreatedWindow]]:
+        """Decide how a window holding repository_count repositories is searched. A None window
+        is the whole repository type. A window with more than SEARCH_RESULT_LIMIT repositories is
+        halved, until each half holds no more than that or is a single second.
+
+        Returns:
+            tuple: The windows searched as they are, and the halves whose repositories must be
+            counted to decide their own windows
+        """
+        if repository_count == 0:
+            return [], []
+        if repository_count <= self.SEARCH_RESULT_LIMIT:
+            return [created_window], []
+        halves = self._split_created_window(
+            repo_type, created_window or self._all_time(), repository_count
+        )
+        if halves is None:
+            return [created_window], []
+        return [], halves
+
+    def _created_windows(
+        self,
+        repo_type: str,
+        pushed_after: datetime | None,
+        created_window: CreatedWindow | None,
+    ) -> list[CreatedWindow | None]:
+        repository_count = self.count_repositories_per_type(
+            repo_type, pushed_after, created_window
+        )
+        created_windows, halves = self._divide_created_window(
+            repo_type, created_window, repository_count
+        )
+        return created_windows + [
+            window
+            for half in halves
+            for window in self._created_windows(repo_type, pushed_after, half)
+        ]
+
+    async def _created_windows_async(
+        self,
+        session: AsyncClientSession,
+        semaphore: asyncio.Semaphore,
+        repo_type: str,
+        pushed_after: datetime | None,
+        created_window: CreatedWindow | None,
+    ) -> list[CreatedWindow | None]:
+        async with semaphore:
+            repository_count = await self.count_repositories_per_type_async(
+                session, repo_type, pushed_after, created_window
+            )
+        created_windows, halves = self._divide_created_window(
+            repo_type, created_window, repository_count
+        )
+        windows_per_half = await asyncio.gather(
+            *[
+                self._created_windows_async(
+                    session, semaphore, repo_type, pushed_after, half
+                )
+                for half in halves
+            ]
+        )
+        return created_windows + [window for windows in windows_per_half for window in windows]
+
+    def _all_time(self) -> CreatedWindow:
+        return self.EARLIEST_REPOSITORY_CREATED_AT, datetime.now(timezone.utc).replace(
+            microsecond=0
+        )
+
+    def _created_windows_for_type(
+        self,
+        repo_type: str,
+        pushed_after: datetime | None,
+        checkpoint: PaginationCheckpoint | None,
+    ) -> list[CreatedWindow | None]:
+        """The streams a repository type is searched in. A search returns at most
+        SEARCH_RESULT_LIMIT results, so a type with more is split into created: windows, halved
+        until each holds no more than that. A type that fits is searched whole, as the None window.
+
+        The windows end when they are computed, so they are recorded in the checkpoint and a
+        resumed crawl reuses them rather than computing windows its streams do not match.
+        """
+        if checkpoint is not None:
+            recorded_windows = checkpoint.created_windows(repo_type)
+            if recorded_windows is not None:
+                return recorded_windows
+
+        created_windows = self._created_windows(repo_type, pushed_after, None)
+        if checkpoint is not None:
+            checkpoint.record_created_windows(repo_type, created_windows)
+        return created_windows
+
+    async def _created_windows_for_type_async(
+        self,
+        session: AsyncClientSession,
+        semaphore: asyncio.Semaphore,
+        repo_type: str,
+        pushed_after: datetime | None,
+        checkpoint: PaginationCheckpoint | None,
+    ) -> list[CreatedWindow | None]:
+        if checkpoint is not None:
+            recorded_windows = checkpoint.created_windows(repo_type)
+            if recorded_windows is not None:
+                return recorded_windows
+
+        created_windows = await self._created_windows_async(
+            session, semaphore, repo_type, pushed_after, None
+        )
+        if checkpoint is not None:
+            checkpoint.record_created_windows(repo_type, created_windows)
+        return created_windows
+
+    def _iter_search_pages(
+        self,
+        repo_type: str,
+        after_cursor: str | None,
+        pushed_after: datetime | None,
+        created_window: CreatedWindow | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        stream_name = self._stream_name(repo_type, created_window)
+        page_size = self._new_adaptive_page_size()
+        repos_fetched = 0
+        has_next_page = True
+        while has_next_page:
+            data = _fetch_page_with_adaptive_size(
+                lambda size: self.get_paginated_list_of_repositories_per_type(
+                    repo_type,
+                    after_cursor,
+                    size,
+                    pushed_after=pushed_after,
+                    created_window=created_window,
+                ),
+                page_size,
+            )
+            repos_fetched += len(data["search"]["repos"] or [])
+            self._record_page_progress(
+                stream_name, data, data["search"], repos_fetched, page_size.page_size
+            )
+            self._record_search_truncation(repo_type, created_window, data["search"])
+
+            has_next_page = data["search"]["pageInfo"]["hasNextPage"]
+            after_cursor = data["search"]["pageInfo"]["endCursor"]
+            yield data
+
+    def iter_repositories_in_org(
+        self, pushed_after: datetime | None = None
+    ) -> Iterator[list[dict[str, Any]]]:
+        """Yield the repositories of the organisation a page at a time, as each page is fetched,
+        so they can be evaluated and uploaded without holding the whole organisation in memory.
+        Repository types are split into created: windows in the same way as
+        fetch_all_repositories_in_org.
+
+        Arguments:
+            pushed_after {datetime} -- Only yield repositories pushed to after this time. Defaults to all repositories.
+
+        Yields:
+            list: The active repositories of one page of a repository type
+        """
+        with self.persistent_graphql_session():
+            for repo_type in self.REPOSITORY_TYPES:
+                for created_window in self._created_windows_for_type(
+                    repo_type, pushed_after, None
+                ):
+                    for data in self._iter_search_pages(
+                        repo_type, None, pushed_after, created_window
+                    ):
+                        yield self._active_repositories_in_page(data)
+
+    @retries_github_rate_limit_exception_at_next_reset_once
+    def fetch_all_repositories_in_org(
+        self,
+        pushed_after: datetime | None = None,
+        checkpoint: PaginationCheckpoint | None = None,
+    ) -> list[dict[str, Any]]:
         """A wrapper function to run a GraphQL query to get the list of repositories in the organisation
 
+        Each repository type stream adapts its page size to how quickly GitHub responds, and
+        retries a page that times out or fails with a server error at a smaller size. A search
+        returns at most SEARCH_RESULT_LIMIT results, so a repository type with more is split
+        into created: windows, each paginated as its own stream.
+
+        Arguments:
+            pushed_after {datetime} -- Only return repositories pushed to after this time. Defaults to all repositories.
+            checkpoint {PaginationCheckpoint} -- Resume from, and record each page to, this checkpoint.
+
         Returns:
             list: A list of the organisation repos names
         """
@@ -197,24 +1055,401 @@ class GithubService:
         # Specifically switch off logging for this query as it is very large and doesn't need to be logged
         logging.disabled = True
 
-        for repo_type in ["public", "private", "internal", "forks"]:
-            after_cursor = None
-            has_next_page = True
+        with self.persistent_graphql_session():
+            for repo_type in self.REPOSITORY_TYPES:
+                for created_window in self._created_windows_for_type(
+                    repo_type, pushed_after, checkpoint
+                ):
+                    stream_name = self._stream_name(repo_type, created_window)
+                    after_cursor, has_next_page, repos_per_stream = self._stream_position(
+                        checkpoint, stream_name
+                    )
+                    if has_next_page:
+                        for data in self._iter_search_pages(
+                            repo_type, after_cursor, pushed_after, created_window
+                        ):
+                            repos_per_stream.extend(self._active_repositories_in_page(data))
+                            if checkpoint is not None:
+                                checkpoint.record_page(
+                                    stream_name,
+                                    data["search"]["pageInfo"]["endCursor"],
+                                    data["search"]["pageInfo"]["hasNextPage"],
+                                    repos_per_stream,
+                                )
+                    repos.extend(repos_per_stream)
+
+        # Re-enable logging
+        logging.disabled = False
+        return repos
+
+    @retries_github_rate_limit_exception_at_next_reset_once
+    def fetch_all_repositories_in_org_single_pass(
+        self,
+        pushed_after: datetime | None = None,
+        checkpoint: PaginationCheckpoint | None = None,
+    ) -> list[dict[str, Any]]:
+        """Enumerate organization.repositories once, instead of running a search per repository
+        type. This needs fewer requests, is not limited to SEARCH_RESULT_LIMIT results, and
+        the repositories are deduplicated by name.
+
+        When pushed_after is given, repositories are enumerated most recently pushed first and
+        the enumeration stops at the first repository pushed before it.
+
+        Returns:
+            list: A list of the organisation repos
+        """
+        stream_name = "organisation"
+        after_cursor, has_next_page, repos = self._stream_position(checkpoint, stream_name)
+        page_size = self._new_adaptive_page_size()
+        with self.persistent_graphql_session():
             while has_next_page:
-                data = self.get_paginated_list_of_repositories_per_type(
-                    repo_type, after_cursor
+                data = _fetch_page_with_adaptive_size(
+                    lambda size: self.get_paginated_list_of_organisation_repositories(
+                        after_cursor, size, order_by_pushed_at=pushed_after is not None
+                    ),
+                    page_size,
                 )
+                connection = data["organization"]["repositories"]
 
-                if data["search"]["repos"] is not None:
-                    for repo in data["search"]["repos"]:
-                        if repo["repo"]["isDisabled"] or repo["repo"]["isLocked"]:
-                            continue
-                        repos.append(repo["repo"])
+                reached_pushed_after = False
+                for repo in connection["nodes"] or []:
+                    if pushed_after is not None and (
+                        repo["pushedAt"] is None
+                        or datetime.fromisoformat(repo["pushedAt"]) <= pushed_after
+                    ):
+                        reached_pushed_after = True
+                        break
+                    if not (repo["isDisabled"] or repo["isLocked"]):
+                        repos.append(repo)
+                self._record_page_progress(
+                    stream_name, data, connection, len(repos), page_size.page_size
+                )
 
-                has_next_page = data["search"]["pageInfo"]["hasNextPage"]
-                after_cursor = data["search"]["pageInfo"]["endCursor"]
+                has_next_page = (
+                    connection["pageInfo"]["hasNextPage"] and not reached_pushed_after
+                )
+                after_cursor = connection["pageInfo"]["endCursor"]
+                if checkpoint is not None:
+                    checkpoint.record_page(stream_name, after_cursor, has_next_page, repos)
 
-        # Re-enable logging
-        logging.disabled = False
+        repos_by_name: dict[str, dict[str, Any]] = {}
+        for repo in repos:
+            repos_by_name.setdefault(repo["name"], repo)
+        return list(repos_by_name.values())
+
+    def _list_active_repository_ids(
+        self,
+        repo_type: str,
+        pushed_after: datetime | None,
+        created_window: CreatedWindow | None = None,
+    ) -> list[str]:
+        stream_name = f"{self._stream_name(repo_type, created_window)}:ids"
+        page_size = AdaptivePageSize(
+            self.GITHUB_GQL_MAX_PAGE_SIZE, maximum=self.GITHUB_GQL_MAX_PAGE_SIZE
+        )
+        repository_ids: list[str] = []
+        after_cursor = None
+        has_next_page = True
+        while has_next_page:
+            data = _fetch_page_with_adaptive_size(
+                lambda size: self.get_paginated_list_of_repository_ids_per_type(
+                    repo_type, after_cursor, size, pushed_after, created_window
+                ),
+                page_size,
+            )
+            repository_ids.extend(
+                repo["id"] for repo in self._active_repositories_in_page(data)
+            )
+            self._record_page_progress(
+                stream_name, data, data["search"], len(repository_ids), page_size.page_size
+            )
+            self._record_search_truncation(repo_type, created_window, data["search"])
+            has_next_page = data["search"]["pageInfo"]["hasNextPage"]
+            after_cursor = data["search"]["pageInfo"]["endCursor"]
+        return repository_ids
+
+    def _fetch_repository_details(
+        self, repository_ids: list[str], batch_size: int
+    ) -> list[dict[str, Any]]:
+        stream_name = "details"
+        batch = AdaptivePageSize(batch_size, maximum=self.GITHUB_GQL_MAX_PAGE_SIZE)
+        repos: list[dict[str, Any]] = []
+        position = 0
+        while position < len(repository_ids):
+            data = _fetch_page_with_adaptive_size(
+                lambda size: self.get_repository_details(
+                    repository_ids[position:position + size]
+                ),
+                batch,
+            )
+            # nodes returns one entry per id, null for a repository get_repository_details found
+            # no longer exists
+            position += len(data["nodes"])
+            repos.extend(repo for repo in data["nodes"] if repo is not None)
+            self.rate_limit_scheduler.record(data.get("rateLimit"))
+            self.rate_limit_scheduler.update_demand(
+                f"{self.organisation_name}/{stream_name}",
+                math.ceil((len(repository_ids) - position) / batch.page_size),
+            )
+        return repos
+
+    def _complete_nested_connections(self, repo: dict[str, Any]) -> None:
+        for connection_name in self.NESTED_CONNECTION_DOCUMENTS:
+            connection = repo.get(connection_name)
+            if connection is None:
+                continue
+            while connection["pageInfo"]["hasNextPage"]:
+                data = self.get_paginated_list_of_repository_connection(
+                    repo["id"], connection_name, connection["pageInfo"]["endCursor"]
+                )
+                self.rate_limit_scheduler.record(data.get("rateLimit"))
+                next_page = data["node"]["connection"]
+                connection["edges"] = (connection["edges"] or []) + (
+                    next_page["edges"] or []
+                )
+                connection["pageInfo"] = next_page["pageInfo"]
+
+    def fetch_all_repositories_in_org_two_phase(
+        self,
+        pushed_after: datetime | None = None,
+        batch_size: int = REPOSITORY_DETAILS_BATCH_SIZE,
+    ) -> list[dict[str, Any]]:
+        """Fetch the same list as fetch_all_repositories_in_org in two phases. The first lists
+        the node ids of the active repositories of each type, which is cheap enough to page
+        100 at a time, in the same created: windows as fetch_all_repositories_in_org. The second fetches the details of the repositories in batched
+        nodes(ids:) queries.
+
+        Branch protection rules and topics are fetched inline 10 at a time. For the few
+        repositories with more, the rest are paged through, so the rules the standards are
+        checked against are complete rather than truncated.
+
+        Arguments:
+            pushed_after {datetime} -- Only return repositories pushed to after this time. Defaults to all repositories.
+            batch_size {int} -- The number of repositories to fetch the details of per request.
+
+        Returns:
+            list: A list of the organisation repos, in the same order as fetch_all_repositories_in_org
+        """
+        with self.persistent_graphql_session():
+            repository_ids = [
+                repository_id
+                for repo_type in self.REPOSITORY_TYPES
+                for created_window in self._created_windows_for_type(
+                    repo_type, pushed_after, None
+                )
+                for repository_id in self._list_active_repository_ids(
+                    repo_type, pushed_after, created_window
+                )
+            ]
+            logging.info(f"Listed {len(repository_ids)} repositories")
+
+            repos = self._fetch_repository_details(repository_ids, batch_size)
+            for repo in repos:
+                self._complete_nested_connections(repo)
+        return repos
+
+    def fetch_named_repositories(
+        self,
+        repository_names: list[str],
+        batch_size: int = NAMED_REPOSITORIES_BATCH_SIZE,
+    ) -> list[dict[str, Any]]:
+        """Fetch only the named repositories of the organisation, many at a time in aliased
+        repository(owner:, name:) queries, so a few repositories can be refreshed without
+        crawling the whole organisation.
+
+        Arguments:
+            repository_names {list[str]} -- The names of the repositories to fetch.
+            batch_size {int} -- The number of repositories to fetch per request.
+
+        Returns:
+            list: The active, unarchived repos that were found, in the order they were named
+        """
+        if not 1 <= batch_size <= self.GITHUB_GQL_MAX_PAGE_SIZE:
+            raise ValueError(
+                f"Batch size must be between 1 and {self.GITHUB_GQL_MAX_PAGE_SIZE}, received {batch_size}"
+            )
+        repository_names = list(dict.fromkeys(repository_names))
+        repos = []
+        with self.persistent_graphql_session():
+            for start in range(0, len(repository_names), batch_size):
+                batch = repository_names[start:start + batch_size]
+                data = self.get_named_repositories(batch)
+                self.rate_limit_scheduler.record(data.get("rateLimit"))
+                for index, repository_name in enumerate(batch):
+                    repo = data.get(f"repository{index}")
+                    if repo is None:
+                        logging.warning(
+                            f"Repository {self.organisation_name}/{repository_name} was not found"
+                        )
+                    elif repo["isArchived"]:
+                        logging.info(
+                            f"Repository {self.organisation_name}/{repository_name} is archived"
+                        )
+                    elif not (repo["isDisabled"] or repo["isLocked"]):
+                        self._complete_nested_connections(repo)
+                        repos.append(repo)
         return repos
 
+    def fetch_all_repositories_in_org_concurrently(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        pushed_after: datetime | None = None,
+        checkpoint: PaginationCheckpoint | None = None,
+    ) -> list[dict[str, Any]]:
+        """Fetch the same list as fetch_all_repositories_in_org, but paginate each repository
+        type as its own stream over a single asynchronous GraphQL session. At most
+        max_concurrency pages are in flight at any one time.
+
+        Repository types are split into created: windows in the same way as
+        fetch_all_repositories_in_org, and every window is paginated as its own stream.
+
+        Returns:
+            list: A list of the organisation repos, in the same order as fetch_all_repositories_in_org
+        """
+        if max_concurrency < 1:
+            raise ValueError(
+                f"Max concurrency must be at least 1, received {max_concurrency}"
+            )
+        return asyncio.run(
+            self._fetch_all_repositories_in_org_async(
+                max_concurrency, pushed_after, checkpoint
+            )
+        )
+
+    async def _fetch_all_repositories_in_org_async(
+        self,
+        max_concurrency: int,
+        pushed_after: datetime | None,
+        checkpoint: PaginationCheckpoint | None,
+    ) -> list[dict[str, Any]]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async with self.github_client_gql_api as session:
+            return await self._fetch_all_repositories_in_session_async(
+                session, semaphore, pushed_after, checkpoint
+            )
+
+    async def _fetch_all_repositories_in_session_async(
+        self,
+        session: AsyncClientSession,
+        semaphore: asyncio.Semaphore,
+        pushed_after: datetime | None,
+        checkpoint: PaginationCheckpoint | None,
+    ) -> list[dict[str, Any]]:
+        created_windows_per_type = await asyncio.gather(
+            *[
+                self._created_windows_for_type_async(
+                    session, semaphore, repo_type, pushed_after, checkpoint
+                )
+                for repo_type in self.REPOSITORY_TYPES
+            ]
+        )
+        repos_per_stream = await asyncio.gather(
+            *[
+                self._fetch_repositories_per_type_async(
+                    session,
+                    semaphore,
+                    repo_type,
+                    pushed_after,
+                    checkpoint,
+                    created_window,
+                )
+                for repo_type, created_windows in zip(
+                    self.REPOSITORY_TYPES, created_windows_per_type
+                )
+                for created_window in created_windows
+            ]
+        )
+        return [repo for repos in repos_per_stream for repo in repos]
+
+    def _for_organisation(self, organisation_name: str) -> "GithubService":
+        github_service = copy(self)
+        github_service.organisation_name = organisation_name
+        github_service.graphql_request_count = 0
+        github_service.truncated_streams = set()
+        return github_service
+
+    def fetch_all_repositories_in_enterprise(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        pushed_after: datetime | None = None,
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Crawl every organisation in organisations_in_enterprise concurrently, in the same way
+        as fetch_all_repositories_in_org_concurrently. Each organisation paginates its own
+        streams, but they share one GraphQL session, one concurrency cap and one rate limit
+        budget, as they are crawled with the same token.
+
+        Returns:
+            dict: The repos of each organisation, keyed by organisation name
+        """
+        if max_concurrency < 1:
+            raise ValueError(
+                f"Max concurrency must be at least 1, received {max_concurrency}"
+            )
+        return asyncio.run(
+            self._fetch_all_repositories_in_enterprise_async(max_concurrency, pushed_after)
+        )
+
+    async def _fetch_all_repositories_in_enterprise_async(
+        self, max_concurrency: int, pushed_after: datetime | None
+    ) -> dict[str, list[dict[str, Any]]]:
+        semaphore = asyncio.Semaphore(max_concurrency)
+        organisation_services = [
+            self._for_organisation(organisation_name)
+            for organisation_name in self.organisations_in_enterprise
+        ]
+        async with self.github_client_gql_api as session:
+            repos_per_organisation = await asyncio.gather(
+                *[
+                    organisation_service._fetch_all_repositories_in_session_async(
+                        session, semaphore, pushed_after, None
+                    )
+                    for organisation_service in organisation_services
+                ]
+            )
+        self.graphql_request_count += sum(
+            organisation_service.graphql_request_count
+            for organisation_service in organisation_services
+        )
+        for organisation_service in organisation_services:
+            self.truncated_streams.update(organisation_service.truncated_streams)
+        return dict(zip(self.organisations_in_enterprise, repos_per_organisation))
+
+    async def _fetch_repositories_per_type_async(
+        self,
+        session: AsyncClientSession,
+        semaphore: asyncio.Semaphore,
+        repo_type: str,
+        pushed_after: datetime | None,
+        checkpoint: PaginationCheckpoint | None,
+        created_window: CreatedWindow | None = None,
+    ) -> list[dict[str, Any]]:
+        stream_name = self._stream_name(repo_type, created_window)
+        after_cursor, has_next_page, repos = self._stream_position(
+            checkpoint, stream_name
+        )
+        page_size = self._new_adaptive_page_size()
+        while has_next_page:
+            async with semaphore:
+                data = await _fetch_page_with_adaptive_size_async(
+                    lambda size: self.get_paginated_list_of_repositories_per_type_async(
+                        session,
+                        repo_type,
+                        after_cursor,
+                        size,
+                        pushed_after=pushed_after,
+                        created_window=created_window,
+                    ),
+                    page_size,
+                )
+
+            repos.extend(self._active_repositories_in_page(data))
+            self._record_page_progress(
+                stream_name, data, data["search"], len(repos), page_size.page_size
+            )
+            self._record_search_truncation(repo_type, created_window, data["search"])
+
+            has_next_page = data["search"]["pageInfo"]["hasNextPage"]
+            after_cursor = data["search"]["pageInfo"]["endCursor"]
+            if checkpoint is not None:
+                checkpoint.record_page(stream_name, after_cursor, has_next_page, repos)
+        return repos
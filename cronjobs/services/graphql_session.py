@@ -0,0 +1,44 @@
+"""
+This module contains a synchronous wrapper around a long-lived asynchronous GraphQL session.
+"""
+import asyncio
+from typing import Any
+
+from gql import Client
+from graphql import DocumentNode
+
+
+class PersistentGraphQLSession:
+    """Keep one gql session connected across many synchronous requests.
+
+    Client.execute on an asynchronous transport creates an event loop, connects a new aiohttp
+    session, runs the request and closes everything again, for every request. This keeps one
+    event loop and one connected session, with its keep-alive connection pool, open until
+    close() is called, so every page of a crawl reuses the same connection.
+
+    Arguments:
+        client {Client} -- The gql client whose transport the session connects.
+
+    """
+
+    def __init__(self, client: Client) -> None:
+        self.__client = client
+        self.__loop = asyncio.new_event_loop()
+        try:
+            self.__session = self.__loop.run_until_complete(client.connect_async())
+        except BaseException:
+            self.__loop.close()
+            raise
+
+    def execute(self, document: DocumentNode, variable_values: dict[str, Any]) -> dict[str, Any]:
+        """Execute a parsed GraphQL document on the connected session."""
+        return self.__loop.run_until_complete(
+            self.__session.execute(document, variable_values=variable_values)
+        )
+
+    def close(self) -> None:
+        """Close the session, its connections and the event loop."""
+        try:
+            self.__loop.run_until_complete(self.__client.close_async())
+        finally:
+            self.__loop.close()
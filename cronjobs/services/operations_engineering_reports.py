@@ -1,11 +1,103 @@
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from statistics import median
+from threading import Lock
+from time import monotonic, sleep
+from typing import ClassVar, Iterator
+
 import requests
 
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 
+from cronjobs.services.report_wire_format import (GENERATION_HEADER,
+                                                  GZIP_CONTENT_ENCODING,
+                                                  JSON_CONTENT_TYPE,
+                                                  REPORTS_SCHEMA_VERSION,
+                                                  WIRE_FORMATS, compress_body,
+                                                  encode_legacy_reports,
+                                                  encode_reports,
+                                                  report_content_hash)
+
 # flake8: noqa
 
+
+@dataclass
+class ChunkUpload:
+    """A dataclass used to record how long uploading a chunk of reports took, to tune the chunk size."""
+    start_index: int
+    reports: int
+    body_bytes: int
+    seconds: float
+    status: int
+    attempts: int = 1
+    # The id of the job the API stores the chunk with, when it stores it after answering
+    job_id: str | None = None
+
+    @property
+    def end_index(self) -> int:
+        """The index of the last report in the chunk."""
+        return self.start_index + self.reports - 1
+
+
+def _index_ranges(uploads: list[ChunkUpload]) -> str:
+    """Describe the reports held by the chunks as ranges of indexes, merging adjacent chunks."""
+    ranges: list[list[int]] = []
+    for upload in sorted(uploads, key=lambda upload: upload.start_index):
+        if ranges and ranges[-1][1] + 1 == upload.start_index:
+            ranges[-1][1] = upload.end_index
+        else:
+            ranges.append([upload.start_index, upload.end_index])
+    return ", ".join(f"{start}-{end}" if start != end else f"{start}" for start, end in ranges)
+
+
+@dataclass(frozen=True)
+class UploadOptions:  # pylint: disable=R0902
+    """A dataclass holding how reports are sent to the operations-engineering-reports API.
+
+    Arguments:
+        wire_format {str} -- The format to upload the reports in, json or msgpack. Reports are only
+        sent in it once the API says it reads it, and are otherwise sent as a list of JSON strings.
+        compress {bool} -- Whether to gzip the body of each upload, once the API says it reads gzip.
+        chunk_size {int | None} -- The number of reports in each upload. When None, each chunk holds
+        as many reports as fit in max_chunk_bytes, up to MAX_AUTO_CHUNK_SIZE.
+        max_chunk_bytes {int} -- The largest a chunk of reports may be once encoded, before it is
+        compressed, when chunk_size is None.
+        max_in_flight {int} -- The number of chunks uploaded at once. When more than 1, a failed chunk
+        is retried on its own, up to chunk_attempts times, and the upload carries on with the other
+        chunks before raising with every range of reports that could not be sent.
+        chunk_attempts {int} -- The number of times each chunk is tried when max_in_flight is more than 1.
+        wait_for_jobs {bool} -- Whether an upload waits for the API to store every chunk it accepted.
+        job_timeout_seconds {float} -- How long to wait for the API to store the chunks.
+
+    """
+
+    DEFAULT_CHUNK_SIZE: ClassVar[int] = 10
+    DEFAULT_MAX_CHUNK_BYTES: ClassVar[int] = 256 * 1024
+    DEFAULT_CHUNK_ATTEMPTS: ClassVar[int] = 3
+
+    wire_format: str = "json"
+    compress: bool = True
+    chunk_size: int | None = DEFAULT_CHUNK_SIZE
+    max_chunk_bytes: int = DEFAULT_MAX_CHUNK_BYTES
+    max_in_flight: int = 1
+    chunk_attempts: int = DEFAULT_CHUNK_ATTEMPTS
+    wait_for_jobs: bool = True
+    job_timeout_seconds: float = 900
+
+    def __post_init__(self) -> None:
+        if self.wire_format not in WIRE_FORMATS:
+            raise ValueError(f"Unsupported wire format: {self.wire_format}")
+        if self.chunk_size is not None and self.chunk_size < 1:
+            raise ValueError("The chunk size must be at least 1")
+        if self.max_chunk_bytes < 1:
+            raise ValueError("The maximum chunk size in bytes must be at least 1")
+        if self.max_in_flight < 1 or self.chunk_attempts < 1:
+            raise ValueError("The chunks in flight and the attempts per chunk must be at least 1")
+
+
 class OperationsEngineeringReportsService:
     """Communicate with the operations-engineering-reports API. This service is used to send reports
     to the API, which will then be displayed on the reports page.
@@ -14,13 +106,58 @@ class OperationsEngineeringReportsService:
         url {str} -- The url of the operations-engineering-reports API.
         endpoint {str} -- The endpoint of the operations-engineering-reports API.
         api_key {str} -- The API key to use for the operations-engineering-reports API.
+        options {UploadOptions | None} -- How the reports are sent, the defaults when None.
 
     """
 
-    def __init__(self, url: str, endpoint: str, api_key: str, log_level="INFO") -> None:
+    # The endpoint returning the content hash of every stored report
+    MANIFEST_ENDPOINT = "api/v2/github-reports-manifest"
+    # The endpoint deleting the reports of repositories that are gone
+    TOMBSTONE_ENDPOINT = "api/v2/delete-github-reports"
+    # The endpoint returning the status of the job storing a chunk
+    JOBS_ENDPOINT = "api/v2/jobs"
+    # The endpoint creating and publishing generations of reports
+    GENERATIONS_ENDPOINT = "api/v2/generations"
+    # The endpoint returning the formats the API reads uploads in
+    UPLOAD_FORMATS_ENDPOINT = "api/v2/report-upload-formats"
+    # Bounds how long the API spends writing a single automatically sized chunk
+    MAX_AUTO_CHUNK_SIZE = 100
+    RETRY_BACKOFF_SECONDS = 1.0
+    # Statuses a chunk is retried after, when uploading concurrently. 0 is a request that raised.
+    RETRYABLE_STATUSES = (0, 429, 500, 502, 503, 504)
+    # Stored, or accepted to be stored by a background job
+    ACCEPTED_STATUSES = (200, 202)
+    # Stands in for the status of a chunk the API accepted and confirmed storing none of
+    NOTHING_STORED_STATUS = -1
+    JOB_POLL_SECONDS = 2.0
+    # The status given to a job that succeeded without storing any of its reports
+    NOTHING_STORED = "nothing stored"
+    # A synchronisation refuses to delete more than this fraction of the stored reports, in case
+    # the crawl that produced the reports was incomplete
+    MAX_TOMBSTONE_FRACTION = 0.5
+
+    def __init__(
+        self, url: str, endpoint: str, api_key: str, log_level="INFO", options: UploadOptions | None = None
+    ) -> None:
+        options = options or UploadOptions()
         self.__reports_url = url
         self.__endpoint = endpoint
         self.__api_key = api_key
+        self.__content_type = WIRE_FORMATS[options.wire_format]
+        self.__compress = options.compress
+        self.__chunk_size = options.chunk_size
+        self.__max_chunk_bytes = options.max_chunk_bytes
+        self.__max_in_flight = options.max_in_flight
+        self.__chunk_attempts = options.chunk_attempts
+        self.__wait_for_jobs = options.wait_for_jobs
+        self.__job_timeout_seconds = options.job_timeout_seconds
+        # Whether the API reads the versioned body, None until it has been asked
+        self.__versioned: bool | None = None
+        # Guards falling back to another format, which chunks in flight may do at the same time
+        self.__format_lock = Lock()
+        self.__session = self.__new_session()
+        # How long each chunk uploaded by this service took
+        self.chunk_uploads: list[ChunkUpload] = []
 
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.setLevel(log_level)
@@ -28,39 +165,296 @@ class OperationsEngineeringReportsService:
             "Initialised %s with url: %s, endpoint: %s", self.__class__.__name__, self.__reports_url, self.__endpoint
         )
 
-    def override_repository_standards_reports(self, reports: list[dict]) -> None:
-        """Send a list of GitHubRepositoryStandardsReport objects represented as json objects
+    def override_repository_standards_reports(self, reports: list[dict], generation: str | None = None) -> None:
+        """Send a list of GitHubRepositoryStandardsReport objects represented as dicts
         to the operations-engineering-reports API endpoint. This will overwrite any existing
         reports for the given repositories.
 
         Arguments:
             reports {list[dict]} -- A list of GitHubRepositoryStandardsReport objects represented
-            as json objects.
+            as dicts.
+            generation {str | None} -- The unpublished generation to send the reports to. The
+            upload then always waits for the API to store every chunk.
 
         Raises:
-            Exception: If the status code of the POST request is not 200.
+            Exception: If the status code of the POST request is not 200 or 202. When uploading
+            concurrently, once every chunk has been tried, naming the index ranges of the reports
+            that were not sent. When waiting for jobs, naming the index ranges of the reports the
+            API failed to store.
 
         """
-        #  Batched into groups of 10 due to database limitations
         self.logger.info("Sending %s repository standards reports to API.", len(reports))
-        for i in range(0, len(reports), 10):
-            chunk = reports[i: i + 10]
-            status = self.__http_post(chunk)
-            if status != 200:
-                self.logger.error("Failed to send chunk starting from index %s. Received status: %s", i, status)
-                raise ValueError(f"Failed to send repository standards reports to API. Received: {status}")
-            self.logger.debug("Successfully sent chunk starting from index %s", i)
-
-    def __http_post(self, data: list[dict]) -> int:
-        headers = {
-            "Content-Type": "application/json",
+        if self.__versioned is None:
+            self.__negotiate_upload_format()
+        if self.__max_in_flight > 1:
+            run_uploads = self.__upload_concurrently(reports, generation)
+        else:
+            run_uploads = self.__upload_sequentially(reports, generation)
+        if self.__wait_for_jobs or generation is not None:
+            self.__wait_for_ingestion(run_uploads)
+
+    def publish_repository_standards_reports(self, reports: list[dict]) -> None:
+        """Replace every report the API holds with the given reports, in one atomic switch.
+
+        The reports are sent to a new generation, which readers do not see until every chunk has
+        been stored and the generation is published. A run that fails part way therefore leaves
+        the published reports as they were. The API deletes the older generations once it is published.
+
+        Arguments:
+            reports {list[dict]} -- The report of every repository, represented as dicts.
+
+        Raises:
+            Exception: If there are no reports, or creating, uploading to or publishing the generation fails.
+
+        """
+        if not reports:
+            raise ValueError("Refusing to publish a generation with no repository standards reports")
+        generation = self.__create_generation()
+        self.logger.info("Sending %s repository standards reports to generation %s", len(reports), generation)
+        self.override_repository_standards_reports(reports, generation)
+        self.__publish_generation(generation)
+
+    def __create_generation(self) -> str:
+        url = f"{self.__reports_url}/{self.GENERATIONS_ENDPOINT}"
+        response = self.__session.post(url, headers=self.__api_headers(), timeout=180)
+        if response.status_code != 201:
+            self.logger.error("Failed POST request to %s. Received status: %s", url, response.status_code)
+            raise ValueError(f"Failed to create a generation of repository standards reports. Received: {response.status_code}")
+        return response.json()["generation"]
+
+    def __publish_generation(self, generation: str) -> None:
+        url = f"{self.__reports_url}/{self.GENERATIONS_ENDPOINT}/{generation}/publish"
+        response = self.__session.post(url, headers=self.__api_headers(), timeout=180)
+        if response.status_code != 200:
+            self.logger.error("Failed POST request to %s. Received status: %s", url, response.status_code)
+            raise ValueError(f"Failed to publish generation {generation}. Received: {response.status_code}")
+        self.logger.info("Published generation %s", generation)
+
+    def synchronise_repository_standards_reports(self, reports: list[dict], delete_missing: bool = True) -> None:
+        """Make the reports held by the API match the given reports, sending only what changed.
+
+        The content hash of every stored report is fetched once. Only the reports that are new or
+        whose hash differs are uploaded, and the reports of repositories missing from the given
+        reports are deleted. The given reports must therefore be the reports of every repository.
+
+        Arguments:
+            reports {list[dict]} -- The report of every repository, represented as dicts.
+            delete_missing {bool} -- Whether to delete the reports of repositories missing from the
+            given reports. False when the crawl may not have found every repository.
+
+        Raises:
+            Exception: If fetching the manifest, uploading the reports or deleting the reports fails.
+
+        """
+        stored_hashes = self.__get_manifest()
+        changed = [
+            report for report in reports
+            if stored_hashes.get(report["name"]) != report_content_hash(report)
+        ]
+        names = {report["name"] for report in reports}
+        tombstones = sorted(name for name in stored_hashes if name not in names)
+        self.logger.info(
+            "%s of %s repository standards reports are new or changed, %s stored reports are gone",
+            len(changed), len(reports), len(tombstones))
+
+        if changed:
+            self.override_repository_standards_reports(changed)
+        if tombstones and not delete_missing:
+            self.logger.warning(
+                "Keeping %s stored reports missing from an incomplete set of reports", len(tombstones))
+        elif tombstones:
+            if len(tombstones) > self.MAX_TOMBSTONE_FRACTION * len(stored_hashes):
+                self.logger.error(
+                    "Refusing to delete %s of %s stored reports, the reports may be incomplete",
+                    len(tombstones), len(stored_hashes))
+                raise ValueError(f"Refusing to delete {len(tombstones)} of {len(stored_hashes)} stored reports")
+            self.__delete_reports(tombstones)
+
+    def __get_manifest(self) -> dict[str, str | None]:
+        url = f"{self.__reports_url}/{self.MANIFEST_ENDPOINT}"
+        response = self.__session.get(url, headers=self.__api_headers(), timeout=180)
+        if response.status_code != 200:
+            self.logger.error("Failed GET request to %s. Received status: %s", url, response.status_code)
+            raise ValueError(f"Failed to get the repository standards report manifest. Received: {response.status_code}")
+        manifest = response.json()
+        if manifest.get("schema_version") != REPORTS_SCHEMA_VERSION:
+            raise ValueError(f"Unsupported manifest schema version: {manifest.get('schema_version')}")
+        return manifest["hashes"]
+
+    def __delete_reports(self, names: list[str]) -> None:
+        url = f"{self.__reports_url}/{self.TOMBSTONE_ENDPOINT}"
+        self.logger.info("Deleting %s repository standards reports: %s", len(names), ", ".join(names))
+        response = self.__session.post(
+            url, headers=self.__api_headers(), json={"schema_version": REPORTS_SCHEMA_VERSION, "names": names},
+            timeout=180)
+        if response.status_code != 200:
+            self.logger.error("Failed POST request to %s. Received status: %s", url, response.status_code)
+            raise ValueError(f"Failed to delete repository standards reports. Received: {response.status_code}")
+
+    def __negotiate_upload_format(self) -> None:
+        # An API deployed before the versioned body answers it with 200 and stores none of the
+        # reports, so the configured format is only sent once the API says it reads it
+        url = f"{self.__reports_url}/{self.UPLOAD_FORMATS_ENDPOINT}"
+        try:
+            response = self.__session.get(url, headers=self.__api_headers(), timeout=180)
+            upload_formats = response.json() if response.status_code == 200 else {}
+        except (requests.RequestException, ValueError) as err:
+            self.logger.warning("Failed GET request to %s: %s", url, err)
+            upload_formats = {}
+        if not isinstance(upload_formats, dict) or upload_formats.get("schema_version") != REPORTS_SCHEMA_VERSION:
+            self.logger.warning("The API does not read versioned uploads, sending the reports as a list of JSON strings")
+            self.__versioned = False
+            self.__content_type = JSON_CONTENT_TYPE
+            self.__compress = False
+            return
+        self.__versioned = True
+        if self.__content_type not in upload_formats.get("content_types", []):
+            self.logger.warning("The API does not read %s, sending JSON instead", self.__content_type)
+            self.__content_type = JSON_CONTENT_TYPE
+        # The API deployed before gzip answers a compressed body with 400, which is not fallen back from
+        if self.__compress and GZIP_CONTENT_ENCODING not in upload_formats.get("content_encodings", []):
+            self.logger.warning("The API does not read gzip, sending the reports uncompressed")
+            self.__compress = False
+
+    def __api_headers(self) -> dict[str, str]:
+        return {
             "X-API-KEY": self.__api_key,
             "User-Agent": "reports-service-layer",
         }
 
-        url = f"{self.__reports_url}/{self.__endpoint}"
-        self.logger.debug("Sending POST request to %s with data: %s items", url, len(data))
+    def __upload_sequentially(self, reports: list[dict], generation: str | None) -> list[ChunkUpload]:
+        run_uploads = []
+        try:
+            for i, chunk in self.__chunks(reports):
+                started = monotonic()
+                status, body_bytes, job_id = self.__http_post(chunk, generation)
+                run_uploads.append(
+                    ChunkUpload(i, len(chunk), body_bytes, monotonic() - started, status, job_id=job_id))
+                if status not in self.ACCEPTED_STATUSES:
+                    self.logger.error("Failed to send chunk starting from index %s. Received status: %s", i, status)
+                    raise ValueError(f"Failed to send repository standards reports to API. Received: {status}")
+                self.logger.debug(
+                    "Successfully sent chunk of %s reports starting from index %s in %.3fs", len(chunk), i,
+                    run_uploads[-1].seconds)
+        finally:
+            self.chunk_uploads.extend(run_uploads)
+        self.__log_chunk_latency(run_uploads)
+        return run_uploads
+
+    def __upload_concurrently(self, reports: list[dict], generation: str | None) -> list[ChunkUpload]:
+        def upload(chunk: tuple[int, list[dict]]) -> ChunkUpload:
+            start_index, chunk_reports = chunk
+            return self.__upload_chunk(start_index=start_index, chunk=chunk_reports, generation=generation)
+
+        with ThreadPoolExecutor(max_workers=self.__max_in_flight, thread_name_prefix="upload") as executor:
+            run_uploads = list(executor.map(upload, self.__chunks(reports)))
+        self.chunk_uploads.extend(run_uploads)
+        self.__log_chunk_latency(run_uploads)
+
+        failed = [upload for upload in run_uploads if upload.status not in self.ACCEPTED_STATUSES]
+        if failed:
+            reports_failed = sum(upload.reports for upload in failed)
+            self.logger.error(
+                "Failed to send %s of %s reports in %s chunks. Reports not sent: %s",
+                reports_failed, len(reports), len(failed), _index_ranges(failed))
+            raise ValueError(
+                f"Failed to send repository standards reports {_index_ranges(failed)} to API. "
+                f"Received: {sorted({upload.status for upload in failed})}")
+        return run_uploads
+
+    def __upload_chunk(self, start_index: int, chunk: list[dict], generation: str | None) -> ChunkUpload:
+        started = monotonic()
+        for attempt in range(1, self.__chunk_attempts + 1):
+            try:
+                status, body_bytes, job_id = self.__http_post(chunk, generation)
+            except requests.RequestException as err:
+                self.logger.warning("Chunk starting from index %s raised: %s", start_index, err)
+                status, body_bytes, job_id = 0, 0, None
+            if status not in self.RETRYABLE_STATUSES or attempt == self.__chunk_attempts:
+                break
+            self.logger.warning(
+                "Retrying chunk starting from index %s after status %s, attempt %s of %s",
+                start_index, status, attempt + 1, self.__chunk_attempts)
+            sleep(self.RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+        if status not in self.ACCEPTED_STATUSES:
+            self.logger.error("Failed to send chunk starting from index %s. Received status: %s", start_index, status)
+        return ChunkUpload(start_index, len(chunk), body_bytes, monotonic() - started, status, attempt, job_id)
+
+    def __wait_for_ingestion(self, uploads: list[ChunkUpload]) -> None:
+        pending = {upload.job_id: upload for upload in uploads if upload.job_id is not None}
+        if not pending:
+            return
+        self.logger.info("Waiting for the API to store %s chunks", len(pending))
+        deadline = monotonic() + self.__job_timeout_seconds
+        failed = []
+        while True:
+            for job_id, upload in list(pending.items()):
+                status = self.__get_job_status(job_id)
+                if status in ("succeeded", "failed", self.NOTHING_STORED, None):
+                    del pending[job_id]
+                if status in ("failed", self.NOTHING_STORED, None):
+                    self.logger.error(
+                        "The API failed to store the chunk starting from index %s in job %s", upload.start_index, job_id)
+                    failed.append(upload)
+            if not pending or monotonic() >= deadline:
+                break
+            sleep(self.JOB_POLL_SECONDS)
+
+        if pending:
+            failed.extend(pending.values())
+            self.logger.error("Timed out waiting for the API to store %s chunks", len(pending))
+        if failed:
+            raise ValueError(f"The API failed to store repository standards reports {_index_ranges(failed)}")
+        self.logger.info("The API stored every chunk")
 
+    def __get_job_status(self, job_id: str) -> str | None:
+        """The status of an ingestion job, or None if the API does not know it. A job that
+        succeeded without storing any of its reports is NOTHING_STORED."""
+        url = f"{self.__reports_url}/{self.JOBS_ENDPOINT}/{job_id}"
+        response = self.__session.get(url, headers=self.__api_headers(), timeout=180)
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            # Treated as still running, so the job is asked about again until the timeout
+            self.logger.warning("Failed GET request to %s. Received status: %s", url, response.status_code)
+            return "unknown"
+        job = response.json()
+        if job["status"] == "succeeded" and job.get("reports") and not job.get("reports_written"):
+            return self.NOTHING_STORED
+        return job["status"]
+
+    def close(self) -> None:
+        """Close the pooled connections of the session."""
+        self.__session.close()
+
+    def __chunks(self, reports: list[dict]) -> Iterator[tuple[int, list[dict]]]:
+        if self.__chunk_size is not None:
+            for i in range(0, len(reports), self.__chunk_size):
+                yield i, reports[i: i + self.__chunk_size]
+            return
+
+        start, chunk_bytes = 0, 0
+        for i, report in enumerate(reports):
+            report_bytes = len(json.dumps(report, separators=(",", ":")))
+            if i > start and (chunk_bytes + report_bytes > self.__max_chunk_bytes
+                              or i - start == self.MAX_AUTO_CHUNK_SIZE):
+                yield start, reports[start:i]
+                start, chunk_bytes = i, 0
+            chunk_bytes += report_bytes
+        if start < len(reports):
+            yield start, reports[start:]
+
+    def __log_chunk_latency(self, uploads: list[ChunkUpload]) -> None:
+        if not uploads:
+            return
+        seconds = [upload.seconds for upload in uploads]
+        self.logger.info(
+            "Sent %s chunks of up to %s reports and %s bytes: median %.3fs, max %.3fs, total %.1fs",
+            len(uploads), max(upload.reports for upload in uploads), max(upload.body_bytes for upload in uploads),
+            median(seconds), max(seconds), sum(seconds))
+
+    def __new_session(self) -> requests.Session:
+        # One session for the lifetime of the service, so every chunk reuses the pooled keep-alive connection
         session = requests.Session()
         retry_strategy = Retry(
             total=3,
@@ -68,14 +462,63 @@ class OperationsEngineeringReportsService:
             status_forcelist=[500, 502, 503, 504],
             allowed_methods=["POST"],
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Enough pooled connections for every chunk in flight
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=max(self.__max_in_flight, 10))
         session.mount("http://", adapter)
         session.mount("https://", adapter)
+        return session
+
+    def __http_post(self, data: list[dict], generation: str | None = None) -> tuple[int, int, str | None]:
+        content_type, compress = self.__content_type, self.__compress
+        resp = self.__http_post_as(data, content_type, compress, generation)
+        if resp[0] == 415 and (content_type != JSON_CONTENT_TYPE or compress):
+            # The API does not accept the compact format, so fall back to uncompressed JSON for the rest of the run
+            with self.__format_lock:
+                if self.__content_type == content_type and self.__compress == compress:
+                    self.logger.warning(
+                        "The API does not accept %s%s, sending uncompressed JSON instead",
+                        content_type, " with gzip" if compress else "")
+                    self.__content_type = JSON_CONTENT_TYPE
+                    self.__compress = False
+            resp = self.__http_post_as(data, JSON_CONTENT_TYPE, False, generation)
+        return resp
 
-        resp = session.post(url, headers=headers, json=data,
-                            timeout=180, stream=True).status_code
-        if resp != 200:
+    def __http_post_as(
+        self, data: list[dict], content_type: str, compress: bool, generation: str | None
+    ) -> tuple[int, int, str | None]:
+        headers = {
+            "Content-Type": content_type,
+            "X-API-KEY": self.__api_key,
+            "User-Agent": "reports-service-layer",
+        }
+        if generation is not None:
+            headers[GENERATION_HEADER] = generation
+        body = encode_reports(data, content_type) if self.__versioned else encode_legacy_reports(data)
+        if compress:
+            headers["Content-Encoding"] = GZIP_CONTENT_ENCODING
+            body = compress_body(body)
+
+        url = f"{self.__reports_url}/{self.__endpoint}"
+        self.logger.debug("Sending POST request to %s with data: %s items in %s bytes", url, len(data), len(body))
+
+        response = self.__session.post(url, headers=headers, data=body, timeout=180, stream=True)
+        resp = response.status_code
+        acknowledgement = self.__acknowledgement(response) if resp in self.ACCEPTED_STATUSES else {}
+        # Release the connection back to the pool, as the body is streamed
+        response.close()
+        if data and acknowledgement.get("reports") == 0:
+            self.logger.error("The API accepted the POST request to %s but stored none of its %s reports", url, len(data))
+            resp = self.NOTHING_STORED_STATUS
+        elif resp not in self.ACCEPTED_STATUSES:
             self.logger.error("Failed POST request to %s. Received status: %s", url, resp)
         else:
             self.logger.debug("Successful POST request to %s", url)
-        return resp
+        return resp, len(body), acknowledgement.get("job_id")
+
+    @staticmethod
+    def __acknowledgement(response: requests.Response) -> dict:
+        try:
+            acknowledgement = response.json()
+        except ValueError:
+            return {}
+        return acknowledgement if isinstance(acknowledgement, dict) else {}
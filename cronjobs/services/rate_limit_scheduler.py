@@ -0,0 +1,147 @@
+"""
+This module contains the scheduler used to pace GitHub GraphQL requests so that a crawl fits
+inside the rate limit budget, rather than running into it and waiting for the reset.
+"""
+import asyncio
+import math
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from time import sleep
+from typing import Any
+
+from cronjobs.config.logging_config import logging
+
+
+class GraphQLRateLimitScheduler:
+    """Pace GraphQL requests using the rateLimit { cost limit remaining resetAt } field GitHub
+    returns with every response.
+
+    While the remaining budget covers the pages still to be fetched, requests are not delayed.
+    Once it does not, requests are spread evenly over the time left until the reset, so the
+    budget is never exhausted and a crawl never blocks for a whole reset window. A single
+    scheduler can be shared by every stream, and every organisation, crawled with one token.
+
+    Arguments:
+        reserve {int} -- Points of the budget that are never spent, left for other API users.
+
+    """
+
+    RATE_LIMIT_WINDOW = timedelta(hours=1)
+    RESET_BUFFER = timedelta(seconds=5)
+
+    def __init__(self, reserve: int = 50) -> None:
+        self.reserve = reserve
+        self.__lock = Lock()
+        self.__cost = 1
+        self.__limit: int | None = None
+        self.__remaining: int | None = None
+        self.__reset_at: datetime | None = None
+        self.__next_request_at: datetime | None = None
+        self.__first_response_at: datetime | None = None
+        self.__responses = 0
+        self.__pages_remaining: dict[str, int] = {}
+
+    def record(self, rate_limit: dict[str, Any] | None) -> None:
+        """Record the rateLimit field of a GraphQL response."""
+        if rate_limit is None:
+            return
+        now = datetime.now(timezone.utc)
+        with self.__lock:
+            self.__cost = max(rate_limit["cost"], 1)
+            self.__limit = rate_limit["limit"]
+            self.__remaining = rate_limit["remaining"]
+            self.__reset_at = datetime.fromisoformat(
+                rate_limit["resetAt"].replace("Z", "+00:00")
+            )
+            if self.__first_response_at is None:
+                self.__first_response_at = now
+            self.__responses += 1
+
+    def update_demand(self, stream: str, pages_remaining: int) -> None:
+        """Record how many more pages a stream expects to fetch."""
+        with self.__lock:
+            self.__pages_remaining[stream] = max(pages_remaining, 0)
+
+    @property
+    def pages_remaining(self) -> int:
+        """The number of pages every stream still expects to fetch."""
+        return sum(self.__pages_remaining.values())
+
+    def __usable_requests(self, now: datetime) -> int | None:
+        if self.__remaining is None or self.__reset_at is None or now >= self.__reset_at:
+            return None
+        return (self.__remaining - self.reserve) // self.__cost
+
+    def reserve_request(self) -> float:
+        """Claim the next request slot.
+
+        Returns:
+            float: The number of seconds to wait before making the request
+        """
+        now = datetime.now(timezone.utc)
+        with self.__lock:
+            usable_requests = self.__usable_requests(now)
+            remaining, reset_at = self.__remaining, self.__reset_at
+            if usable_requests is None or remaining is None or reset_at is None:
+                return 0
+
+            if usable_requests > 0 and self.pages_remaining <= usable_requests:
+                return 0
+
+            if usable_requests <= 0:
+                request_at = reset_at + self.RESET_BUFFER
+                interval = timedelta(0)
+            else:
+                request_at = max(now, self.__next_request_at or now)
+                interval = (reset_at - now) / usable_requests
+                # The slot is spent, so the next caller sees one request fewer
+                self.__remaining = remaining - self.__cost
+
+            self.__next_request_at = request_at + interval
+            return (request_at - now).total_seconds()
+
+    def wait(self) -> None:
+        """Block until the next request fits the budget."""
+        seconds = self.reserve_request()
+        if seconds > 0:
+            logging.info(f"Pacing GraphQL requests, waiting {seconds:.1f}s")
+            sleep(seconds)
+
+    async def wait_async(self) -> None:
+        """Wait, without blocking the event loop, until the next request fits the budget."""
+        seconds = self.reserve_request()
+        if seconds > 0:
+            logging.info(f"Pacing GraphQL requests, waiting {seconds:.1f}s")
+            await asyncio.sleep(seconds)
+
+    def projected_finish_time(self) -> datetime | None:
+        """Estimate when the remaining pages will have been fetched, using the throughput seen so
+        far and the number of reset windows the remaining pages need.
+
+        Returns:
+            datetime: The projected finish time, or None before any response has been recorded
+        """
+        now = datetime.now(timezone.utc)
+        with self.__lock:
+            if self.__first_response_at is None or self.__limit is None:
+                return None
+            seconds_per_page = (now - self.__first_response_at) / max(self.__responses - 1, 1)
+            pages_remaining = self.pages_remaining
+            requests_per_window = max((self.__limit - self.reserve) // self.__cost, 1)
+            usable_requests = self.__usable_requests(now)
+            reset_at = self.__reset_at
+            if usable_requests is None or reset_at is None:
+                usable_requests = requests_per_window
+                reset_at = now + self.RATE_LIMIT_WINDOW
+
+            if pages_remaining <= usable_requests:
+                return now + seconds_per_page * pages_remaining
+
+            pages_after_reset = pages_remaining - max(usable_requests, 0)
+            extra_windows = math.ceil(pages_after_reset / requests_per_window)
+            pages_in_last_window = pages_after_reset - (extra_windows - 1) * requests_per_window
+            return (
+                reset_at
+                + self.RATE_LIMIT_WINDOW * (extra_windows - 1)
+                + seconds_per_page * pages_in_last_window
+            )
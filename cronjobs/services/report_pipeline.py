@@ -0,0 +1,158 @@
+"""
+This module contains the pipeline used to overlap fetching repositories, evaluating them against
+the standards and uploading the reports, instead of running each phase to completion in turn.
+"""
+from dataclasses import dataclass, field
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from time import monotonic
+from typing import Any, Callable, Iterable
+
+from cronjobs.config.logging_config import logging
+
+_END_OF_STREAM = object()
+
+
+@dataclass
+class StageStatistics:
+    """A dataclass used to record the throughput of a pipeline stage and the depth of its input queue."""
+    name: str
+    items: int = 0
+    busy_seconds: float = 0.0
+    queue_depths: list = field(default_factory=list)
+
+    @property
+    def items_per_second(self) -> float:
+        """The number of items the stage processed per second it was busy."""
+        return self.items / self.busy_seconds if self.busy_seconds else 0.0
+
+    @property
+    def max_queue_depth(self) -> int:
+        """The deepest the input queue of the stage was when it took an item."""
+        return max(self.queue_depths, default=0)
+
+
+class ReportPipeline:
+    """Run the fetch, evaluate and upload stages of a report run concurrently, each in its own
+    thread, connected by bounded queues. Uploading early pages overlaps fetching later ones, so
+    a run takes about as long as its slowest stage. The bounded queues stop a fast stage from
+    running ahead and holding the whole organisation in memory.
+
+    If any stage fails, the other stages are stopped and the error is raised from run().
+
+    Arguments:
+        pages {Iterable[list[dict]]} -- The pages of repositories, fetched lazily.
+        evaluate {Callable} -- Turns a repository into a report.
+        upload {Callable} -- Uploads a list of reports.
+        queue_size {int} -- The number of pages each queue holds before its producer waits.
+
+    """
+
+    POLL_SECONDS = 0.5
+
+    def __init__(
+        self,
+        pages: Iterable[list[dict[str, Any]]],
+        evaluate: Callable[[dict[str, Any]], Any],
+        upload: Callable[[list[Any]], None],
+        queue_size: int = 4,
+    ) -> None:
+        self.__pages = pages
+        self.__evaluate = evaluate
+        self.__upload = upload
+        self.__repositories: Queue = Queue(maxsize=queue_size)
+        self.__reports: Queue = Queue(maxsize=queue_size)
+        self.__stopped = Event()
+        self.__errors: list[BaseException] = []
+        self.statistics = {
+            "fetch": StageStatistics("fetch"),
+            "evaluate": StageStatistics("evaluate"),
+            "upload": StageStatistics("upload"),
+        }
+
+    def run(self) -> dict[str, StageStatistics]:
+        """Run every stage until the pages are exhausted.
+
+        Returns:
+            dict: The statistics of each stage
+        """
+        started = monotonic()
+        threads = [
+            Thread(target=self.__run_stage, args=(self.__fetch,), name="fetch"),
+            Thread(target=self.__run_stage, args=(self.__evaluate_pages,), name="evaluate"),
+            Thread(target=self.__run_stage, args=(self.__upload_reports,), name="upload"),
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self.__errors:
+            raise self.__errors[0]
+
+        logging.info(f"Pipeline finished in {monotonic() - started:.1f}s")
+        for statistics in self.statistics.values():
+            logging.info(
+                f"Stage {statistics.name}: {statistics.items} repositories, {statistics.busy_seconds:.1f}s busy, {statistics.items_per_second:.1f} repositories/s, max input queue depth {statistics.max_queue_depth}"
+            )
+        return self.statistics
+
+    def __run_stage(self, stage: Callable[[], None]) -> None:
+        try:
+            stage()
+        except BaseException as error:  # pylint: disable=W0718
+            logging.error(f"Pipeline stage failed, stopping the pipeline: {error}")
+            self.__errors.append(error)
+            self.__stopped.set()
+
+    def __put(self, queue: Queue, item: Any) -> None:
+        while not self.__stopped.is_set():
+            try:
+                queue.put(item, timeout=self.POLL_SECONDS)
+                return
+            except Full:
+                continue
+
+    def __get(self, queue: Queue, statistics: StageStatistics) -> Any:
+        while not self.__stopped.is_set():
+            try:
+                item = queue.get(timeout=self.POLL_SECONDS)
+            except Empty:
+                continue
+            if item is not _END_OF_STREAM:
+                # The depth of the queue when the item was taken, counting the item
+                statistics.queue_depths.append(queue.qsize() + 1)
+            return item
+        return _END_OF_STREAM
+
+    def __fetch(self) -> None:
+        statistics = self.statistics["fetch"]
+        pages = iter(self.__pages)
+        while not self.__stopped.is_set():
+            started = monotonic()
+            repos = next(pages, None)
+            statistics.busy_seconds += monotonic() - started
+            if repos is None:
+                break
+            statistics.items += len(repos)
+            self.__put(self.__repositories, repos)
+        self.__put(self.__repositories, _END_OF_STREAM)
+
+    def __evaluate_pages(self) -> None:
+        statistics = self.statistics["evaluate"]
+        while (repos := self.__get(self.__repositories, statistics)) is not _END_OF_STREAM:
+            started = monotonic()
+            reports = [self.__evaluate(repo) for repo in repos]
+            statistics.busy_seconds += monotonic() - started
+            statistics.items += len(reports)
+            self.__put(self.__reports, reports)
+        self.__put(self.__reports, _END_OF_STREAM)
+
+    def __upload_reports(self) -> None:
+        statistics = self.statistics["upload"]
+        while (reports := self.__get(self.__reports, statistics)) is not _END_OF_STREAM:
+            started = monotonic()
+            if reports:
+                self.__upload(reports)
+            statistics.busy_seconds += monotonic() - started
+            statistics.items += len(reports)
@@ -0,0 +1,179 @@
+"""
+This module contains the wire format the reports are uploaded to the operations-engineering-reports
+API in. It is shared by the client in the cronjobs and the ingestion endpoint of the app.
+"""
+import gzip
+import hashlib
+import json
+import zlib
+from typing import Any, BinaryIO
+
+import msgpack
+
+# Increased whenever the body of an upload changes in a way older readers cannot parse
+REPORTS_SCHEMA_VERSION = 1
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+
+GZIP_CONTENT_ENCODING = "gzip"
+
+# The header naming the unpublished generation an upload is written to
+GENERATION_HEADER = "X-Report-Generation"
+
+# The size of each piece of a compressed body read while it is decompressed
+DECOMPRESS_READ_BYTES = 64 * 1024
+
+WIRE_FORMATS = {
+    "json": JSON_CONTENT_TYPE,
+    "msgpack": MSGPACK_CONTENT_TYPE,
+}
+
+
+def encode_reports(reports: list[dict[str, Any]], content_type: str) -> bytes:
+    """Encode the reports as the body of an upload.
+
+    The body is an object holding the schema version and the reports as native objects, with
+    no indentation, so the reports are not serialised twice.
+
+    Arguments:
+        reports {list[dict]} -- The reports to upload.
+        content_type {str} -- The content type to encode the reports in.
+
+    Returns:
+        bytes -- The body of the upload.
+
+    """
+    if content_type not in WIRE_FORMATS.values():
+        raise ValueError(f"Reports cannot be encoded as {content_type}")
+    body = {"schema_version": REPORTS_SCHEMA_VERSION, "reports": reports}
+    if content_type == MSGPACK_CONTENT_TYPE:
+        return msgpack.packb(body)
+    return json.dumps(body, separators=(",", ":")).encode()
+
+
+def encode_legacy_reports(reports: list[dict[str, Any]]) -> bytes:
+    """Encode the reports as the body read by the API before the schema version.
+
+    The body is a JSON list holding each report as a JSON string. It is sent to an API that does
+    not say it reads the versioned body, which it would accept and store none of.
+
+    Arguments:
+        reports {list[dict]} -- The reports to upload.
+
+    Returns:
+        bytes -- The body of the upload.
+
+    """
+    return json.dumps([json.dumps(report) for report in reports]).encode()
+
+
+def decode_reports(body: bytes, content_type: str) -> list[dict[str, Any]]:
+    """Decode the body of an upload into the reports it holds.
+
+    A JSON list of reports, each a JSON string or an object, is also accepted so clients that
+    predate the schema version keep working.
+
+    Arguments:
+        body {bytes} -- The body of the upload.
+        content_type {str} -- The content type of the body.
+
+    Returns:
+        list[dict] -- The reports.
+
+    """
+    if content_type not in WIRE_FORMATS.values():
+        raise ValueError(f"Reports cannot be decoded from {content_type}")
+    if content_type == MSGPACK_CONTENT_TYPE:
+        payload = msgpack.unpackb(body)
+    else:
+        payload = json.loads(body)
+
+    if isinstance(payload, list):
+        reports: Any = [json.loads(report) if isinstance(report, str) else report for report in payload]
+    elif isinstance(payload, dict):
+        if payload.get("schema_version") != REPORTS_SCHEMA_VERSION:
+            raise ValueError(f"Unsupported report schema version: {payload.get('schema_version')}")
+        reports = payload.get("reports")
+    else:
+        raise ValueError("The body does not hold a list of reports")
+
+    if not isinstance(reports, list) or not all(isinstance(report, dict) for report in reports):
+        raise ValueError("The body does not hold a list of reports")
+    return reports
+
+
+def report_content_hash(report: dict[str, Any]) -> str:
+    """A hash of the content of a report, the same however its keys are ordered.
+
+    The client and the API hash a report the same way, so the client can skip uploading the reports
+    whose hash matches the one the API holds.
+
+    Arguments:
+        report {dict} -- The report.
+
+    Returns:
+        str -- The hex digest of the report.
+
+    """
+    canonical = json.dumps(report, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def decode_tombstones(body: bytes) -> list[str]:
+    """Decode the JSON body listing the names of the reports to delete.
+
+    Arguments:
+        body {bytes} -- The body, an object holding the schema version and a list of names.
+
+    Returns:
+        list[str] -- The names of the reports to delete.
+
+    """
+    payload = json.loads(body)
+    if not isinstance(payload, dict) or payload.get("schema_version") != REPORTS_SCHEMA_VERSION:
+        raise ValueError("The body does not hold tombstones of a supported schema version")
+    names = payload.get("names")
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ValueError("The body does not hold a list of report names")
+    return names
+
+
+class BodyTooLargeError(ValueError):
+    """Raised when the body of an upload is larger than the reader allows, once decompressed."""
+
+
+def compress_body(body: bytes) -> bytes:
+    """Compress the body of an upload, to send with the gzip Content-Encoding."""
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+def decompress_body(stream: BinaryIO, max_bytes: int) -> bytes:
+    """Decompress a gzip body while it is read from a stream.
+
+    The body is read and decompressed a piece at a time, so a small body that decompresses to
+    something huge is rejected as soon as it passes max_bytes, rather than once it is all in memory.
+
+    Arguments:
+        stream {BinaryIO} -- The compressed body.
+        max_bytes {int} -- The largest the decompressed body may be.
+
+    Returns:
+        bytes -- The decompressed body.
+
+    """
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    pieces = []
+    size = 0
+    while piece := stream.read(DECOMPRESS_READ_BYTES):
+        try:
+            # Never decompress more than one byte past the limit, whatever the ratio of the piece
+            pieces.append(decompressor.decompress(piece, max_bytes + 1 - size))
+        except zlib.error as err:
+            raise ValueError(f"The body is not valid gzip: {err}") from err
+        size += len(pieces[-1])
+        if size > max_bytes:
+            raise BodyTooLargeError(f"The body is larger than {max_bytes} bytes once decompressed")
+    if not decompressor.eof:
+        raise ValueError("The gzip body is truncated")
+    return b"".join(pieces)
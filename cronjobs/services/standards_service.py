@@ -6,12 +6,40 @@ the Operations Engineering team.
 """
 import json
 from dataclasses import dataclass
+from typing import Callable
+
+
+# The bit of each rule in the failed_rules bitmask of a report. A bit is never reused or moved to
+# another rule. A new rule takes the next free bit, and the version is increased whenever the
+# table changes so readers can tell which table a stored bitmask was built with.
+FAILED_RULE_BITS_VERSION = 1
+FAILED_RULE_BITS: dict[str, int] = {
+    "administrators_require_review": 1 << 0,
+    "default_branch_main": 1 << 1,
+    "has_default_branch_protection": 1 << 2,
+    "has_description": 1 << 3,
+    "has_license": 1 << 4,
+    "has_require_approvals_enabled": 1 << 5,
+    "issues_section_enabled": 1 << 6,
+    "requires_approving_reviews": 1 << 7,
+}
+
+
+def failed_rules_bitmask(compliance_report: dict[str, bool]) -> int:
+    """The bitmask of every rule the compliance report has failed."""
+    bitmask = 0
+    for name, result in compliance_report.items():
+        if result is False:
+            bitmask |= FAILED_RULE_BITS[name]
+    return bitmask
 
 
 @dataclass
 class GitHubRepositoryStandardsReport:
     """A dataclass used to generate a report for a given repository."""
     default_branch: str
+    failed_rules: int
+    failed_rules_version: int
     infractions: list
     is_private: bool
     last_push: str
@@ -26,6 +54,192 @@ class GitHubRepositoryStandardsReport:
         return json.dumps(self, default=lambda o: o.__dict__,
                           sort_keys=True, indent=4)
 
+    def to_dict(self) -> dict:
+        """Convert the dataclass to a dict, to upload in a compact wire format."""
+        return dict(self.__dict__)
+
+
+@dataclass
+class BranchProtectionSummary:
+    """A dataclass holding what the compliance rules need from the branch protection rules of a
+    repository, collected in a single pass over them."""
+    protects_default_branch: bool = False
+    admin_enforced: bool = False
+    requires_approving_reviews: bool = False
+    requires_approval_count: bool = False
+
+    @classmethod
+    def from_repository(cls, gh_repository_data: dict) -> "BranchProtectionSummary":
+        """Summarise the branch protection rules of the raw data of a repository.
+
+        While a rule has a setting, the value of the last such rule is used. The first rule
+        without the setting stops the setting from being read further."""
+        summary = cls()
+        edges = (gh_repository_data["branchProtectionRules"] or {}).get("edges")
+        if edges is None:
+            return summary
+
+        default_branch = None
+        if gh_repository_data["defaultBranchRef"] is not None:
+            default_branch = gh_repository_data["defaultBranchRef"]["name"]
+
+        reading_admin_enforced = reading_approving_reviews = reading_approval_count = True
+        for edge in edges:
+            rule = edge["node"]
+            if default_branch is not None and rule["pattern"] == default_branch:
+                summary.protects_default_branch = True
+
+            if reading_admin_enforced:
+                if rule["isAdminEnforced"] is None:
+                    reading_admin_enforced = False
+                else:
+                    summary.admin_enforced = rule["isAdminEnforced"]
+
+            if reading_approving_reviews:
+                if rule["requiresApprovingReviews"] is None:
+                    reading_approving_reviews = False
+                else:
+                    summary.requires_approving_reviews = rule["requiresApprovingReviews"]
+
+            if reading_approval_count:
+                if rule["requiredApprovingReviewCount"] is None:
+                    reading_approval_count = False
+                elif rule["requiredApprovingReviewCount"] > 0:
+                    summary.requires_approval_count = True
+        return summary
+
+
+@dataclass
+class RepositoryFacts:
+    """A dataclass passed to each compliance rule: the raw GitHub data of a repository and the
+    summary of its branch protection rules."""
+    data: dict
+    branch_protection: BranchProtectionSummary
+
+
+# The compliance rules, in the order they are checked, keyed by the name used in the report
+COMPLIANCE_RULES: dict[str, Callable[[RepositoryFacts], bool]] = {}
+
+
+def compliance_rule(name: str) -> Callable:
+    """Register a function as the check of a standard. The function is given the RepositoryFacts
+    of a repository and returns whether the repository meets the standard."""
+    def register(check: Callable[[RepositoryFacts], bool]) -> Callable[[RepositoryFacts], bool]:
+        if name in COMPLIANCE_RULES:
+            raise ValueError(f"A compliance rule named {name} is already registered")
+        if name not in FAILED_RULE_BITS:
+            raise ValueError(f"The compliance rule {name} needs a bit in FAILED_RULE_BITS")
+        COMPLIANCE_RULES[name] = check
+        return check
+    return register
+
+
+@compliance_rule("administrators_require_review")
+def administrators_require_review(facts: RepositoryFacts) -> bool:
+    return facts.branch_protection.admin_enforced
+
+
+@compliance_rule("default_branch_main")
+def default_branch_main(facts: RepositoryFacts) -> bool:
+    if facts.data["defaultBranchRef"] is None:
+        return False
+    return facts.data["defaultBranchRef"]["name"] == "main"
+
+
+@compliance_rule("has_default_branch_protection")
+def has_default_branch_protection(facts: RepositoryFacts) -> bool:
+    return facts.branch_protection.protects_default_branch
+
+
+@compliance_rule("has_description")
+def has_description(facts: RepositoryFacts) -> bool:
+    return facts.data["description"] is not None
+
+
+@compliance_rule("has_license")
+def has_license(facts: RepositoryFacts) -> bool:
+    return facts.data["licenseInfo"] is not None
+
+
+@compliance_rule("has_require_approvals_enabled")
+def has_require_approvals_enabled(facts: RepositoryFacts) -> bool:
+    return facts.branch_protection.requires_approval_count
+
+
+@compliance_rule("issues_section_enabled")
+def issues_section_enabled(facts: RepositoryFacts) -> bool:
+    return facts.data["hasIssuesEnabled"]
+
+
+@compliance_rule("requires_approving_reviews")
+def requires_approving_reviews(facts: RepositoryFacts) -> bool:
+    return facts.branch_protection.requires_approving_reviews
+
+
+def _repository_facts(gh_repository_data: dict) -> RepositoryFacts:
+    return RepositoryFacts(
+        gh_repository_data, BranchProtectionSummary.from_repository(gh_repository_data))
+
+
+def evaluate_compliance_rules(gh_repository_data: dict) -> dict[str, bool]:
+    """Check the raw GitHub data of a repository against every registered rule, once each."""
+    facts = _repository_facts(gh_repository_data)
+    return {name: check(facts) for name, check in COMPLIANCE_RULES.items()}
+
+
+@dataclass
+class ComplianceBatch:
+    """A dataclass holding the result of checking many repositories against the standards at
+    once, as one column per rule with a result per repository, in the order the repositories
+    were given."""
+    repositories: list
+    columns: dict
+
+    @property
+    def failure_counts(self) -> dict[str, int]:
+        """The number of repositories failing each rule."""
+        return {name: column.count(False) for name, column in self.columns.items()}
+
+    @property
+    def compliant(self) -> list[bool]:
+        """Whether each repository passes every rule."""
+        return [
+            all(column[index] is not False for column in self.columns.values())
+            for index in range(len(self.repositories))
+        ]
+
+    def compliance_report(self, index: int) -> dict[str, bool]:
+        """The result of every rule for the repository at the index."""
+        return {name: column[index] for name, column in self.columns.items()}
+
+    def report_data(self) -> list[dict]:
+        """The report of each repository as a dict, without checking the rules again."""
+        return [
+            RepositoryReport(repository, self.compliance_report(index)).data
+            for index, repository in enumerate(self.repositories)
+        ]
+
+
+def evaluate_repositories(repositories: list[dict]) -> ComplianceBatch:
+    """Check the raw GitHub data of many repositories, such as a whole organisation, against
+    every registered rule in one call. Each rule is applied to every repository in turn to
+    build its column.
+
+    Arguments:
+        repositories {list[dict]} -- The raw data returned from the GitHub API for each repository.
+
+    Returns:
+        ComplianceBatch: The result of every rule for every repository
+    """
+    facts = [_repository_facts(repository) for repository in repositories]
+    return ComplianceBatch(
+        repositories=repositories,
+        columns={
+            name: [check(repository_facts) for repository_facts in facts]
+            for name, check in COMPLIANCE_RULES.items()
+        },
+    )
+
 
 class RepositoryReport:
     """A class used to generate a report for a given repository. The report will represent standards
@@ -34,24 +248,29 @@ class RepositoryReport:
 
     Arguments:
         raw_github_data {dict} -- The raw data returned from the GitHub API for a given repository.
+        compliance_report {dict} -- The result of each rule, if already evaluated by evaluate_repositories.
 
     """
 
-    def __init__(self, raw_github_data) -> None:
+    def __init__(self, raw_github_data, compliance_report: dict[str, bool] | None = None) -> None:
         # A list of reasons why the repository is non-compliant
         self.__infractions = []
         self.gh_repository_data = raw_github_data
-        self.__output = self.__generate_report()
+        self.__output = self.__generate_report(compliance_report)
 
-    def __generate_report(self) -> GitHubRepositoryStandardsReport:
+    def __generate_report(self, compliance_report: dict[str, bool] | None) -> GitHubRepositoryStandardsReport:
+        if compliance_report is None:
+            compliance_report = evaluate_compliance_rules(self.gh_repository_data)
         return GitHubRepositoryStandardsReport(
             name=self.__repo_name(),
-            status=self.__check_compliant(),
+            status=self.__check_compliant(compliance_report),
             last_push=self.__last_push(),
             is_private=self.__is_private(),
             default_branch=self.__default_branch(),
+            failed_rules=failed_rules_bitmask(compliance_report),
+            failed_rules_version=FAILED_RULE_BITS_VERSION,
             url=self.__url(),
-            report=self.__compliance_report(),
+            report=compliance_report,
             infractions=self.__infractions,
             topics=self.__topics()
         )
@@ -61,6 +280,11 @@ class RepositoryReport:
         """Return the report as a json object."""
         return self.__output.to_json()
 
+    @property
+    def data(self) -> dict:
+        """Return the report as a dict."""
+        return self.__output.to_dict()
+
     def __repo_name(self) -> str:
         return self.gh_repository_data["name"]
 
@@ -72,8 +296,8 @@ class RepositoryReport:
     def __url(self) -> str:
         return self.gh_repository_data["url"]
 
-    def __check_compliant(self) -> bool:
-        for key, value in self.__compliance_report().items():
+    def __check_compliant(self, compliance_report: dict[str, bool]) -> bool:
+        for key, value in compliance_report.items():
             if value is False:
                 self.__infractions.append(
                     f"{key} equalling {value} is not compliant")
@@ -87,83 +311,6 @@ class RepositoryReport:
     def __is_private(self) -> bool:
         return self.gh_repository_data["isPrivate"]
 
-    def __compliance_report(self) -> dict:
-        return {
-            "administrators_require_review": self.__has_admin_requires_reviews_enabled(),
-            "default_branch_main": self.__default_branch_main(),
-            "has_default_branch_protection": self.__has_default_branch_protection_enabled(),
-            "has_description": self.__has_description(),
-            "has_license": self.__has_license(),
-            "has_require_approvals_enabled": self.__has_required_approval_review_count_enabled(),
-            "issues_section_enabled": self.__has_issues_enabled(),
-            "requires_approving_reviews": self.__has_requires_approving_reviews_enabled(),
-        }
-
-    def __default_branch_main(self) -> bool:
-        if self.gh_repository_data["defaultBranchRef"] is None:
-            return False
-        return self.gh_repository_data["defaultBranchRef"]["name"] == "main"
-
-    def __has_default_branch_protection_enabled(self) -> bool:
-        default_branch_protection_enabled = False
-        if self.gh_repository_data["defaultBranchRef"] is None or self.gh_repository_data["branchProtectionRules"]["edges"] is None:
-            return default_branch_protection_enabled
-        default_branch = self.gh_repository_data["defaultBranchRef"]["name"]
-        branch_protection_rules = self.gh_repository_data["branchProtectionRules"]["edges"]
-        for branch_protection_rule in branch_protection_rules:
-            branch_rule = branch_protection_rule["node"]["pattern"]
-            if branch_rule == default_branch:
-                default_branch_protection_enabled = True
-                break
-        return default_branch_protection_enabled
-
-    def __has_requires_approving_reviews_enabled(self) -> bool:
-        approving_reviews_enabled = False
-        if self.gh_repository_data["branchProtectionRules"]["edges"] is None:
-            return approving_reviews_enabled
-        branch_protection_rules = self.gh_repository_data["branchProtectionRules"]["edges"]
-        for branch_protection_rule in branch_protection_rules:
-            if branch_protection_rule["node"]["requiresApprovingReviews"] is None:
-                break
-            approving_reviews_enabled = branch_protection_rule["node"]["requiresApprovingReviews"]
-        return approving_reviews_enabled
-
-    def __has_admin_requires_reviews_enabled(self) -> bool:
-        admin_requires_reviews_enabled = False
-        if self.gh_repository_data["branchProtectionRules"]["edges"] is None:
-            return admin_requires_reviews_enabled
-        branch_protection_rules = self.gh_repository_data["branchProtectionRules"]["edges"]
-        for branch_protection_rule in branch_protection_rules:
-            if branch_protection_rule["node"]["isAdminEnforced"] is None:
-                break
-            admin_requires_reviews_enabled = branch_protection_rule["node"]["isAdminEnforced"]
-        return admin_requires_reviews_enabled
-
-    def __has_issues_enabled(self) -> bool:
-        return self.gh_repository_data["hasIssuesEnabled"]
-
-    def __has_required_approval_review_count_enabled(self) -> bool:
-        approval_review_count_enabled = False
-        if self.gh_repository_data["branchProtectionRules"]["edges"] is None:
-            return approval_review_count_enabled
-        branch_protection_rules = self.gh_repository_data["branchProtectionRules"]["edges"]
-        for branch_protection_rule in branch_protection_rules:
-            if branch_protection_rule["node"]["requiredApprovingReviewCount"] is None:
-                break
-            if branch_protection_rule["node"]["requiredApprovingReviewCount"] > 0:
-                approval_review_count_enabled = True
-        return approval_review_count_enabled
-
-    def __has_license(self) -> bool:
-        if self.gh_repository_data["licenseInfo"] is not None:
-            return True
-        return False
-
-    def __has_description(self) -> bool:
-        if self.gh_repository_data["description"] is not None:
-            return True
-        return False
-
     def __topics(self) -> list:
         if self.gh_repository_data["repositoryTopics"] is not None:
             topics = [edge["node"]["topic"]["name"] for edge in self.gh_repository_data["repositoryTopics"]["edges"]]
@@ -11,6 +11,8 @@ FLASK_CONFIGURATION = "development"
 DEBUG = True
 FLASK_DEBUG = True
 MAIL_FROM_EMAIL = "operations-engineering@digital.justice.gov.uk"
+# The largest a decompressed upload of reports may be
+MAX_REPORTS_BODY_BYTES = int(environ.get("MAX_REPORTS_BODY_BYTES", 32 * 1024 * 1024))
 PORT = 4567
 SSL_REDIRECT = False
 TESTING = True
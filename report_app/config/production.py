@@ -7,5 +7,7 @@ AUTH0_CLIENT_ID = environ.get("AUTH0_CLIENT_ID")
 AUTH0_CLIENT_SECRET = environ.get("AUTH0_CLIENT_SECRET")
 AUTH0_DOMAIN = environ.get("AUTH0_DOMAIN")
 MAIL_FROM_EMAIL = "operations-engineering@digital.justice.gov.uk"
+# The largest a decompressed upload of reports may be
+MAX_REPORTS_BODY_BYTES = int(environ.get("MAX_REPORTS_BODY_BYTES", 32 * 1024 * 1024))
 PORT = 4567
 SSL_REDIRECT = False
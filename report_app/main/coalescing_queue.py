@@ -0,0 +1,106 @@
+import logging
+from threading import Condition, Thread
+from time import monotonic
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class CoalescingQueue:
+    """A queue of names that are processed in small batches by a background worker thread.
+
+    A name is only processed once it has waited in the queue for coalesce_seconds. Putting a
+    name that is already waiting does nothing, so a burst of events for the same name within
+    that window causes a single piece of work. A name put while its earlier batch is being
+    processed is queued again, as the batch may have missed the change.
+
+    Attributes:
+        process (Callable): Called with each batch of names
+        coalesce_seconds (float): How long a name waits for duplicates before it is processed
+        batch_size (int): The most names passed to process at once
+        clock (Callable): The monotonic clock used to time the window
+    """
+
+    def __init__(
+        self,
+        process: Callable[[list[str]], None],
+        coalesce_seconds: float = 30.0,
+        batch_size: int = 20,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("The batch size must be at least 1")
+        self._process = process
+        self._coalesce_seconds = coalesce_seconds
+        self._batch_size = batch_size
+        self._clock = clock
+        # Names in the order they were first queued, with the time they were queued
+        self._pending: dict[str, float] = {}
+        self._condition = Condition()
+        self._worker: Thread | None = None
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def put(self, name: str) -> bool:
+        """Queue a name, returning False if it was coalesced into one already waiting."""
+        with self._condition:
+            if name in self._pending:
+                logger.debug("Coalesced %s into the queued event", name)
+                return False
+            self._pending[name] = self._clock()
+            self._condition.notify()
+            return True
+
+    def start(self) -> None:
+        """Start the background worker, if it is not already running."""
+        with self._condition:
+            if self._worker is not None:
+                return
+            self._worker = Thread(target=self._run, name="coalescing-queue", daemon=True)
+            self._worker.start()
+
+    def take_due_batch(self) -> list[str]:
+        """Remove and return up to batch_size names that have waited for the whole window."""
+        with self._condition:
+            return self._take_due_batch()
+
+    def _take_due_batch(self) -> list[str]:
+        now = self._clock()
+        batch: list[str] = []
+        # Names are queued in time order, so the due names are at the front
+        for name, queued_at in self._pending.items():
+            if now - queued_at < self._coalesce_seconds or len(batch) == self._batch_size:
+                break
+            batch.append(name)
+        for name in batch:
+            del self._pending[name]
+        return batch
+
+    def _seconds_until_due(self) -> float | None:
+        if not self._pending:
+            return None
+        oldest = next(iter(self._pending.values()))
+        return max(self._coalesce_seconds - (self._clock() - oldest), 0)
+
+    def process_due_batch(self) -> int:
+        """Process one batch of due names.
+
+        Returns:
+            int: The number of names processed
+        """
+        batch = self.take_due_batch()
+        if batch:
+            try:
+                self._process(batch)
+            except Exception as err:
+                logger.error("Could not process %s: %s", batch, err)
+        return len(batch)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while (seconds := self._seconds_until_due()) is None or seconds > 0:
+                    self._condition.wait(seconds)
+            self.process_due_batch()
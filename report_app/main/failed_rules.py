@@ -0,0 +1,50 @@
+from collections import Counter
+
+from cronjobs.services.standards_service import (FAILED_RULE_BITS,
+                                                 FAILED_RULE_BITS_VERSION)
+
+# How each rule is shown on the home page when a repository fails it
+FAILED_RULE_LABELS = {
+    "administrators_require_review": "Administrators require review",
+    "default_branch_main": "Default branch is not main",
+    "has_default_branch_protection": "Default branch is not protected",
+    "has_description": "Repository has no description",
+    "has_license": "Repository has no license",
+    "has_require_approvals_enabled": "Require approvals is not enabled",
+    "issues_section_enabled": "Issues section is not enabled",
+    "requires_approving_reviews": "Requires approving reviews is not enabled",
+}
+
+
+def failed_rules_bitmask(report_data: dict) -> int:
+    """The bitmask of every rule a stored report has failed
+
+    Reports stored before the bitmask, or with another version of the
+    rule to bit table, have their bitmask rebuilt from the report itself.
+
+    Args:
+        report_data: the data of a stored repository report
+    """
+    if report_data.get("failed_rules_version") == FAILED_RULE_BITS_VERSION:
+        # DynamoDB returns numbers as Decimal
+        return int(report_data["failed_rules"])
+    bitmask = 0
+    for name, result in report_data.get("report", {}).items():
+        if result is False and name in FAILED_RULE_BITS:
+            bitmask |= FAILED_RULE_BITS[name]
+    return bitmask
+
+
+def most_common_failed_rules(bitmasks: list[int], n: int) -> list[tuple[str, int]]:
+    """The labels of the n rules failed by the most repositories, with how many fail each
+
+    Args:
+        bitmasks: the failed rules bitmask of each repository
+        n: the number of rules to return
+    """
+    counts: Counter[str] = Counter()
+    for name, bit in FAILED_RULE_BITS.items():
+        failing = sum(1 for bitmask in bitmasks if bitmask & bit)
+        if failing:
+            counts[FAILED_RULE_LABELS.get(name, name)] = failing
+    return counts.most_common(n)
@@ -0,0 +1,97 @@
+import hashlib
+import hmac
+import logging
+import os
+
+from report_app.main.report_database import ReportDatabase
+
+logger = logging.getLogger(__name__)
+
+# The webhook events that can change the compliance of a repository
+REPOSITORY_EVENTS = ("repository", "branch_protection_rule", "push")
+
+# The repository event actions after which the report under the name of the repository is no longer wanted
+REPORT_REMOVING_ACTIONS = ("archived", "deleted", "renamed")
+
+
+def is_signature_valid(secret: str | None, body: bytes, signature: str | None) -> bool:
+    """Check the X-Hub-Signature-256 header GitHub signs a webhook body with
+
+    Args:
+        secret: the secret the webhook was configured with
+        body: the raw request body
+        signature: the value of the X-Hub-Signature-256 header
+    """
+    if not secret or not signature:
+        return False
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def repository_to_reevaluate(event: str, payload: dict) -> str | None:
+    """The full name of the repository a webhook event affects
+
+    Returns None for events that do not change a report, or for
+    repositories that are archived or no longer exist.
+
+    Args:
+        event: the value of the X-GitHub-Event header
+        payload: the webhook body
+    """
+    if event not in REPOSITORY_EVENTS or "repository" not in payload:
+        return None
+    if event == "repository" and payload.get("action") in ("archived", "deleted"):
+        return None
+    return payload["repository"]["full_name"]
+
+
+def repository_reports_to_delete(event: str, payload: dict) -> list[str]:
+    """The names of the stored reports a webhook event makes obsolete
+
+    The report of a repository that is archived or deleted is removed, as the
+    crawl only reports on active repositories. A renamed repository is reported
+    on under its new name, so the report under its old name is removed.
+
+    Args:
+        event: the value of the X-GitHub-Event header
+        payload: the webhook body
+    """
+    if event != "repository" or payload.get("action") not in REPORT_REMOVING_ACTIONS or "repository" not in payload:
+        return []
+    if payload["action"] == "renamed":
+        old_name = payload.get("changes", {}).get("repository", {}).get("name", {}).get("from")
+        return [old_name] if old_name else []
+    return [payload["repository"]["name"]]
+
+
+def reevaluate_repositories(full_names: list[str]) -> None:
+    """Fetch the repositories, check them against the standards and store their reports
+
+    Args:
+        full_names: the owner/name of each repository
+    """
+    github_token = os.getenv("GITHUB_TOKEN")
+    table_name = os.getenv("DYNAMODB_TABLE_NAME")
+    if not github_token or not table_name:
+        raise ValueError("GITHUB_TOKEN and DYNAMODB_TABLE_NAME must be set to re-evaluate repositories")
+
+    # Imported here rather than with the views, which are imported before the app configures logging.
+    # The cronjobs services configure logging when imported, which does nothing once the app has.
+    # pylint: disable=C0415
+    from cronjobs.services.github_service import GithubService
+    from cronjobs.services.standards_service import \
+        RepositoryReport as StandardsReport
+
+    names_per_owner: dict[str, list[str]] = {}
+    for full_name in full_names:
+        owner, name = full_name.split("/", 1)
+        names_per_owner.setdefault(owner, []).append(name)
+
+    reports: dict[str, dict] = {}
+    for owner, names in names_per_owner.items():
+        logger.info("Re-evaluating %s repositories in %s", len(names), owner)
+        github_service = GithubService(github_token, owner)
+        for repository in github_service.fetch_named_repositories(names):
+            report = StandardsReport(repository).data
+            reports[report["name"]] = report
+    ReportDatabase(table_name).add_repository_reports(reports)
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from queue import Queue
+from threading import Lock, Thread
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class IngestionJobs:
+    """A pool of background worker threads that store uploaded reports after the request has returned.
+
+    Each job is written to a spool directory before it is queued and removed once it succeeds, so
+    jobs queued or running when the process stops are queued again by the next call to start().
+    A job that fails is kept in the spool with a .failed suffix for inspection. The status of every
+    job is written next to the spool, so it can still be polled once the process is restarted. The
+    spool directory must therefore outlive the process, and only one process may use it at a time.
+
+    Attributes:
+        ingest (Callable): Called with the reports of a job, the generation they are written to,
+            and a callback taking the number of reports written so far
+        spool_directory (str): The directory jobs are written to until they succeed
+        workers (int): The number of jobs run at once
+        retained_jobs (int): The number of finished jobs whose status is kept
+    """
+
+    def __init__(
+        self,
+        ingest: Callable[[list[dict], str | None, Callable[[int], None]], None],
+        spool_directory: str,
+        workers: int = 2,
+        retained_jobs: int = 1000,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("There must be at least 1 worker")
+        self._ingest = ingest
+        self._spool_directory = spool_directory
+        self._workers = workers
+        self._retained_jobs = retained_jobs
+        self._jobs: OrderedDict[str, dict] = OrderedDict()
+        self._lock = Lock()
+        self._queue: Queue = Queue()
+        self._threads: list[Thread] = []
+        os.makedirs(spool_directory, exist_ok=True)
+
+    def submit(self, reports: list[dict], generation: str | None = None) -> str:
+        """Spool and queue the reports, returning the id of the job storing them.
+
+        The reports are written to the generation given, or to the published one if it is None.
+        """
+        job_id = uuid.uuid4().hex
+        self._spool(job_id, reports, generation)
+        self._queue_job(job_id, len(reports), generation)
+        return job_id
+
+    def status(self, job_id: str) -> dict | None:
+        """A copy of the status of a job, or None if the job is not known."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def start(self) -> None:
+        """Load the statuses and queue the jobs left in the spool by a previous process, and start
+        the workers, if not already running."""
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                Thread(target=self._run, name=f"ingestion-job-{index}", daemon=True)
+                for index in range(self._workers)
+            ]
+            self._load_statuses()
+        for job_id in self._spooled_job_ids():
+            logger.info("Queueing job %s left in the spool", job_id)
+            self._queue_job(job_id, None, None)
+        for thread in self._threads:
+            thread.start()
+
+    def run_next_job(self) -> None:
+        """Run the next queued job, waiting for one if the queue is empty."""
+        job_id = self._queue.get()
+        self._update(job_id, status=RUNNING, started_at=self._now())
+        try:
+            reports, generation = self._read_spool(job_id)
+            self._update(job_id, reports=len(reports), generation=generation)
+            self._ingest(reports, generation, lambda written: self._update(job_id, reports_written=written))
+        except Exception as err:
+            logger.error("Ingestion job %s failed: %s", job_id, err)
+            self._update(job_id, status=FAILED, error=str(err), finished_at=self._now())
+            try:
+                os.replace(self._spool_path(job_id), self._spool_path(job_id) + ".failed")
+            except FileNotFoundError:
+                logger.warning("Ingestion job %s has no spooled reports to keep", job_id)
+        else:
+            self._update(job_id, status=SUCCEEDED, finished_at=self._now())
+            try:
+                os.remove(self._spool_path(job_id))
+            except FileNotFoundError:
+                logger.warning("Ingestion job %s has no spooled reports to remove", job_id)
+        finally:
+            self._queue.task_done()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.run_next_job()
+            except Exception as err:
+                # A worker that stops leaves every later job queued forever
+                logger.exception("Ingestion worker could not run a job: %s", err)
+
+    def _queue_job(self, job_id: str, reports: int | None, generation: str | None) -> None:
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": QUEUED,
+                "generation": generation,
+                "reports": reports,
+                "reports_written": 0,
+                "submitted_at": self._now(),
+                "started_at": None,
+                "finished_at": None,
+                "error": None,
+            }
+            self._write_status(self._jobs[job_id])
+            self._forget_finished_jobs()
+        self._queue.put(job_id)
+
+    def _forget_finished_jobs(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in (SUCCEEDED, FAILED)]
+        for job_id in finished[:max(len(finished) - self._retained_jobs, 0)]:
+            del self._jobs[job_id]
+            try:
+                os.remove(self._status_path(job_id))
+            except FileNotFoundError:
+                pass
+
+    def _update(self, job_id: str, **changes) -> None:
+        with self._lock:
+            self._jobs[job_id].update(changes)
+            self._write_status(self._jobs[job_id])
+
+    def _status_path(self, job_id: str) -> str:
+        return os.path.join(self._spool_directory, f"{job_id}.status")
+
+    def _write_status(self, job: dict) -> None:
+        # Written to a temporary file and renamed, so a status is never half written
+        temporary_path = self._status_path(job["id"]) + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(job, file, separators=(",", ":"))
+        os.replace(temporary_path, self._status_path(job["id"]))
+
+    def _load_statuses(self) -> None:
+        statuses = [
+            entry for entry in os.scandir(self._spool_directory)
+            if entry.is_file() and entry.name.endswith(".status")
+        ]
+        for entry in sorted(statuses, key=lambda entry: entry.stat().st_mtime):
+            try:
+                with open(entry.path, encoding="utf-8") as file:
+                    job = json.load(file)
+            except (OSError, ValueError) as err:
+                logger.warning("Could not read the status of ingestion job %s: %s", entry.name, err)
+                continue
+            if job["status"] in (QUEUED, RUNNING) and not os.path.exists(self._spool_path(job["id"])):
+                job.update(status=FAILED, error="The spooled reports were lost", finished_at=self._now())
+                self._write_status(job)
+            self._jobs[job["id"]] = job
+
+    def _spool_path(self, job_id: str) -> str:
+        return os.path.join(self._spool_directory, f"{job_id}.json")
+
+    def _spool(self, job_id: str, reports: list[dict], generation: str | None) -> None:
+        # Written to a temporary file and renamed, so a spooled job is never half written
+        temporary_path = self._spool_path(job_id) + ".tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"generation": generation, "reports": reports}, file, separators=(",", ":"))
+        os.replace(temporary_path, self._spool_path(job_id))
+
+    def _read_spool(self, job_id: str) -> tuple[list[dict], str | None]:
+        with open(self._spool_path(job_id), encoding="utf-8") as file:
+            spooled = json.load(file)
+        return spooled["reports"], spooled["generation"]
+
+    def _spooled_job_ids(self) -> list[str]:
+        spooled = [
+            entry for entry in os.scandir(self._spool_directory)
+            if entry.is_file() and entry.name.endswith(".json")
+        ]
+        return [entry.name[:-len(".json")] for entry in sorted(spooled, key=lambda entry: entry.stat().st_mtime)]
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).isoformat()
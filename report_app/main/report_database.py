@@ -1,16 +1,54 @@
 import datetime
 import logging
 import os
+import re
+import uuid
+from threading import Lock
+from time import monotonic, sleep
+from typing import Callable
 
 import boto3
 from botocore.exceptions import ClientError
 from flask import current_app
 
+from cronjobs.services.report_wire_format import report_content_hash
+
 logger = logging.getLogger(__name__)
 
+# The item naming the published generation. GitHub repository names cannot hold a #
+GENERATION_POINTER = "#current-generation"
+
+# Generation ids sort in the order they were created, e.g. 20261018T120000123456Z-1a2b3c4d
+GENERATION_ID_PATTERN = re.compile(r"^\d{8}T\d{12}Z-[0-9a-f]{8}$")
+
+# The reports of each table, with the generation and revision they were read at
+_reports_cache: dict[str, tuple[tuple[str | None, int], list[dict]]] = {}
+_reports_cache_lock = Lock()
+
+
+def is_generation_id(generation: str) -> bool:
+    """Check a generation id is one ReportDatabase.create_generation() could have returned"""
+    return bool(GENERATION_ID_PATTERN.match(generation))
+
 
 class ReportDatabase:
-    """The report database is a client layer that allows you to perform CRUD operations on the DynamoDB table."""
+    """The report database is a client layer that allows you to perform CRUD operations on the DynamoDB table.
+
+    A full run of the reports is written under a new generation, whose items are named
+    <generation>#<repository>, while readers keep seeing the published generation. Publishing
+    the new generation is a single write of the GENERATION_POINTER item, so readers switch
+    from one complete set of reports to the next at once. Reports written in place, such as
+    those from the webhook, go to the published generation and increase the revision held
+    by the pointer, so the generation and revision say whether cached reports are current.
+
+    Until a generation is published, reports are items named after their repository that
+    have no generation.
+    """
+
+    # The most items a single BatchWriteItem request may hold
+    BATCH_WRITE_SIZE = 25
+    BATCH_WRITE_ATTEMPTS = 5
+    BATCH_WRITE_BACKOFF_SECONDS = 0.05
 
     def __init__(self, table_name: str):
         self._table_name = table_name
@@ -58,8 +96,19 @@ class ReportDatabase:
         )
 
     def get_all_repository_reports(self) -> list[dict]:
+        """Get the reports of the published generation.
+
+        The reports are cached per table until the generation or revision of the pointer
+        changes, so a reader costs a single read of the pointer while the reports are current.
+        """
+        generation, revision = self._current_generation()
+        with _reports_cache_lock:
+            cached = _reports_cache.get(self._table_name)
+        if revision is not None and cached is not None and cached[0] == (generation, revision):
+            return list(cached[1])
+
         try:
-            response = self._table.scan()
+            reports = [self._report_from_item(item) for item in self._scan_generation(generation)]
         except ClientError as err:
             logger.error(
                 "Couldn't get all items from table %s. Here's why: %s: %s",
@@ -70,20 +119,89 @@ class ReportDatabase:
             error_msg = f"An error occurred while getting all items from the table: {err}"
             error_response = {'Error': {'Code': '500', 'Message': error_msg}}
             raise ClientError(error_response, 'Scan')
+
+        # Tables that have never had a revision cannot tell when their reports change
+        if revision is not None:
+            with _reports_cache_lock:
+                _reports_cache[self._table_name] = ((generation, revision), reports)
+        return list(reports)
+
+    def _current_generation(self) -> tuple[str | None, int | None]:
+        """The published generation and its revision, each None if there has never been one."""
+        try:
+            response = self._table.get_item(Key={"name": GENERATION_POINTER}, ConsistentRead=True)
+        except ClientError as err:
+            logger.error(
+                "Couldn't get the current generation from table %s. Here's why: %s: %s",
+                self._table.name,
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            error_msg = f"An error occurred while getting the current generation from the table: {err}"
+            error_response = {'Error': {'Code': '500', 'Message': error_msg}}
+            raise ClientError(error_response, 'GetItem')
+        pointer = response.get("Item")
+        if pointer is None:
+            return None, None
+        revision = pointer.get("revision")
+        return pointer.get("current_generation"), int(revision) if revision is not None else None
+
+    def _bump_revision(self) -> None:
+        """Mark the published reports as changed, so cached copies of them are read again."""
+        self._table.update_item(
+            Key={"name": GENERATION_POINTER},
+            UpdateExpression="ADD revision :one",
+            ExpressionAttributeValues={":one": 1},
+        )
+
+    def _scan_generation(self, generation: str | None, **scan_kwargs):
+        """Yield every item of a generation, or the items written before there were generations."""
+        if generation is None:
+            scan_kwargs["FilterExpression"] = "attribute_not_exists(generation) AND #name <> :pointer"
+            scan_kwargs.setdefault("ExpressionAttributeNames", {})["#name"] = "name"
+            scan_kwargs["ExpressionAttributeValues"] = {":pointer": GENERATION_POINTER}
         else:
-            return response["Items"]
+            scan_kwargs["FilterExpression"] = "generation = :generation"
+            scan_kwargs["ExpressionAttributeValues"] = {":generation": generation}
+        while True:
+            response = self._table.scan(**scan_kwargs)
+            yield from response["Items"]
+            if "LastEvaluatedKey" not in response:
+                return
+            scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    @staticmethod
+    def _item_name(generation: str | None, key: str) -> str:
+        return f"{generation}#{key}" if generation is not None else key
+
+    @staticmethod
+    def _report_from_item(item: dict) -> dict:
+        """The report an item holds, named after its repository whatever its generation."""
+        if "repository" not in item:
+            return item
+        report = {name: value for name, value in item.items() if name not in ("repository", "generation")}
+        report["name"] = item["repository"]
+        return report
+
+    @classmethod
+    def _report_item(cls, key: str, value: dict, time: datetime.datetime, generation: str | None = None) -> dict:
+        item = {
+            "name": cls._item_name(generation, key),
+            "data": value,
+            "content_hash": report_content_hash(value),
+            "stored_at": f"{time:%d-%m-%Y %H:%M:%S}",
+        }
+        if generation is not None:
+            item["repository"] = key
+            item["generation"] = generation
+        return item
 
     def add_repository_report(self, key: str, value: dict) -> None:
         time = datetime.datetime.now()
+        generation, _ = self._current_generation()
         try:
-            self._table.put_item(
-                Item={
-                    "name": key,
-                    "data": value,
-                    "stored_at": f"{time:%d-%m-%Y %H:%M:%S}",
-                }
-            )
-            logger.info("Item %s successfully added", key)
+            self._table.put_item(Item=self._report_item(key, value, time, generation))
+            self._bump_revision()
         except ClientError as err:
             logger.error(
                 "Couldn't add item to table. Here's why: %s: %s",
@@ -96,9 +214,235 @@ class ReportDatabase:
         logger.info("Item %s successfully added", key)
         logger.debug("Item value: %s", value)
 
+    def add_repository_reports(
+        self,
+        reports: dict[str, dict],
+        progress: Callable[[int], None] | None = None,
+        generation: str | None = None,
+    ) -> list[float]:
+        """Add many reports, BATCH_WRITE_SIZE at a time, with one BatchWriteItem request per batch.
+
+        Items DynamoDB leaves unprocessed, when the table is throttled, are written again with
+        exponential backoff, up to BATCH_WRITE_ATTEMPTS times per batch.
+
+        Args:
+            reports: the report of each repository, keyed by name
+            progress: called with the number of reports written after each batch
+            generation: the unpublished generation to write to, rather than the published one
+
+        Returns:
+            The seconds each batch took to write, retries included
+        """
+        time = datetime.datetime.now()
+        in_place = generation is None
+        if in_place:
+            generation, _ = self._current_generation()
+        items = [self._report_item(key, value, time, generation) for key, value in reports.items()]
+        batch_seconds = []
+        for start in range(0, len(items), self.BATCH_WRITE_SIZE):
+            batch = items[start: start + self.BATCH_WRITE_SIZE]
+            started = monotonic()
+            attempts = self.__batch_write(batch)
+            batch_seconds.append(monotonic() - started)
+            logger.info(
+                "Batch of %s items successfully added in %.3fs and %s attempts",
+                len(batch), batch_seconds[-1], attempts)
+            if progress is not None:
+                progress(start + len(batch))
+        if in_place and items:
+            self.__bump_revision_after_write('BatchWriteItem')
+        return batch_seconds
+
+    def __bump_revision_after_write(self, operation_name: str) -> None:
+        try:
+            self._bump_revision()
+        except ClientError as err:
+            logger.error(
+                "Couldn't update the revision of the reports. Here's why: %s: %s",
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            error_msg = f"An error occurred while updating the revision of the reports: {err}"
+            error_response = {'Error': {'Code': '500', 'Message': error_msg}}
+            raise ClientError(error_response, operation_name)
+
+    def __batch_write(self, items: list[dict]) -> int:
+        request_items = {self._table_name: [{"PutRequest": {"Item": item}} for item in items]}
+        for attempt in range(1, self.BATCH_WRITE_ATTEMPTS + 1):
+            try:
+                response = self._client.batch_write_item(RequestItems=request_items)
+            except ClientError as err:
+                logger.error(
+                    "Couldn't add items to table. Here's why: %s: %s",
+                    err.response["Error"]["Code"],
+                    err.response["Error"]["Message"],
+                )
+                error_msg = f"An error occurred while adding items to the table: {err}"
+                error_response = {'Error': {'Code': '500', 'Message': error_msg}}
+                raise ClientError(error_response, 'BatchWriteItem')
+            request_items = response.get("UnprocessedItems")
+            if not request_items:
+                return attempt
+            if attempt < self.BATCH_WRITE_ATTEMPTS:
+                logger.warning(
+                    "%s items were not processed, retrying", len(request_items[self._table_name]))
+                sleep(self.BATCH_WRITE_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+        unprocessed = len(request_items[self._table_name])
+        logger.error("Couldn't add %s items to table after %s attempts", unprocessed, self.BATCH_WRITE_ATTEMPTS)
+        error_msg = f"{unprocessed} items were still unprocessed after {self.BATCH_WRITE_ATTEMPTS} attempts"
+        error_response = {'Error': {'Code': '500', 'Message': error_msg}}
+        raise ClientError(error_response, 'BatchWriteItem')
+
+    def get_repository_report_hashes(self) -> dict[str, str | None]:
+        """Get the content hash of every report of the published generation, keyed by name.
+
+        Reports stored before their hash was recorded have a hash of None.
+        """
+        hashes = {}
+        try:
+            generation, _ = self._current_generation()
+            items = self._scan_generation(
+                generation,
+                ProjectionExpression="#name, repository, content_hash",
+                ExpressionAttributeNames={"#name": "name"},
+            )
+            for item in items:
+                hashes[item.get("repository", item["name"])] = item.get("content_hash")
+        except ClientError as err:
+            logger.error(
+                "Couldn't get the report hashes from table %s. Here's why: %s: %s",
+                self._table.name,
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            error_msg = f"An error occurred while getting the report hashes from the table: {err}"
+            error_response = {'Error': {'Code': '500', 'Message': error_msg}}
+            raise ClientError(error_response, 'Scan')
+        return hashes
+
+    def delete_repository_reports(self, keys: list[str]) -> None:
+        """Delete the reports of repositories that no longer exist from the published generation."""
+        try:
+            generation, _ = self._current_generation()
+            with self._table.batch_writer() as batch:
+                for key in keys:
+                    batch.delete_item(Key={"name": self._item_name(generation, key)})
+            if keys:
+                self._bump_revision()
+        except ClientError as err:
+            logger.error(
+                "Couldn't delete items from table. Here's why: %s: %s",
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            error_msg = f"An error occurred while deleting items from the table: {err}"
+            error_response = {'Error': {'Code': '500', 'Message': error_msg}}
+            raise ClientError(error_response, 'BatchWriteItem')
+        logger.info("%s items successfully deleted", len(keys))
+
+    @staticmethod
+    def create_generation() -> str:
+        """A new generation id, later than the id of every generation created before it.
+
+        Nothing is written until reports are added to the generation, and readers do not see
+        them until it is published.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return f"{now:%Y%m%dT%H%M%S%fZ}-{uuid.uuid4().hex[:8]}"
+
+    def publish_generation(self, generation: str) -> None:
+        """Make a generation the one readers see, with a single write of the pointer.
+
+        Raises:
+            ValueError: the generation id is not valid, has no reports, or is older than the published generation
+        """
+        if not is_generation_id(generation):
+            raise ValueError(f"{generation} is not a generation id")
+        # Publishing an empty generation would blank the reports, and pruning would then delete them
+        if not self._generation_has_items(generation):
+            raise ValueError(f"Generation {generation} has no reports")
+        try:
+            self._table.put_item(
+                Item={"name": GENERATION_POINTER, "current_generation": generation, "revision": 0},
+                ConditionExpression="attribute_not_exists(current_generation) OR current_generation < :generation",
+                ExpressionAttributeValues={":generation": generation},
+            )
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                raise ValueError(f"Generation {generation} is not newer than the published generation") from err
+            logger.error(
+                "Couldn't publish generation %s. Here's why: %s: %s",
+                generation,
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            error_msg = f"An error occurred while publishing the generation: {err}"
+            error_response = {'Error': {'Code': '500', 'Message': error_msg}}
+            raise ClientError(error_response, 'PutItem')
+        logger.info("Generation %s published", generation)
+
+    def _generation_has_items(self, generation: str) -> bool:
+        try:
+            items = self._scan_generation(
+                generation, ProjectionExpression="#name", ExpressionAttributeNames={"#name": "name"})
+            return next(items, None) is not None
+        except ClientError as err:
+            logger.error(
+                "Couldn't read generation %s. Here's why: %s: %s",
+                generation,
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            error_msg = f"An error occurred while reading the generation: {err}"
+            error_response = {'Error': {'Code': '500', 'Message': error_msg}}
+            raise ClientError(error_response, 'Scan')
+
+    def prune_generations(self) -> int:
+        """Delete the items of the generations older than the published one, and those written before generations.
+
+        Generations newer than the published one are kept, as they may still be being written.
+
+        Returns:
+            The number of items deleted
+        """
+        generation, _ = self._current_generation()
+        if generation is None:
+            return 0
+        scan_kwargs = {
+            "ProjectionExpression": "#name",
+            "FilterExpression": "#name <> :pointer AND (attribute_not_exists(generation) OR generation < :generation)",
+            "ExpressionAttributeNames": {"#name": "name"},
+            "ExpressionAttributeValues": {":pointer": GENERATION_POINTER, ":generation": generation},
+        }
+        deleted = 0
+        try:
+            with self._table.batch_writer() as batch:
+                while True:
+                    response = self._table.scan(**scan_kwargs)
+                    for item in response["Items"]:
+                        batch.delete_item(Key={"name": item["name"]})
+                        deleted += 1
+                    if "LastEvaluatedKey" not in response:
+                        break
+                    scan_kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except ClientError as err:
+            logger.error(
+                "Couldn't prune the generations before %s. Here's why: %s: %s",
+                generation,
+                err.response["Error"]["Code"],
+                err.response["Error"]["Message"],
+            )
+            error_msg = f"An error occurred while pruning generations from the table: {err}"
+            error_response = {'Error': {'Code': '500', 'Message': error_msg}}
+            raise ClientError(error_response, 'BatchWriteItem')
+        logger.info("%s items of generations before %s deleted", deleted, generation)
+        return deleted
+
     def get_repository_report(self, key: str) -> dict:
         try:
-            response = self._table.get_item(Key={'name': key})
+            generation, _ = self._current_generation()
+            response = self._table.get_item(Key={'name': self._item_name(generation, key)})
         except ClientError as err:
             logger.error(
                 "Couldn't get report %s from table %s. Here's why: %s: %s",
@@ -109,7 +453,7 @@ class ReportDatabase:
             raise ClientError(error_response, 'GetItem')
         else:
             logger.debug("Report %s successfully retrieved with %s", key, response['Item'])
-            return response['Item']
+            return self._report_from_item(response['Item'])
 
     def get_all_compliant_repository_reports(self) -> list[dict]:
         """Get all compliant repository reports from the database."""
@@ -1,6 +1,6 @@
-import json
 import logging
 import os
+from typing import Callable
 
 from report_app.main.report_database import ReportDatabase
 
@@ -15,7 +15,7 @@ class RepositoryReport:
     called by the App.
 
     Attributes:
-        report_data (list[any): A list of repository reports
+        report_data (list[dict]): A list of repository reports
     """
 
     def __init__(self, report_data: list[any]) -> None:
@@ -28,21 +28,29 @@ class RepositoryReport:
         return ReportDatabase(table_name=DYNAMODB_TABLE_NAME)
 
     @property
-    def report_data(self) -> list[str]:
+    def report_data(self) -> list[dict]:
         """A list of repository reports"""
         return self._report_data
 
-    def update_all_github_reports(self) -> None:
-        """Update all the reports in the database after converting the report to json"""
+    def update_all_github_reports(
+        self, progress: Callable[[int], None] | None = None, generation: str | None = None
+    ) -> None:
+        """Update all the reports in the database, in as few batch writes as possible
+
+        Args:
+            progress: called with the number of reports written after each batch
+            generation: the unpublished generation to write to, rather than the published one
+        """
         logging.info("Updating all reports in the database")
+        reports = {}
         for report in self.report_data:
-            try:
-                report = json.loads(report)
-                self._add_report_to_db(report)
-            except Exception as err:
-                logger.error("Could not add report to database: %s", err)
-
-    def _add_report_to_db(self, new_report: dict) -> None:
-        report_name = new_report["name"]
-        logger.info("Adding %s to the database", report_name)
-        self.database_client.add_repository_report(report_name, new_report)
+            if "name" not in report:
+                logger.error("Could not add report to database: the report has no name")
+                continue
+            reports[report["name"]] = report
+        try:
+            batch_seconds = self.database_client.add_repository_reports(reports, progress, generation)
+        except Exception as err:
+            logger.error("Could not add reports to database: %s", err)
+            raise
+        logger.info("Added %s reports in %s batches taking %.3fs", len(reports), len(batch_seconds), sum(batch_seconds))
@@ -1,8 +1,9 @@
 import datetime
 import logging
 import os
-from collections import Counter
+import tempfile
 from functools import wraps
+from threading import Thread
 from urllib.parse import quote_plus, urlencode
 
 from authlib.integrations.flask_client import OAuth
@@ -10,7 +11,24 @@ from flask import (Blueprint, abort, current_app, jsonify, redirect,
                    render_template, render_template_string, request, session,
                    url_for)
 
-from report_app.main.report_database import ReportDatabase
+from cronjobs.services.report_wire_format import (GENERATION_HEADER,
+                                                  GZIP_CONTENT_ENCODING,
+                                                  REPORTS_SCHEMA_VERSION,
+                                                  WIRE_FORMATS,
+                                                  BodyTooLargeError,
+                                                  decode_reports,
+                                                  decode_tombstones,
+                                                  decompress_body)
+from report_app.main.coalescing_queue import CoalescingQueue
+from report_app.main.failed_rules import (failed_rules_bitmask,
+                                          most_common_failed_rules)
+from report_app.main.github_webhook import (is_signature_valid,
+                                            reevaluate_repositories,
+                                            repository_reports_to_delete,
+                                            repository_to_reevaluate)
+from report_app.main.ingestion_jobs import IngestionJobs
+from report_app.main.report_database import (ReportDatabase,
+                                             is_generation_id)
 from report_app.main.repository_report import RepositoryReport
 
 main = Blueprint("main", __name__)
@@ -19,6 +37,12 @@ logger = logging.getLogger(__name__)
 
 AUTHLIB_CLIENT = "authlib.integrations.flask_client"
 
+# Repositories waiting to be re-evaluated after a webhook event, shared by the requests of this process
+_repository_event_queue = None
+
+# Uploaded reports waiting to be stored, shared by the requests of this process
+_ingestion_jobs = None
+
 
 @main.record
 def setup_auth0(setup_state):
@@ -75,29 +99,8 @@ def index():
     compliant_reports = [report for report in all_reports if report['data']['status']]
     non_compliant_reports = [report for report in all_reports if not report['data']['status']]
 
-    all_infractions = [infraction for report in non_compliant_reports for infraction in report['data']['infractions']]
-    human_readable_infractions = []
-    for infraction in all_infractions:
-        match infraction:
-            case "administrators_require_review equalling False is not compliant":
-                human_readable_infractions.append("Administrators require review")
-            case "default_branch_main equalling False is not compliant":
-                human_readable_infractions.append("Default branch is not main")
-            case "has_default_branch_protection equalling False is not compliant":
-                human_readable_infractions.append("Default branch is not protected")
-            case "has_description equalling False is not compliant":
-                human_readable_infractions.append("Repository has no description")
-            case "has_license equalling False is not compliant":
-                human_readable_infractions.append("Repository has no license")
-            case "has_require_approvals_enabled equalling False is not compliant":
-                human_readable_infractions.append("Require approvals is not enabled")
-            case "issues_section_enabled equalling False is not compliant":
-                human_readable_infractions.append("Issues section is not enabled")
-            case "requires_approving_reviews equalling False is not compliant":
-                human_readable_infractions.append("Requires approving reviews is not enabled")
-            case _:
-                human_readable_infractions.append("Unknown infraction")
-    common_infractions = Counter(human_readable_infractions).most_common(3)
+    common_infractions = most_common_failed_rules(
+        [failed_rules_bitmask(report['data']) for report in non_compliant_reports], 3)
 
     return render_template("home.html",
                            total=len(all_reports),
@@ -244,13 +247,21 @@ def gateway_timeout(err):
 def _is_request_correct(the_request):
     """Check request is a POST and has the correct API key
 
+    Args:
+        the_request: the incoming data request object
+    """
+    return the_request.method == "POST" and _has_correct_api_key(the_request)
+
+
+def _has_correct_api_key(the_request):
+    """Check request has the correct API key
+
     Args:
         the_request: the incoming data request object
     """
     correct = False
     if (
-        the_request.method == "POST"
-        and "X-API-KEY" in the_request.headers
+        "X-API-KEY" in the_request.headers
         and the_request.headers.get("X-API-KEY") == os.getenv("API_KEY")
     ):
         logger.debug("is_request_correct(): api key correct")
@@ -265,17 +276,221 @@ def update_github_reports():
     """Update all GitHub repository reports we hold
 
     This will overwrite any existing reports storing each report
-    in the database as a new record.
+    in the database as a new record. An upload with the X-Report-Generation
+    header is written to that unpublished generation instead.
     """
     logger.info("update_github_reports(): received request from %s", request.remote_addr)
     if _is_request_correct(request) is False:
         logger.error("update_github_reports(): incorrect api key, from %s", request.remote_addr)
         abort(400)
 
-    logging.info("update_github_reports(): updating all GitHub reports")
-    RepositoryReport(request.json).update_all_github_reports()
+    if request.mimetype not in WIRE_FORMATS.values():
+        logger.error("update_github_reports(): unsupported content type %s", request.mimetype)
+        abort(415)
+    generation = request.headers.get(GENERATION_HEADER)
+    if generation is not None and not is_generation_id(generation):
+        logger.error("update_github_reports(): %s is not a generation id", generation)
+        abort(400)
+    try:
+        reports = decode_reports(_request_body(request), request.mimetype)
+    except BodyTooLargeError as err:
+        logger.error("update_github_reports(): %s", err)
+        abort(413)
+    except ValueError as err:
+        logger.error("update_github_reports(): could not decode the reports: %s", err)
+        abort(400)
+
+    job_id = _get_ingestion_jobs().submit(reports, generation)
+    logger.info("update_github_reports(): queued %s GitHub reports as job %s", len(reports), job_id)
+    return jsonify({
+        "message": "GitHub reports queued",
+        "job_id": job_id,
+        "reports": len(reports),
+        "status_url": url_for("main.ingestion_job", job_id=job_id),
+    }), 202
+
+
+@main.route("/api/v2/report-upload-formats", methods=["GET"])
+def report_upload_formats():
+    """The formats the GitHub reports can be uploaded in
+
+    A client only sends the versioned body once this says it is read, as
+    releases before it stored none of the reports in such a body.
+    """
+    if not _has_correct_api_key(request):
+        logger.error("report_upload_formats(): incorrect api key, from %s", request.remote_addr)
+        abort(400)
+    return jsonify({
+        "schema_version": REPORTS_SCHEMA_VERSION,
+        "content_types": list(WIRE_FORMATS.values()),
+        "content_encodings": [GZIP_CONTENT_ENCODING],
+    }), 200
+
+
+@main.route("/api/v2/jobs/<job_id>", methods=["GET"])
+def ingestion_job(job_id):
+    """The status of a job storing uploaded GitHub reports
+
+    Args:
+        job_id: the id returned when the reports were uploaded
+    """
+    if not _has_correct_api_key(request):
+        logger.error("ingestion_job(): incorrect api key, from %s", request.remote_addr)
+        abort(400)
+    status = _get_ingestion_jobs().status(job_id)
+    if status is None:
+        abort(404)
+    return jsonify(status), 200
+
+
+def _ingest_reports(reports: list[dict], generation: str | None, progress) -> None:
+    RepositoryReport(reports).update_all_github_reports(progress, generation)
+
+
+def _get_ingestion_jobs() -> IngestionJobs:
+    global _ingestion_jobs  # pylint: disable=W0603
+    if _ingestion_jobs is None:
+        _ingestion_jobs = IngestionJobs(
+            _ingest_reports,
+            os.getenv("INGESTION_SPOOL_DIRECTORY", os.path.join(tempfile.gettempdir(), "ingestion-spool")),
+            workers=int(os.getenv("INGESTION_WORKERS", "2")),
+        )
+        _ingestion_jobs.start()
+    return _ingestion_jobs
+
+
+@main.route("/api/v2/github-reports-manifest", methods=["GET"])
+def github_reports_manifest():
+    """The content hash of every GitHub repository report we hold
+
+    A client compares these with the hashes of its new reports, to only
+    upload the reports that changed and delete the ones that are gone.
+    """
+    if not _has_correct_api_key(request):
+        logger.error("github_reports_manifest(): incorrect api key, from %s", request.remote_addr)
+        abort(400)
+
+    hashes = ReportDatabase(os.getenv("DYNAMODB_TABLE_NAME")).get_repository_report_hashes()
+    return jsonify({"schema_version": REPORTS_SCHEMA_VERSION, "hashes": hashes}), 200
+
+
+@main.route("/api/v2/delete-github-reports", methods=["POST"])
+def delete_github_reports():
+    """Delete the GitHub repository reports of repositories that no longer exist"""
+    if _is_request_correct(request) is False:
+        logger.error("delete_github_reports(): incorrect api key, from %s", request.remote_addr)
+        abort(400)
+    try:
+        names = decode_tombstones(request.get_data())
+    except ValueError as err:
+        logger.error("delete_github_reports(): could not decode the tombstones: %s", err)
+        abort(400)
+
+    logger.info("delete_github_reports(): deleting %s GitHub reports", len(names))
+    ReportDatabase(os.getenv("DYNAMODB_TABLE_NAME")).delete_repository_reports(names)
+    return jsonify({"message": "GitHub reports deleted", "deleted": len(names)}), 200
+
+
+@main.route("/api/v2/generations", methods=["POST"])
+def create_generation():
+    """Start a generation to upload a full set of GitHub reports to
+
+    Readers keep seeing the published reports until the generation is published.
+    """
+    if _is_request_correct(request) is False:
+        logger.error("create_generation(): incorrect api key, from %s", request.remote_addr)
+        abort(400)
+    generation = ReportDatabase.create_generation()
+    logger.info("create_generation(): created generation %s", generation)
+    return jsonify({"generation": generation}), 201
+
+
+@main.route("/api/v2/generations/<generation>/publish", methods=["POST"])
+def publish_generation(generation):
+    """Make a generation of GitHub reports the one readers see
 
-    return jsonify({"message": "GitHub reports updated"}), 200
+    The reports of older generations are deleted in the background.
+
+    Args:
+        generation: the id returned when the generation was created
+    """
+    if _is_request_correct(request) is False:
+        logger.error("publish_generation(): incorrect api key, from %s", request.remote_addr)
+        abort(400)
+    if not is_generation_id(generation):
+        logger.error("publish_generation(): %s is not a generation id", generation)
+        abort(400)
+    database = ReportDatabase(os.getenv("DYNAMODB_TABLE_NAME"))
+    try:
+        database.publish_generation(generation)
+    except ValueError as err:
+        logger.error("publish_generation(): %s", err)
+        abort(409)
+    Thread(target=_prune_generations, args=(database,), name="prune-generations", daemon=True).start()
+    return jsonify({"message": "Generation published", "generation": generation}), 200
+
+
+def _prune_generations(database: ReportDatabase) -> None:
+    try:
+        database.prune_generations()
+    except Exception as err:
+        logger.error("Could not prune the superseded generations: %s", err)
+
+
+def _request_body(this_request) -> bytes:
+    max_bytes = current_app.config.get("MAX_REPORTS_BODY_BYTES", 32 * 1024 * 1024)
+    content_encoding = this_request.headers.get("Content-Encoding", "identity").lower()
+    if content_encoding == GZIP_CONTENT_ENCODING:
+        return decompress_body(this_request.stream, max_bytes)
+    if content_encoding != "identity":
+        logger.error("update_github_reports(): unsupported content encoding %s", content_encoding)
+        abort(415)
+    if this_request.content_length is not None and this_request.content_length > max_bytes:
+        raise BodyTooLargeError(f"The body is larger than {max_bytes} bytes")
+    return this_request.get_data()
+
+
+def _get_repository_event_queue() -> CoalescingQueue:
+    global _repository_event_queue  # pylint: disable=W0603
+    if _repository_event_queue is None:
+        _repository_event_queue = CoalescingQueue(
+            reevaluate_repositories,
+            coalesce_seconds=float(os.getenv("WEBHOOK_COALESCE_SECONDS", "30")),
+        )
+        _repository_event_queue.start()
+    return _repository_event_queue
+
+
+@main.route("/api/v2/github-webhook", methods=["POST"])
+def github_webhook():
+    """Queue the repository a GitHub webhook event is about to be re-evaluated
+
+    Accepts signed repository, branch_protection_rule and push events. Events
+    for the same repository within a short window are re-evaluated once. The
+    report of a repository that is archived, deleted or renamed away is deleted.
+    """
+    if not is_signature_valid(
+        os.getenv("GITHUB_WEBHOOK_SECRET"),
+        request.get_data(),
+        request.headers.get("X-Hub-Signature-256"),
+    ):
+        logger.warning("github_webhook(): invalid signature, from %s", request.remote_addr)
+        abort(403)
+
+    event = request.headers.get("X-GitHub-Event", "")
+    payload = request.get_json(silent=True) or {}
+    names_to_delete = repository_reports_to_delete(event, payload)
+    if names_to_delete:
+        logger.info("github_webhook(): deleting the reports of %s from %s event", ", ".join(names_to_delete), event)
+        ReportDatabase(os.getenv("DYNAMODB_TABLE_NAME")).delete_repository_reports(names_to_delete)
+
+    full_name = repository_to_reevaluate(event, payload)
+    if full_name is None:
+        return jsonify({"message": f"Ignored {event} event"}), 200
+
+    queued = _get_repository_event_queue().put(full_name)
+    logger.info("github_webhook(): %s %s from %s event", "queued" if queued else "coalesced", full_name, event)
+    return jsonify({"message": f"Queued {full_name} for re-evaluation"}), 202
 
 
 @main.route("/api/v2/compliant-repository/<repository_name>", methods=["GET"])
@@ -0,0 +1,40 @@
+import unittest
+
+from cronjobs.services.adaptive_page_size import AdaptivePageSize
+
+
+class TestAdaptivePageSize(unittest.TestCase):
+    def test_rejects_initial_size_outside_bounds(self):
+        self.assertRaises(ValueError, AdaptivePageSize, 101, maximum=100)
+        self.assertRaises(ValueError, AdaptivePageSize, 5, minimum=10)
+
+    def test_grows_after_fast_response(self):
+        page_size = AdaptivePageSize(80, fast_response_seconds=10, growth_step=10)
+        page_size.record_response(1)
+        self.assertEqual(page_size.page_size, 90)
+
+    def test_does_not_grow_after_slow_response(self):
+        page_size = AdaptivePageSize(80, fast_response_seconds=10)
+        page_size.record_response(30)
+        self.assertEqual(page_size.page_size, 80)
+
+    def test_does_not_grow_past_maximum(self):
+        page_size = AdaptivePageSize(95, maximum=100, growth_step=10)
+        page_size.record_response(1)
+        page_size.record_response(1)
+        self.assertEqual(page_size.page_size, 100)
+
+    def test_halves_on_shrink(self):
+        page_size = AdaptivePageSize(80)
+        self.assertTrue(page_size.shrink())
+        self.assertEqual(page_size.page_size, 40)
+
+    def test_does_not_shrink_past_minimum(self):
+        page_size = AdaptivePageSize(15, minimum=10)
+        self.assertTrue(page_size.shrink())
+        self.assertEqual(page_size.page_size, 10)
+        self.assertFalse(page_size.shrink())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, call
+
+from report_app.main.coalescing_queue import CoalescingQueue
+
+
+class TestCoalescingQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.process = MagicMock()
+        self.queue = CoalescingQueue(self.process, coalesce_seconds=30, batch_size=2, clock=lambda: self.now)
+
+    def test_coalesces_duplicate_names_within_window(self):
+        self.assertTrue(self.queue.put("repo1"))
+        self.now = 10
+        self.assertFalse(self.queue.put("repo1"))
+        self.assertEqual(len(self.queue), 1)
+
+    def test_does_not_process_names_before_window_ends(self):
+        self.queue.put("repo1")
+        self.now = 29
+        self.assertEqual(self.queue.process_due_batch(), 0)
+        self.process.assert_not_called()
+
+    def test_processes_due_names_in_batches(self):
+        for name in ["repo1", "repo2", "repo3"]:
+            self.queue.put(name)
+        self.now = 30
+        self.assertEqual(self.queue.process_due_batch(), 2)
+        self.assertEqual(self.queue.process_due_batch(), 1)
+        self.process.assert_has_calls([call(["repo1", "repo2"]), call(["repo3"])])
+
+    def test_only_takes_names_that_have_waited_the_whole_window(self):
+        self.queue.put("repo1")
+        self.now = 20
+        self.queue.put("repo2")
+        self.now = 30
+        self.assertEqual(self.queue.take_due_batch(), ["repo1"])
+
+    def test_requeues_name_after_it_was_taken(self):
+        self.queue.put("repo1")
+        self.now = 30
+        self.queue.take_due_batch()
+        self.assertTrue(self.queue.put("repo1"))
+
+    def test_logs_and_continues_when_processing_fails(self):
+        self.process.side_effect = ValueError("error")
+        self.queue.put("repo1")
+        self.now = 30
+        self.assertEqual(self.queue.process_due_batch(), 1)
+        self.assertEqual(len(self.queue), 0)
+
+    def test_throws_value_error_when_batch_size_invalid(self):
+        self.assertRaises(ValueError, CoalescingQueue, self.process, batch_size=0)
+
+    def test_worker_processes_queued_names(self):
+        processed = MagicMock()
+        queue = CoalescingQueue(processed, coalesce_seconds=0)
+        queue.start()
+        queue.put("repo1")
+        for _ in range(100):
+            if processed.called:
+                break
+            threading.Event().wait(0.01)
+        processed.assert_called_once_with(["repo1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from freezegun import freeze_time
+
+from cronjobs.services.crawl_state import CrawlState, PaginationCheckpoint
+
+
+class TestCrawlState(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "crawl-state.json")
+        self.run_started_at = datetime(2023, 2, 1, tzinfo=timezone.utc)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_missing_file_requires_full_crawl(self):
+        crawl_state = CrawlState(self.path)
+        self.assertIsNone(crawl_state.last_successful_run)
+        self.assertEqual(crawl_state.repositories, {})
+
+    def test_save_and_load(self):
+        crawl_state = CrawlState(self.path)
+        crawl_state.replace([{"name": "repo1"}, {"name": "repo2"}])
+        crawl_state.save(self.run_started_at)
+
+        loaded_crawl_state = CrawlState(self.path)
+        self.assertEqual(loaded_crawl_state.last_successful_run, self.run_started_at)
+        self.assertEqual(sorted(loaded_crawl_state.repositories), ["repo1", "repo2"])
+
+    def test_merge_replaces_changed_repositories_and_keeps_unchanged(self):
+        crawl_state = CrawlState(self.path)
+        crawl_state.replace([{"name": "repo1", "pushedAt": "old"}, {"name": "repo2"}])
+        repos = crawl_state.merge([{"name": "repo1", "pushedAt": "new"}, {"name": "repo3"}])
+
+        self.assertEqual(len(repos), 3)
+        self.assertEqual(crawl_state.repositories["repo1"]["pushedAt"], "new")
+        self.assertIn("repo2", crawl_state.repositories)
+
+    def test_replace_discards_stored_repositories(self):
+        crawl_state = CrawlState(self.path)
+        crawl_state.replace([{"name": "repo1"}])
+        repos = crawl_state.replace([{"name": "repo2"}])
+        self.assertEqual(repos, [{"name": "repo2"}])
+
+    def test_full_crawl_is_due_without_one(self):
+        self.assertTrue(CrawlState(self.path).full_crawl_due())
+
+    @freeze_time("2023-02-05")
+    def test_full_crawl_is_due_once_the_last_is_too_old(self):
+        crawl_state = CrawlState(self.path)
+        crawl_state.replace([{"name": "repo1"}])
+        crawl_state.save(self.run_started_at)
+
+        self.assertFalse(CrawlState(self.path, timedelta(days=7)).full_crawl_due())
+        self.assertTrue(CrawlState(self.path, timedelta(days=3)).full_crawl_due())
+
+    def test_incremental_run_keeps_time_of_last_full_crawl(self):
+        crawl_state = CrawlState(self.path)
+        crawl_state.replace([{"name": "repo1"}])
+        crawl_state.save(self.run_started_at)
+
+        incremental_crawl_state = CrawlState(self.path)
+        incremental_crawl_state.merge([{"name": "repo2"}])
+        incremental_crawl_state.save(self.run_started_at + timedelta(days=1))
+
+        loaded_crawl_state = CrawlState(self.path)
+        self.assertEqual(loaded_crawl_state.last_full_crawl, self.run_started_at)
+        self.assertEqual(loaded_crawl_state.last_successful_run, self.run_started_at + timedelta(days=1))
+
+    def test_save_writes_start_time(self):
+        crawl_state = CrawlState(self.path)
+        crawl_state.save(self.run_started_at)
+        with open(self.path, encoding="utf-8") as file:
+            self.assertEqual(json.load(file)["last_successful_run"], "2023-02-01T00:00:00+00:00")
+
+
+class TestPaginationCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "checkpoint.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_new_checkpoint_starts_from_first_page(self):
+        checkpoint = PaginationCheckpoint(self.path, "test_org")
+        self.assertEqual(checkpoint.position("public"), (None, True, []))
+
+    def test_resumes_from_recorded_page(self):
+        PaginationCheckpoint(self.path, "test_org").record_page(
+            "public", "test_cursor", True, [{"name": "repo1"}]
+        )
+        checkpoint = PaginationCheckpoint(self.path, "test_org")
+        self.assertEqual(
+            checkpoint.position("public"), ("test_cursor", True, [{"name": "repo1"}])
+        )
+        self.assertEqual(checkpoint.position("private"), (None, True, []))
+
+    def test_resumes_recorded_created_windows(self):
+        created_windows = [
+            (
+                datetime(2008, 1, 1, tzinfo=timezone.utc),
+                datetime(2020, 1, 1, tzinfo=timezone.utc),
+            ),
+            None,
+        ]
+        PaginationCheckpoint(self.path, "test_org").record_created_windows(
+            "public", created_windows
+        )
+        with freeze_time(datetime.now(timezone.utc) + timedelta(hours=1)):
+            checkpoint = PaginationCheckpoint(self.path, "test_org")
+        self.assertEqual(checkpoint.created_windows("public"), created_windows)
+        self.assertIsNone(checkpoint.created_windows("private"))
+
+    def test_discards_checkpoint_of_another_crawl(self):
+        PaginationCheckpoint(self.path, "test_org").record_page(
+            "public", "test_cursor", True, [{"name": "repo1"}]
+        )
+        checkpoint = PaginationCheckpoint(
+            self.path, "test_org", datetime(2023, 2, 1, tzinfo=timezone.utc)
+        )
+        self.assertEqual(checkpoint.position("public"), (None, True, []))
+
+    def test_discards_expired_checkpoint(self):
+        with freeze_time("2023-02-01"):
+            PaginationCheckpoint(self.path, "test_org").record_page(
+                "public", "test_cursor", True, []
+            )
+        with freeze_time("2023-02-03"):
+            checkpoint = PaginationCheckpoint(
+                self.path, "test_org", max_age=timedelta(days=1)
+            )
+        self.assertEqual(checkpoint.position("public"), (None, True, []))
+
+    def test_clear_removes_file(self):
+        checkpoint = PaginationCheckpoint(self.path, "test_org")
+        checkpoint.record_page("public", "test_cursor", False, [])
+        checkpoint.clear()
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from decimal import Decimal
+
+from cronjobs.services.standards_service import (FAILED_RULE_BITS,
+                                                 FAILED_RULE_BITS_VERSION)
+from report_app.main.failed_rules import (FAILED_RULE_LABELS,
+                                          failed_rules_bitmask,
+                                          most_common_failed_rules)
+
+
+def stored_report(name, failed_rules):
+    return {
+        "name": name,
+        "data": {
+            "name": name,
+            "failed_rules": Decimal(sum(FAILED_RULE_BITS[rule] for rule in failed_rules)),
+            "failed_rules_version": Decimal(FAILED_RULE_BITS_VERSION),
+            "report": {rule: rule not in failed_rules for rule in FAILED_RULE_BITS},
+        },
+    }
+
+
+class TestFailedRulesBitmask(unittest.TestCase):
+
+    def test_every_rule_has_a_label(self):
+        self.assertEqual(FAILED_RULE_LABELS.keys(), FAILED_RULE_BITS.keys())
+
+    def test_bits_are_distinct(self):
+        bits = list(FAILED_RULE_BITS.values())
+        self.assertEqual(len(set(bits)), len(bits))
+        self.assertTrue(all(bit & (bit - 1) == 0 for bit in bits))
+
+    def test_stored_bitmask(self):
+        report = stored_report("repo", ["has_license", "has_description"])
+        self.assertEqual(
+            failed_rules_bitmask(report["data"]),
+            FAILED_RULE_BITS["has_license"] | FAILED_RULE_BITS["has_description"])
+
+    def test_rebuilds_bitmask_of_report_without_one(self):
+        report_data = {"report": {"has_license": False, "has_description": True, "retired_rule": False}}
+        self.assertEqual(failed_rules_bitmask(report_data), FAILED_RULE_BITS["has_license"])
+
+    def test_rebuilds_bitmask_of_other_version(self):
+        report_data = {
+            "failed_rules": 1 << 30,
+            "failed_rules_version": FAILED_RULE_BITS_VERSION + 1,
+            "report": {"default_branch_main": False},
+        }
+        self.assertEqual(failed_rules_bitmask(report_data), FAILED_RULE_BITS["default_branch_main"])
+
+
+class TestFailedRulesAggregations(unittest.TestCase):
+
+    def setUp(self):
+        self.reports = [
+            stored_report("repo-1", ["has_license", "has_description"]),
+            stored_report("repo-2", ["has_license"]),
+            stored_report("repo-3", ["has_license", "default_branch_main", "has_description"]),
+            stored_report("repo-4", []),
+        ]
+
+    def test_most_common_failed_rules(self):
+        bitmasks = [failed_rules_bitmask(report["data"]) for report in self.reports]
+        self.assertEqual(most_common_failed_rules(bitmasks, 2), [
+            ("Repository has no license", 3),
+            ("Repository has no description", 2),
+        ])
+
+    def test_most_common_failed_rules_skips_rules_no_repository_fails(self):
+        self.assertEqual(most_common_failed_rules([0, 0], 3), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
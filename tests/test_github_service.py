@@ -1,14 +1,19 @@
+import asyncio
 import unittest
-from datetime import datetime
-from unittest.mock import MagicMock, Mock, call, patch
+from datetime import datetime, timedelta, timezone
+from unittest.mock import ANY, AsyncMock, MagicMock, Mock, call, patch
 
 from freezegun import freeze_time
 from github import Github, RateLimitExceededException
-from gql.transport.exceptions import TransportServerError
+from gql.transport.exceptions import TransportQueryError, TransportServerError
 
 from cronjobs.services.github_service import (
+    GRAPHQL_DOCUMENTS,
     GithubService,
     retries_github_rate_limit_exception_at_next_reset_once,
+    retries_github_rate_limit_exception_at_next_reset_once_async,
+    retries_github_server_error_with_backoff,
+    retries_github_server_error_with_backoff_async,
 )
 
 # pylint: disable=E1101
@@ -79,6 +84,17 @@ class TestRetriesGithubRateLimitExceptionAtNextResetOnce(unittest.TestCase):
         )
         mock_function.assert_has_calls([call(mock_github_service, "test_arg")])
 
+    def test_server_error_is_not_retried(self):
+        mock_function = Mock(side_effect=TransportServerError("Bad Gateway", 502))
+        mock_github_service = Mock(GithubService)
+        self.assertRaises(
+            TransportServerError,
+            retries_github_rate_limit_exception_at_next_reset_once(mock_function),
+            mock_github_service,
+            "test_arg",
+        )
+        mock_function.assert_called_once()
+
     @freeze_time("2023-02-01")
     def test_rate_limit_exception_raised_when_transport_query_error_raised_twice(self):
         mock_function = Mock(
@@ -100,6 +116,93 @@ class TestRetriesGithubRateLimitExceptionAtNextResetOnce(unittest.TestCase):
         )
 
 
+class TestRetriesGithubRateLimitExceptionAtNextResetOnceAsync(unittest.TestCase):
+    @freeze_time("2023-02-01")
+    def test_coroutine_is_awaited_twice_when_transport_server_error_raised_once(self):
+        mock_coroutine = AsyncMock(
+            side_effect=[TransportServerError(Mock(), Mock()), "test_result"]
+        )
+        mock_github_client = Mock(Github)
+        mock_github_client.get_rate_limit().graphql.reset = datetime.now()
+        mock_github_service = Mock(
+            GithubService, github_client_core_api=mock_github_client
+        )
+        result = asyncio.run(
+            retries_github_rate_limit_exception_at_next_reset_once_async(
+                mock_coroutine
+            )(mock_github_service, "test_arg")
+        )
+        self.assertEqual(result, "test_result")
+        self.assertEqual(mock_coroutine.await_count, 2)
+
+    @freeze_time("2023-02-01")
+    def test_transport_server_error_raised_when_raised_twice(self):
+        mock_coroutine = AsyncMock(
+            side_effect=[
+                TransportServerError(Mock(), Mock()),
+                TransportServerError(Mock(), Mock()),
+            ]
+        )
+        mock_github_client = Mock(Github)
+        mock_github_client.get_rate_limit().graphql.reset = datetime.now()
+        mock_github_service = Mock(
+            GithubService, github_client_core_api=mock_github_client
+        )
+        with self.assertRaises(TransportServerError):
+            asyncio.run(
+                retries_github_rate_limit_exception_at_next_reset_once_async(
+                    mock_coroutine
+                )(mock_github_service, "test_arg")
+            )
+
+
+@patch("cronjobs.services.github_service.sleep")
+class TestRetriesGithubServerErrorWithBackoff(unittest.TestCase):
+    def test_retries_server_error_with_exponential_backoff(self, mock_sleep):
+        mock_function = Mock(
+            side_effect=[
+                TransportServerError("Bad Gateway", 502),
+                TransportServerError("Bad Gateway", 502),
+                "test_result",
+            ]
+        )
+        result = retries_github_server_error_with_backoff(mock_function)("test_arg")
+        self.assertEqual(result, "test_result")
+        mock_sleep.assert_has_calls([call(2.0), call(4.0)])
+
+    def test_raises_server_error_after_last_attempt(self, mock_sleep):
+        mock_function = Mock(side_effect=TransportServerError("Bad Gateway", 502))
+        self.assertRaises(
+            TransportServerError,
+            retries_github_server_error_with_backoff(mock_function),
+            "test_arg",
+        )
+        self.assertEqual(mock_function.call_count, 3)
+
+    def test_does_not_retry_other_transport_errors(self, mock_sleep):
+        mock_function = Mock(side_effect=TransportServerError("Unauthorized", 401))
+        self.assertRaises(
+            TransportServerError,
+            retries_github_server_error_with_backoff(mock_function),
+            "test_arg",
+        )
+        mock_function.assert_called_once()
+        mock_sleep.assert_not_called()
+
+
+@patch("cronjobs.services.github_service.asyncio.sleep", new_callable=AsyncMock)
+class TestRetriesGithubServerErrorWithBackoffAsync(unittest.TestCase):
+    def test_retries_server_error_with_exponential_backoff(self, mock_sleep):
+        mock_coroutine = AsyncMock(
+            side_effect=[TransportServerError("Bad Gateway", 502), "test_result"]
+        )
+        result = asyncio.run(
+            retries_github_server_error_with_backoff_async(mock_coroutine)("test_arg")
+        )
+        self.assertEqual(result, "test_result")
+        mock_sleep.assert_awaited_once_with(2.0)
+
+
 @patch("gql.transport.aiohttp.AIOHTTPTransport.__new__", new=MagicMock)
 @patch("gql.Client.__new__")
 @patch("github.Github.__new__")
@@ -145,6 +248,21 @@ class TestGithubServiceGetPaginatedListOfRepositoriesPerType(unittest.TestCase):
         )
         github_service.github_client_gql_api.execute.assert_called_once()
 
+    def test_adds_pushed_qualifier_when_pushed_after_given(self, _mock_gql_client):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_repositories_per_type(
+            "public",
+            None,
+            pushed_after=datetime(2023, 2, 1, 9, 30, tzinfo=timezone.utc),
+        )
+        variable_values = github_service.github_client_gql_api.execute.call_args.kwargs[
+            "variable_values"
+        ]
+        self.assertEqual(
+            variable_values["the_query"],
+            f"org:{ORGANISATION_NAME}, archived:false, is:public, pushed:>2023-02-01T09:30:00Z",
+        )
+
     def test_throws_value_error_when_page_size_greater_than_limit(
         self, _mock_gql_client
     ):
@@ -157,10 +275,39 @@ class TestGithubServiceGetPaginatedListOfRepositoriesPerType(unittest.TestCase):
             101,
         )
 
+    def test_reuses_parsed_document(self, _mock_gql_client):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_repositories_per_type("public", None)
+        github_service.get_paginated_list_of_repositories_per_type("private", None)
+        documents = [
+            execute_call.args[0]
+            for execute_call in github_service.github_client_gql_api.execute.call_args_list
+        ]
+        self.assertIs(documents[0], GRAPHQL_DOCUMENTS["repositories_per_type"])
+        self.assertIs(documents[1], documents[0])
+
+    @patch("cronjobs.services.github_service.PersistentGraphQLSession")
+    def test_uses_persistent_session_when_open(
+        self, mock_persistent_session, _mock_gql_client
+    ):
+        github_service = GithubService("", ORGANISATION_NAME)
+        with github_service.persistent_graphql_session():
+            with github_service.persistent_graphql_session():
+                github_service.get_paginated_list_of_repositories_per_type("public", None)
+            github_service.get_paginated_list_of_repositories_per_type("private", None)
+        mock_persistent_session.assert_called_once_with(
+            github_service.github_client_gql_api
+        )
+        self.assertEqual(mock_persistent_session.return_value.execute.call_count, 2)
+        mock_persistent_session.return_value.close.assert_called_once()
+        github_service.github_client_gql_api.execute.assert_not_called()
+        self.assertIsNone(github_service.graphql_session)
+
 
 @patch("gql.transport.aiohttp.AIOHTTPTransport.__new__", new=MagicMock)
 @patch("gql.Client.__new__", new=MagicMock)
 @patch("github.Github.__new__", new=MagicMock)
+@patch.object(GithubService, "count_repositories_per_type", new=MagicMock(return_value=1))
 class TestGithubServiceFetchAllRepositories(unittest.TestCase):
     def setUp(self):
         self.return_data = {
@@ -192,6 +339,130 @@ class TestGithubServiceFetchAllRepositories(unittest.TestCase):
         self.assertEqual(repos[0]["name"], "test_repository")
         self.assertFalse("unexpected_data" in repos[0])
 
+    def test_resumes_from_checkpoint(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_repositories_per_type = MagicMock(
+            return_value=self.return_data
+        )
+        checkpoint = MagicMock()
+        checkpoint.created_windows.return_value = None
+        checkpoint.position.side_effect = [
+            (None, False, [{"name": "checkpointed_repository"}]),
+            ("test_cursor", True, []),
+            (None, True, []),
+            (None, True, []),
+        ]
+        repos = github_service.fetch_all_repositories_in_org(checkpoint=checkpoint)
+        self.assertEqual(len(repos), 4)
+        self.assertEqual(repos[0]["name"], "checkpointed_repository")
+        self.assertEqual(
+            github_service.get_paginated_list_of_repositories_per_type.call_args_list[0],
+            call("private", "test_cursor", 80, pushed_after=None, created_window=None),
+        )
+        checkpoint.record_page.assert_called_with(
+            "forks", "test_end_cursor", False, [self.return_data["search"]["repos"][0]["repo"]]
+        )
+
+    def test_splits_repository_types_over_search_result_limit_into_created_windows(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_repositories_per_type = MagicMock(
+            return_value=self.return_data
+        )
+
+        def count_repositories(repo_type, _pushed_after, created_window=None):
+            if repo_type != "public":
+                return 0
+            if created_window is None or (
+                created_window[0] == GithubService.EARLIEST_REPOSITORY_CREATED_AT
+                and created_window[1] > datetime(2020, 1, 1, tzinfo=timezone.utc)
+            ):
+                return 1500
+            return 750
+
+        github_service.count_repositories_per_type = MagicMock(side_effect=count_repositories)
+        with freeze_time("2024-01-01"):
+            repos = github_service.fetch_all_repositories_in_org()
+
+        self.assertEqual(len(repos), 2)
+        created_windows = [
+            mock_call.kwargs["created_window"]
+            for mock_call in github_service.get_paginated_list_of_repositories_per_type.call_args_list
+        ]
+        self.assertEqual(created_windows[0][0], GithubService.EARLIEST_REPOSITORY_CREATED_AT)
+        self.assertEqual(created_windows[1][0] - created_windows[0][1], timedelta(seconds=1))
+        self.assertEqual(github_service.truncated_streams, set())
+
+    def test_resumes_created_windows_from_checkpoint(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_repositories_per_type = MagicMock(
+            return_value=self.return_data
+        )
+        created_window = (
+            GithubService.EARLIEST_REPOSITORY_CREATED_AT,
+            datetime(2020, 1, 1, tzinfo=timezone.utc),
+        )
+        checkpoint = MagicMock()
+        checkpoint.created_windows.return_value = [created_window]
+        checkpoint.position.return_value = (None, True, [])
+        github_service.count_repositories_per_type = MagicMock()
+        github_service.fetch_all_repositories_in_org(checkpoint=checkpoint)
+
+        github_service.count_repositories_per_type.assert_not_called()
+        checkpoint.position.assert_called_with(
+            "forks:2008-01-01T00:00:00Z..2020-01-01T00:00:00Z"
+        )
+        checkpoint.record_created_windows.assert_not_called()
+
+    def test_records_search_truncated_at_search_result_limit(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        self.return_data["search"]["repositoryCount"] = 1500
+        github_service.get_paginated_list_of_repositories_per_type = MagicMock(
+            return_value=self.return_data
+        )
+        github_service.fetch_all_repositories_in_org()
+        self.assertIn(f"{ORGANISATION_NAME}/public", github_service.truncated_streams)
+
+    def test_retries_page_at_smaller_size_after_server_error(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_repositories_per_type = MagicMock(
+            side_effect=[TransportServerError("Bad Gateway", 502)]
+            + [self.return_data] * 4
+        )
+        repos = github_service.fetch_all_repositories_in_org()
+        self.assertEqual(len(repos), 4)
+        page_sizes = [
+            mock_call.args[2]
+            for mock_call in github_service.get_paginated_list_of_repositories_per_type.call_args_list
+        ]
+        self.assertEqual(page_sizes[:2], [80, 40])
+
+    def test_raises_when_server_error_persists_at_minimum_page_size(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_repositories_per_type = MagicMock(
+            side_effect=TransportServerError("Bad Gateway", 502)
+        )
+        self.assertRaises(
+            TransportServerError, github_service.fetch_all_repositories_in_org
+        )
+
+    def test_iter_repositories_yields_each_page(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_repositories_per_type = MagicMock(
+            return_value=self.return_data
+        )
+        pages = github_service.iter_repositories_in_org()
+        self.assertEqual(next(pages), [self.return_data["search"]["repos"][0]["repo"]])
+        github_service.get_paginated_list_of_repositories_per_type.assert_called_once()
+        self.assertEqual(len(list(pages)), 3)
+
+    def test_iter_repositories_skips_locked_repo(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        self.return_data["search"]["repos"][0]["repo"]["isLocked"] = True
+        github_service.get_paginated_list_of_repositories_per_type = MagicMock(
+            return_value=self.return_data
+        )
+        self.assertEqual(list(github_service.iter_repositories_in_org()), [[]] * 4)
+
     def test_nothing_to_return(self):
         github_service = GithubService("", ORGANISATION_NAME)
         self.return_data["search"]["repos"] = None
@@ -220,5 +491,469 @@ class TestGithubServiceFetchAllRepositories(unittest.TestCase):
         self.assertEqual(len(repos), 0)
 
 
+@patch("gql.transport.aiohttp.AIOHTTPTransport.__new__", new=MagicMock)
+@patch("gql.Client.__new__", new=MagicMock)
+@patch("github.Github.__new__", new=MagicMock)
+class TestGithubServiceFetchAllRepositoriesSinglePass(unittest.TestCase):
+    def __page(self, names, has_next_page, pushed_at="2023-02-01T00:00:00Z", **flags):
+        return {
+            "organization": {
+                "repositories": {
+                    "totalCount": 3,
+                    "nodes": [
+                        {
+                            "name": name,
+                            "pushedAt": pushed_at,
+                            "isLocked": flags.get("isLocked", False),
+                            "isDisabled": flags.get("isDisabled", False),
+                        }
+                        for name in names
+                    ],
+                    "pageInfo": {"hasNextPage": has_next_page, "endCursor": "test_end_cursor"},
+                }
+            }
+        }
+
+    def test_dedupes_repositories_by_name(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_organisation_repositories = MagicMock(
+            side_effect=[
+                self.__page(["repo1", "repo2"], True),
+                self.__page(["repo2", "repo3"], False),
+            ]
+        )
+        repos = github_service.fetch_all_repositories_in_org_single_pass()
+        self.assertEqual([repo["name"] for repo in repos], ["repo1", "repo2", "repo3"])
+
+    def test_ignores_locked_and_disabled_repos(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_organisation_repositories = MagicMock(
+            side_effect=[
+                self.__page(["locked"], True, isLocked=True),
+                self.__page(["disabled"], False, isDisabled=True),
+            ]
+        )
+        self.assertEqual(github_service.fetch_all_repositories_in_org_single_pass(), [])
+
+    def test_stops_at_first_repository_pushed_before_pushed_after(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_organisation_repositories = MagicMock(
+            side_effect=[
+                self.__page(["repo1"], True, pushed_at="2023-02-02T00:00:00Z"),
+                self.__page(["repo2"], True, pushed_at="2023-01-01T00:00:00Z"),
+                self.__page(["repo3"], False),
+            ]
+        )
+        repos = github_service.fetch_all_repositories_in_org_single_pass(
+            pushed_after=datetime(2023, 2, 1, tzinfo=timezone.utc)
+        )
+        self.assertEqual([repo["name"] for repo in repos], ["repo1"])
+        github_service.get_paginated_list_of_organisation_repositories.assert_called_with(
+            "test_end_cursor", ANY, order_by_pushed_at=True
+        )
+        self.assertEqual(
+            github_service.get_paginated_list_of_organisation_repositories.call_count, 2
+        )
+
+    def test_counts_graphql_requests(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_organisation_repositories("test_cursor")
+        github_service.get_paginated_list_of_organisation_repositories("test_cursor")
+        self.assertEqual(github_service.graphql_request_count, 2)
+
+
+@patch("gql.transport.aiohttp.AIOHTTPTransport.__new__", new=MagicMock)
+@patch("gql.Client.__new__", new=MagicMock)
+@patch("github.Github.__new__", new=MagicMock)
+@patch.object(GithubService, "count_repositories_per_type", new=MagicMock(return_value=1))
+class TestGithubServiceFetchAllRepositoriesTwoPhase(unittest.TestCase):
+    @staticmethod
+    def __ids_page(ids, has_next_page=False, is_locked=False):
+        return {
+            "search": {
+                "repos": [
+                    {"repo": {"id": repository_id, "isLocked": is_locked, "isDisabled": False}}
+                    for repository_id in ids
+                ],
+                "pageInfo": {"hasNextPage": has_next_page, "endCursor": "test_end_cursor"},
+            }
+        }
+
+    @staticmethod
+    def __repo(repository_id, has_more_rules=False):
+        return {
+            "id": repository_id,
+            "name": f"repo_{repository_id}",
+            "branchProtectionRules": {
+                "edges": [{"node": {"pattern": "main"}}],
+                "pageInfo": {"hasNextPage": has_more_rules, "endCursor": "rules_cursor"},
+            },
+            "repositoryTopics": {
+                "edges": [],
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+            },
+        }
+
+    def __github_service(self, id_pages, detail_batches):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_repository_ids_per_type = MagicMock(
+            side_effect=id_pages
+        )
+        github_service.get_repository_details = MagicMock(side_effect=detail_batches)
+        return github_service
+
+    def test_lists_ids_then_fetches_details_in_batches(self):
+        github_service = self.__github_service(
+            [
+                self.__ids_page(["1", "2"], has_next_page=True),
+                self.__ids_page(["3"]),
+                self.__ids_page(["4"], is_locked=True),
+                self.__ids_page([]),
+                self.__ids_page([]),
+            ],
+            [{"nodes": [self.__repo("1"), self.__repo("2"), self.__repo("3")]}],
+        )
+        repos = github_service.fetch_all_repositories_in_org_two_phase(batch_size=10)
+        self.assertEqual([repo["id"] for repo in repos], ["1", "2", "3"])
+        github_service.get_repository_details.assert_called_once_with(["1", "2", "3"])
+
+    @patch("cronjobs.services.github_service.PersistentGraphQLSession")
+    def test_skips_repositories_that_no_longer_exist(self, mock_persistent_session):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_paginated_list_of_repository_ids_per_type = MagicMock(
+            side_effect=[self.__ids_page(["1", "2"])] + [self.__ids_page([])] * 3
+        )
+        mock_persistent_session.return_value.execute.side_effect = TransportQueryError(
+            "Could not resolve to a node",
+            errors=[{"type": "NOT_FOUND", "path": ["nodes", 0]}],
+            data={"nodes": [None, self.__repo("2")]},
+        )
+        repos = github_service.fetch_all_repositories_in_org_two_phase(batch_size=10)
+        self.assertEqual([repo["id"] for repo in repos], ["2"])
+
+    def test_raises_other_query_errors_fetching_details(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.github_client_gql_api.execute.side_effect = TransportQueryError(
+            "Forbidden", errors=[{"type": "FORBIDDEN"}], data={"nodes": [None]}
+        )
+        self.assertRaises(
+            TransportQueryError, github_service.get_repository_details, ["1"]
+        )
+
+    def test_pages_through_overflowing_nested_connections(self):
+        github_service = self.__github_service(
+            [self.__ids_page(["1"])] + [self.__ids_page([])] * 3,
+            [{"nodes": [self.__repo("1", has_more_rules=True)]}],
+        )
+        github_service.get_paginated_list_of_repository_connection = MagicMock(
+            return_value={
+                "node": {
+                    "connection": {
+                        "edges": [{"node": {"pattern": "release"}}],
+                        "pageInfo": {"hasNextPage": False, "endCursor": None},
+                    }
+                }
+            }
+        )
+        repos = github_service.fetch_all_repositories_in_org_two_phase()
+        github_service.get_paginated_list_of_repository_connection.assert_called_once_with(
+            "1", "branchProtectionRules", "rules_cursor"
+        )
+        self.assertEqual(
+            [edge["node"]["pattern"] for edge in repos[0]["branchProtectionRules"]["edges"]],
+            ["main", "release"],
+        )
+
+    def test_throws_value_error_when_batch_too_large(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        self.assertRaises(
+            ValueError, github_service.get_repository_details, ["id"] * 101
+        )
+
+    def test_throws_value_error_for_unsupported_connection(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        self.assertRaises(
+            ValueError,
+            github_service.get_paginated_list_of_repository_connection,
+            "1",
+            "collaborators",
+            None,
+        )
+
+
+@patch("gql.transport.aiohttp.AIOHTTPTransport.__new__", new=MagicMock)
+@patch("gql.Client.__new__", new=MagicMock)
+@patch("github.Github.__new__", new=MagicMock)
+class TestGithubServiceFetchNamedRepositories(unittest.TestCase):
+    @staticmethod
+    def __repo(name, is_locked=False, is_archived=False):
+        return {
+            "name": name,
+            "isArchived": is_archived,
+            "isDisabled": False,
+            "isLocked": is_locked,
+            "branchProtectionRules": None,
+            "repositoryTopics": None,
+        }
+
+    def test_fetches_named_repositories_in_batches(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_named_repositories = MagicMock(
+            side_effect=[
+                {"repository0": self.__repo("repo1"), "repository1": self.__repo("repo2")},
+                {"repository0": self.__repo("repo3")},
+            ]
+        )
+        repos = github_service.fetch_named_repositories(
+            ["repo1", "repo2", "repo1", "repo3"], batch_size=2
+        )
+        self.assertEqual([repo["name"] for repo in repos], ["repo1", "repo2", "repo3"])
+        github_service.get_named_repositories.assert_has_calls(
+            [call(["repo1", "repo2"]), call(["repo3"])]
+        )
+
+    def test_skips_missing_locked_and_archived_repositories(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_named_repositories = MagicMock(
+            return_value={
+                "repository0": None,
+                "repository1": self.__repo("repo2", is_locked=True),
+                "repository2": self.__repo("repo3"),
+                "repository3": self.__repo("repo4", is_archived=True),
+            }
+        )
+        repos = github_service.fetch_named_repositories(["repo1", "repo2", "repo3", "repo4"])
+        self.assertEqual([repo["name"] for repo in repos], ["repo3"])
+
+    def test_sends_one_aliased_query_per_batch(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.get_named_repositories(["repo1", "repo2"])
+        document, = github_service.github_client_gql_api.execute.call_args.args
+        variable_values = github_service.github_client_gql_api.execute.call_args.kwargs[
+            "variable_values"
+        ]
+        self.assertEqual(
+            variable_values,
+            {"owner": ORGANISATION_NAME, "name0": "repo1", "name1": "repo2"},
+        )
+        github_service.get_named_repositories(["repo3", "repo4"])
+        self.assertIs(github_service.github_client_gql_api.execute.call_args.args[0], document)
+
+    def test_returns_found_repositories_when_others_are_not_found(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.github_client_gql_api.execute.side_effect = TransportQueryError(
+            "Not found",
+            errors=[{"type": "NOT_FOUND", "path": ["repository0"]}],
+            data={"repository0": None, "repository1": self.__repo("repo2")},
+        )
+        data = github_service.get_named_repositories(["repo1", "repo2"])
+        self.assertEqual(data["repository1"]["name"], "repo2")
+
+    @patch("cronjobs.services.github_service.sleep")
+    def test_retries_server_error(self, _mock_sleep):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.github_client_gql_api.execute.side_effect = [
+            TransportServerError("Bad Gateway", 502),
+            {"repository0": self.__repo("repo1")},
+        ]
+        data = github_service.get_named_repositories(["repo1"])
+        self.assertEqual(data["repository0"]["name"], "repo1")
+        self.assertEqual(github_service.graphql_request_count, 2)
+
+    def test_raises_other_query_errors(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.github_client_gql_api.execute.side_effect = TransportQueryError(
+            "Forbidden", errors=[{"type": "FORBIDDEN"}], data={"repository0": None}
+        )
+        self.assertRaises(
+            TransportQueryError, github_service.get_named_repositories, ["repo1"]
+        )
+
+    def test_throws_value_error_when_batch_size_invalid(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        self.assertRaises(
+            ValueError, github_service.fetch_named_repositories, ["repo1"], 101
+        )
+
+
+@patch("gql.transport.aiohttp.AIOHTTPTransport.__new__", new=MagicMock)
+@patch("gql.Client.__new__", new=MagicMock)
+@patch("github.Github.__new__", new=MagicMock)
+class TestGithubServiceFetchAllRepositoriesConcurrently(unittest.TestCase):
+    def setUp(self):
+        self.first_page = {
+            "search": {
+                "repos": [
+                    {
+                        "repo": {
+                            "name": "test_repository",
+                            "isLocked": False,
+                            "isDisabled": False,
+                        },
+                    },
+                ],
+                "pageInfo": {"hasNextPage": True, "endCursor": "test_end_cursor"},
+            }
+        }
+        self.last_page = {
+            "search": {
+                "repos": [
+                    {
+                        "repo": {
+                            "name": "test_locked_repository",
+                            "isLocked": True,
+                            "isDisabled": False,
+                        },
+                    },
+                ],
+                "pageInfo": {"hasNextPage": False, "endCursor": None},
+            }
+        }
+
+    def __github_service_with_pages(self, *pages):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.github_client_gql_api = MagicMock()
+        github_service.get_paginated_list_of_repositories_per_type_async = AsyncMock(
+            side_effect=list(pages)
+        )
+        github_service.count_repositories_per_type_async = AsyncMock(return_value=2)
+        return github_service
+
+    def test_returns_same_repositories_as_sequential_fetch(self):
+        github_service = self.__github_service_with_pages(
+            *[self.first_page, self.last_page] * 4
+        )
+        repos = github_service.fetch_all_repositories_in_org_concurrently()
+        self.assertEqual([repo["name"] for repo in repos], ["test_repository"] * 4)
+
+    def test_paginates_each_repository_type(self):
+        github_service = self.__github_service_with_pages(
+            *[self.first_page, self.last_page] * 4
+        )
+        github_service.fetch_all_repositories_in_org_concurrently()
+        repo_types = [
+            mock_call.args[1]
+            for mock_call in github_service.get_paginated_list_of_repositories_per_type_async.await_args_list
+        ]
+        self.assertEqual(sorted(set(repo_types)), sorted(GithubService.REPOSITORY_TYPES))
+        self.assertEqual(
+            github_service.get_paginated_list_of_repositories_per_type_async.await_count, 8
+        )
+
+    def test_skips_repository_types_without_repositories(self):
+        github_service = self.__github_service_with_pages(self.first_page, self.last_page)
+        github_service.count_repositories_per_type_async = AsyncMock(
+            side_effect=[2, 0, 0, 0]
+        )
+        repos = github_service.fetch_all_repositories_in_org_concurrently()
+        self.assertEqual(len(repos), 1)
+
+    def test_splits_created_windows_over_search_result_limit(self):
+        github_service = self.__github_service_with_pages(
+            *[self.first_page, self.last_page] * 2
+        )
+
+        async def count_repositories(_session, repo_type, _pushed_after, created_window=None):
+            if repo_type != "public":
+                return 0
+            if created_window is None or (
+                created_window[0] == GithubService.EARLIEST_REPOSITORY_CREATED_AT
+                and created_window[1] > datetime(2020, 1, 1, tzinfo=timezone.utc)
+            ):
+                return 1500
+            return 750
+
+        github_service.count_repositories_per_type_async = AsyncMock(
+            side_effect=count_repositories
+        )
+        repos = github_service.fetch_all_repositories_in_org_concurrently()
+
+        self.assertEqual(len(repos), 2)
+        created_windows = [
+            mock_call.kwargs["created_window"]
+            if "created_window" in mock_call.kwargs
+            else mock_call.args[5]
+            for mock_call in github_service.get_paginated_list_of_repositories_per_type_async.await_args_list
+        ]
+        first_window, second_window = sorted(set(created_windows))
+        self.assertEqual(first_window[0], GithubService.EARLIEST_REPOSITORY_CREATED_AT)
+        self.assertEqual(second_window[0] - first_window[1], timedelta(seconds=1))
+
+    def test_reuses_created_windows_recorded_in_checkpoint(self):
+        github_service = self.__github_service_with_pages(
+            *[self.first_page, self.last_page] * 4
+        )
+        created_window = (
+            GithubService.EARLIEST_REPOSITORY_CREATED_AT,
+            datetime(2020, 1, 1, tzinfo=timezone.utc),
+        )
+        checkpoint = MagicMock()
+        checkpoint.created_windows.return_value = [created_window]
+        checkpoint.position.return_value = (None, True, [])
+        github_service.fetch_all_repositories_in_org_concurrently(checkpoint=checkpoint)
+
+        github_service.count_repositories_per_type_async.assert_not_awaited()
+        self.assertEqual(
+            {
+                mock_call.kwargs["created_window"]
+                for mock_call in github_service.get_paginated_list_of_repositories_per_type_async.await_args_list
+            },
+            {created_window},
+        )
+
+    def test_search_query_includes_created_window(self):
+        github_service = self.__github_service_with_pages()
+        self.assertEqual(
+            github_service._repository_search_query(
+                "public",
+                created_window=(
+                    datetime(2020, 1, 1, tzinfo=timezone.utc),
+                    datetime(2020, 6, 1, tzinfo=timezone.utc),
+                ),
+            ),
+            f"org:{ORGANISATION_NAME}, archived:false, is:public, created:2020-01-01T00:00:00Z..2020-06-01T00:00:00Z",
+        )
+
+    def test_fetches_every_organisation_in_enterprise(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        github_service.github_client_gql_api = MagicMock()
+        organisations = []
+
+        async def fetch_organisation(self, *_):
+            organisations.append(self.organisation_name)
+            self.graphql_request_count += 2
+            return [{"name": f"{self.organisation_name}_repository"}]
+
+        with patch.object(
+            GithubService, "_fetch_all_repositories_in_session_async", fetch_organisation
+        ):
+            repos = github_service.fetch_all_repositories_in_enterprise()
+
+        self.assertEqual(
+            repos,
+            {
+                "ministryofjustice": [{"name": "ministryofjustice_repository"}],
+                "moj-analytical-services": [{"name": "moj-analytical-services_repository"}],
+            },
+        )
+        self.assertEqual(sorted(organisations), sorted(github_service.organisations_in_enterprise))
+        self.assertEqual(github_service.organisation_name, ORGANISATION_NAME)
+        self.assertEqual(github_service.graphql_request_count, 4)
+
+    def test_organisations_share_rate_limit_scheduler(self):
+        github_service = GithubService("", ORGANISATION_NAME)
+        organisation_service = github_service._for_organisation("ministryofjustice")
+        self.assertIs(
+            organisation_service.rate_limit_scheduler, github_service.rate_limit_scheduler
+        )
+        self.assertEqual(organisation_service.organisation_name, "ministryofjustice")
+
+    def test_throws_value_error_when_max_concurrency_less_than_one(self):
+        github_service = self.__github_service_with_pages()
+        self.assertRaises(
+            ValueError, github_service.fetch_all_repositories_in_org_concurrently, 0
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
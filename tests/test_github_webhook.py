@@ -0,0 +1,118 @@
+import hashlib
+import hmac
+import unittest
+from unittest.mock import MagicMock, call, patch
+
+from report_app.main.github_webhook import (is_signature_valid,
+                                            reevaluate_repositories,
+                                            repository_reports_to_delete,
+                                            repository_to_reevaluate)
+
+
+class TestIsSignatureValid(unittest.TestCase):
+
+    def setUp(self):
+        self.body = b'{"zen": "test"}'
+        self.signature = "sha256=" + hmac.new(b"test_secret", self.body, hashlib.sha256).hexdigest()
+
+    def test_valid_signature(self):
+        self.assertTrue(is_signature_valid("test_secret", self.body, self.signature))
+
+    def test_signature_with_wrong_secret(self):
+        self.assertFalse(is_signature_valid("wrong_secret", self.body, self.signature))
+
+    def test_missing_signature_or_secret(self):
+        self.assertFalse(is_signature_valid("test_secret", self.body, None))
+        self.assertFalse(is_signature_valid(None, self.body, self.signature))
+
+
+class TestRepositoryToReevaluate(unittest.TestCase):
+
+    def setUp(self):
+        self.payload = {
+            "action": "edited",
+            "repository": {"name": "test-repository", "full_name": "ministryofjustice/test-repository"},
+        }
+
+    def test_repository_events(self):
+        for event in ["repository", "branch_protection_rule", "push"]:
+            self.assertEqual(repository_to_reevaluate(event, self.payload), "ministryofjustice/test-repository")
+
+    def test_ignores_other_events(self):
+        self.assertIsNone(repository_to_reevaluate("issues", self.payload))
+        self.assertIsNone(repository_to_reevaluate("ping", {"zen": "test"}))
+
+    def test_ignores_deleted_and_archived_repository(self):
+        for action in ["deleted", "archived"]:
+            self.payload["action"] = action
+            self.assertIsNone(repository_to_reevaluate("repository", self.payload))
+
+    def test_reevaluates_renamed_and_unarchived_repository(self):
+        for action in ["renamed", "unarchived"]:
+            self.payload["action"] = action
+            self.assertEqual(repository_to_reevaluate("repository", self.payload), "ministryofjustice/test-repository")
+
+
+class TestRepositoryReportsToDelete(unittest.TestCase):
+
+    def setUp(self):
+        self.payload = {
+            "action": "edited",
+            "repository": {"name": "test-repository", "full_name": "ministryofjustice/test-repository"},
+        }
+
+    def test_deletes_report_of_deleted_and_archived_repository(self):
+        for action in ["deleted", "archived"]:
+            self.payload["action"] = action
+            self.assertEqual(repository_reports_to_delete("repository", self.payload), ["test-repository"])
+
+    def test_deletes_report_under_old_name_of_renamed_repository(self):
+        self.payload["action"] = "renamed"
+        self.payload["changes"] = {"repository": {"name": {"from": "old-repository"}}}
+        self.assertEqual(repository_reports_to_delete("repository", self.payload), ["old-repository"])
+
+    def test_keeps_reports_for_other_events(self):
+        self.assertEqual(repository_reports_to_delete("repository", self.payload), [])
+        self.payload["action"] = "deleted"
+        self.assertEqual(repository_reports_to_delete("push", self.payload), [])
+
+
+@patch.dict("os.environ", {"GITHUB_TOKEN": "token", "DYNAMODB_TABLE_NAME": "table"})
+class TestReevaluateRepositories(unittest.TestCase):
+
+    @patch("report_app.main.github_webhook.ReportDatabase")
+    @patch("cronjobs.services.standards_service.RepositoryReport")
+    @patch("cronjobs.services.github_service.GithubService")
+    def test_stores_report_of_each_repository_per_owner(self, mock_github_service, mock_standards_report,
+                                                        mock_report_database):
+        mock_github_service.return_value.fetch_named_repositories.side_effect = [
+            [{"name": "repo1"}, {"name": "repo2"}],
+            [{"name": "repo3"}],
+        ]
+        mock_standards_report.side_effect = lambda repository: MagicMock(
+            data={"name": repository["name"], "status": True})
+
+        reevaluate_repositories(["ministryofjustice/repo1", "ministryofjustice/repo2", "moj-analytical-services/repo3"])
+
+        mock_github_service.return_value.fetch_named_repositories.assert_has_calls(
+            [call(["repo1", "repo2"]), call(["repo3"])])
+        mock_report_database.return_value.add_repository_reports.assert_called_once_with({
+            "repo1": {"name": "repo1", "status": True},
+            "repo2": {"name": "repo2", "status": True},
+            "repo3": {"name": "repo3", "status": True},
+        })
+        mock_github_service.assert_any_call("token", "ministryofjustice")
+        mock_report_database.assert_called_once_with("table")
+
+    @patch("report_app.main.github_webhook.ReportDatabase")
+    @patch("cronjobs.services.github_service.GithubService")
+    def test_requires_github_token_and_table_name(self, mock_github_service, mock_report_database):
+        with patch.dict("os.environ", {"GITHUB_TOKEN": ""}):
+            self.assertRaises(ValueError, reevaluate_repositories, ["ministryofjustice/repo1"])
+
+        mock_github_service.assert_not_called()
+        mock_report_database.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from gql import Client
+
+from cronjobs.services.graphql_session import PersistentGraphQLSession
+
+
+class TestPersistentGraphQLSession(unittest.TestCase):
+    def setUp(self):
+        self.session = MagicMock()
+        self.session.execute = AsyncMock(return_value={"data": "test"})
+        self.client = MagicMock(Client)
+        self.client.connect_async = AsyncMock(return_value=self.session)
+        self.client.close_async = AsyncMock()
+
+    def test_connects_once_for_many_requests(self):
+        graphql_session = PersistentGraphQLSession(self.client)
+        for _ in range(3):
+            self.assertEqual(
+                graphql_session.execute("document", {"page_size": 1}), {"data": "test"}
+            )
+        graphql_session.close()
+        self.client.connect_async.assert_awaited_once()
+        self.assertEqual(self.session.execute.await_count, 3)
+        self.session.execute.assert_awaited_with("document", variable_values={"page_size": 1})
+
+    def test_close_closes_the_client(self):
+        graphql_session = PersistentGraphQLSession(self.client)
+        graphql_session.close()
+        self.client.close_async.assert_awaited_once()
+
+    def test_raises_when_connection_fails(self):
+        self.client.connect_async = AsyncMock(side_effect=ConnectionError)
+        self.assertRaises(ConnectionError, PersistentGraphQLSession, self.client)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from report_app.main.ingestion_jobs import IngestionJobs
+
+
+class TestIngestionJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.spool = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spool.cleanup)
+        self.ingest = MagicMock()
+        self.jobs = IngestionJobs(self.ingest, self.spool.name)
+        self.reports = [{"name": "repo1"}, {"name": "repo2"}]
+
+    def test_submit_spools_and_queues_job(self):
+        job_id = self.jobs.submit(self.reports)
+
+        self.assertEqual(self.jobs.status(job_id)["status"], "queued")
+        self.assertEqual(self.jobs.status(job_id)["reports"], 2)
+        with open(os.path.join(self.spool.name, f"{job_id}.json"), encoding="utf-8") as file:
+            self.assertEqual(json.load(file), {"generation": None, "reports": self.reports})
+        self.ingest.assert_not_called()
+
+    def test_successful_job(self):
+        self.ingest.side_effect = lambda reports, generation, progress: progress(len(reports))
+        job_id = self.jobs.submit(self.reports)
+
+        self.jobs.run_next_job()
+
+        status = self.jobs.status(job_id)
+        self.assertEqual(status["status"], "succeeded")
+        self.assertEqual(status["reports_written"], 2)
+        self.assertIsNotNone(status["finished_at"])
+        self.assertEqual(self.ingest.call_args.args[0], self.reports)
+        self.assertEqual(os.listdir(self.spool.name), [f"{job_id}.status"])
+
+    def test_job_written_to_generation(self):
+        job_id = self.jobs.submit(self.reports, "20261018T120000000000Z-1a2b3c4d")
+
+        self.jobs.run_next_job()
+
+        self.assertEqual(self.jobs.status(job_id)["generation"], "20261018T120000000000Z-1a2b3c4d")
+        self.assertEqual(self.ingest.call_args.args[:2], (self.reports, "20261018T120000000000Z-1a2b3c4d"))
+
+    def test_failed_job_is_kept_in_spool(self):
+        self.ingest.side_effect = Exception("Database error")
+        job_id = self.jobs.submit(self.reports)
+
+        self.jobs.run_next_job()
+
+        status = self.jobs.status(job_id)
+        self.assertEqual(status["status"], "failed")
+        self.assertEqual(status["error"], "Database error")
+        self.assertEqual(sorted(os.listdir(self.spool.name)), [f"{job_id}.json.failed", f"{job_id}.status"])
+
+    def test_job_without_spooled_reports_fails(self):
+        job_id = self.jobs.submit(self.reports)
+        os.remove(os.path.join(self.spool.name, f"{job_id}.json"))
+
+        self.jobs.run_next_job()
+
+        self.assertEqual(self.jobs.status(job_id)["status"], "failed")
+        self.assertEqual(os.listdir(self.spool.name), [f"{job_id}.status"])
+
+    def test_worker_keeps_running_after_job_raises(self):
+        with patch.object(self.jobs, "run_next_job", side_effect=[OSError("disk full"), None, SystemExit]) as run:
+            with self.assertRaises(SystemExit):
+                self.jobs._run()
+
+        self.assertEqual(run.call_count, 3)
+
+    def test_unknown_job(self):
+        self.assertIsNone(self.jobs.status("unknown"))
+
+    @patch("report_app.main.ingestion_jobs.Thread")
+    def test_start_queues_jobs_left_in_spool(self, mock_thread):
+        job_id = self.jobs.submit(self.reports)
+        restarted = IngestionJobs(self.ingest, self.spool.name, workers=3)
+
+        restarted.start()
+        restarted.start()
+
+        self.assertEqual(mock_thread.call_count, 3)
+        self.assertEqual(restarted.status(job_id)["status"], "queued")
+        restarted.run_next_job()
+        self.assertEqual(restarted.status(job_id)["status"], "succeeded")
+        self.assertEqual(restarted.status(job_id)["reports"], 2)
+
+    @patch("report_app.main.ingestion_jobs.Thread")
+    def test_status_of_finished_job_survives_restart(self, _mock_thread):
+        self.ingest.side_effect = lambda reports, generation, progress: progress(len(reports))
+        job_id = self.jobs.submit(self.reports)
+        self.jobs.run_next_job()
+        restarted = IngestionJobs(self.ingest, self.spool.name)
+
+        restarted.start()
+
+        self.assertEqual(restarted.status(job_id), self.jobs.status(job_id))
+
+    @patch("report_app.main.ingestion_jobs.Thread")
+    def test_unfinished_job_whose_spool_was_lost_fails_on_restart(self, _mock_thread):
+        job_id = self.jobs.submit(self.reports)
+        os.remove(os.path.join(self.spool.name, f"{job_id}.json"))
+        restarted = IngestionJobs(self.ingest, self.spool.name)
+
+        restarted.start()
+
+        self.assertEqual(restarted.status(job_id)["status"], "failed")
+        self.assertEqual(restarted.status(job_id)["error"], "The spooled reports were lost")
+
+    def test_forgets_oldest_finished_jobs(self):
+        jobs = IngestionJobs(self.ingest, self.spool.name, retained_jobs=1)
+        first, second = jobs.submit(self.reports), jobs.submit(self.reports)
+        jobs.run_next_job()
+        jobs.run_next_job()
+
+        third = jobs.submit(self.reports)
+
+        self.assertIsNone(jobs.status(first))
+        self.assertFalse(os.path.exists(os.path.join(self.spool.name, f"{first}.status")))
+        self.assertEqual(jobs.status(second)["status"], "succeeded")
+        self.assertEqual(jobs.status(third)["status"], "queued")
+
+    def test_rejects_no_workers(self):
+        self.assertRaises(ValueError, IngestionJobs, self.ingest, self.spool.name, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
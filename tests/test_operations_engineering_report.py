@@ -1,8 +1,37 @@
+import io
+import json
+import threading
+import time
 import unittest
 from unittest import mock
 
-from cronjobs.services.operations_engineering_reports import \
-    OperationsEngineeringReportsService
+import msgpack
+import requests
+
+from cronjobs.services.operations_engineering_reports import (
+    ChunkUpload, OperationsEngineeringReportsService, UploadOptions, _index_ranges)
+from cronjobs.services.report_wire_format import (JSON_CONTENT_TYPE,
+                                                  MSGPACK_CONTENT_TYPE,
+                                                  compress_body,
+                                                  decode_reports,
+                                                  decompress_body,
+                                                  encode_reports,
+                                                  report_content_hash)
+
+
+def reads_versioned_uploads(
+        mock_session, content_types=(JSON_CONTENT_TYPE, MSGPACK_CONTENT_TYPE), content_encodings=('gzip',)):
+    """Answer the request for the upload formats as an API reading versioned uploads in the content
+    types and encodings, and every other GET as the session did before."""
+    other_gets = mock_session.return_value.get.side_effect
+
+    def get(url, **kwargs):
+        if url == 'https://example.com/api/v2/report-upload-formats':
+            return mock.Mock(status_code=200, json=mock.Mock(return_value={
+                'schema_version': 1, 'content_types': list(content_types),
+                'content_encodings': list(content_encodings)}))
+        return other_gets(url, **kwargs) if other_gets is not None else mock.DEFAULT
+    mock_session.return_value.get.side_effect = get
 
 
 class TestOperationsEngineeringReportsService(unittest.TestCase):
@@ -13,6 +42,7 @@ class TestOperationsEngineeringReportsService(unittest.TestCase):
         mock_response = mock.Mock()
         mock_response.status_code = 200
         mock_session.return_value.post.return_value = mock_response
+        reads_versioned_uploads(mock_session)
 
         # Create an instance of the service
         service = OperationsEngineeringReportsService(
@@ -32,14 +62,18 @@ class TestOperationsEngineeringReportsService(unittest.TestCase):
         # Assertions
         # Ensure that the Session object is created once
         mock_session.assert_called_once()
+        mock_session.return_value.get.assert_called_once_with(
+            'https://example.com/api/v2/report-upload-formats',
+            headers={'X-API-KEY': 'test_api_key', 'User-Agent': 'reports-service-layer'}, timeout=180)
         mock_session.return_value.post.assert_called_once_with(
             'https://example.com/reports',
             headers={
                 "Content-Type": "application/json",
                 "X-API-KEY": 'test_api_key',
                 "User-Agent": "reports-service-layer",
+                "Content-Encoding": "gzip",
             },
-            json=test_data,
+            data=compress_body(encode_reports(test_data, "application/json")),
             timeout=180,
             stream=True
         )
@@ -72,6 +106,543 @@ class TestOperationsEngineeringReportsService(unittest.TestCase):
         mock_session.assert_called_once()
         mock_session.return_value.post.assert_called_once()
 
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_sends_json_strings_when_api_does_not_read_versioned_uploads(self, mock_session):
+        # An API released before the upload formats endpoint answers it with 404
+        mock_session.return_value.get.return_value = mock.Mock(status_code=404)
+        mock_session.return_value.post.return_value.status_code = 200
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key',
+            options=UploadOptions(wire_format='msgpack'))
+
+        service.override_repository_standards_reports([{'name': 'repo1'}, {'name': 'repo2'}])
+
+        kwargs = mock_session.return_value.post.call_args.kwargs
+        self.assertEqual(kwargs['headers']['Content-Type'], 'application/json')
+        self.assertNotIn('Content-Encoding', kwargs['headers'])
+        self.assertEqual([json.loads(report) for report in json.loads(kwargs['data'])],
+                         [{'name': 'repo1'}, {'name': 'repo2'}])
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_asks_for_upload_formats_once(self, mock_session):
+        mock_session.return_value.post.return_value.status_code = 200
+        reads_versioned_uploads(mock_session)
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key')
+
+        service.override_repository_standards_reports([{'name': 'repo1'}])
+        service.override_repository_standards_reports([{'name': 'repo2'}])
+
+        mock_session.return_value.get.assert_called_once()
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_sends_json_when_api_does_not_read_msgpack(self, mock_session):
+        mock_session.return_value.post.return_value.status_code = 200
+        reads_versioned_uploads(mock_session, content_types=[JSON_CONTENT_TYPE])
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key',
+            options=UploadOptions(wire_format='msgpack'))
+
+        service.override_repository_standards_reports([{'name': 'repo1'}])
+
+        kwargs = mock_session.return_value.post.call_args.kwargs
+        self.assertEqual(kwargs['headers']['Content-Type'], 'application/json')
+        self.assertEqual(decode(kwargs['data']), [{'name': 'repo1'}])
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_sends_uncompressed_when_api_does_not_read_gzip(self, mock_session):
+        mock_session.return_value.post.return_value.status_code = 200
+        reads_versioned_uploads(mock_session, content_encodings=())
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key')
+
+        service.override_repository_standards_reports([{'name': 'repo1'}])
+
+        kwargs = mock_session.return_value.post.call_args.kwargs
+        self.assertNotIn('Content-Encoding', kwargs['headers'])
+        self.assertEqual(kwargs['data'], encode_reports([{'name': 'repo1'}], JSON_CONTENT_TYPE))
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_fails_when_api_stores_none_of_the_reports(self, mock_session):
+        mock_session.return_value.post.return_value = mock.Mock(
+            status_code=202, json=mock.Mock(return_value={'job_id': 'job0', 'reports': 0}))
+        reads_versioned_uploads(mock_session)
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key')
+
+        with self.assertRaises(ValueError):
+            service.override_repository_standards_reports([{'name': 'repo1'}])
+
+        self.assertEqual(service.chunk_uploads[0].status, service.NOTHING_STORED_STATUS)
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_override_repository_standards_reports_msgpack(self, mock_session):
+        mock_session.return_value.post.return_value.status_code = 200
+        reads_versioned_uploads(mock_session)
+        service = OperationsEngineeringReportsService(
+            url='https://example.com',
+            endpoint='reports',
+            api_key='test_api_key',
+            options=UploadOptions(wire_format='msgpack', compress=False)
+        )
+
+        service.override_repository_standards_reports([{'report_id': 1}])
+
+        kwargs = mock_session.return_value.post.call_args.kwargs
+        self.assertEqual(kwargs['headers']['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(kwargs['data']), {'schema_version': 1, 'reports': [{'report_id': 1}]})
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_falls_back_to_json_when_msgpack_is_not_accepted(self, mock_session):
+        unsupported, accepted = mock.Mock(status_code=415), mock.Mock(status_code=200)
+        mock_session.return_value.post.side_effect = [unsupported, accepted, accepted]
+        reads_versioned_uploads(mock_session)
+        service = OperationsEngineeringReportsService(
+            url='https://example.com',
+            endpoint='reports',
+            api_key='test_api_key',
+            options=UploadOptions(wire_format='msgpack')
+        )
+
+        service.override_repository_standards_reports([{'report_id': i} for i in range(11)])
+
+        content_types = [call.kwargs['headers']['Content-Type']
+                         for call in mock_session.return_value.post.call_args_list]
+        self.assertEqual(content_types, ['application/msgpack', 'application/json', 'application/json'])
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_uncompressed_upload(self, mock_session):
+        mock_session.return_value.post.return_value.status_code = 200
+        reads_versioned_uploads(mock_session)
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key',
+            options=UploadOptions(compress=False))
+
+        service.override_repository_standards_reports([{'report_id': 1}])
+
+        kwargs = mock_session.return_value.post.call_args.kwargs
+        self.assertNotIn('Content-Encoding', kwargs['headers'])
+        self.assertEqual(kwargs['data'], encode_reports([{'report_id': 1}], 'application/json'))
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_falls_back_to_uncompressed_when_gzip_is_not_accepted(self, mock_session):
+        mock_session.return_value.post.side_effect = [mock.Mock(status_code=415), mock.Mock(status_code=200)]
+        reads_versioned_uploads(mock_session)
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key')
+
+        service.override_repository_standards_reports([{'report_id': 1}])
+
+        encodings = [call.kwargs['headers'].get('Content-Encoding')
+                     for call in mock_session.return_value.post.call_args_list]
+        self.assertEqual(encodings, ['gzip', None])
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_one_session_is_reused_for_every_chunk(self, mock_session):
+        mock_session.return_value.post.return_value.status_code = 200
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key')
+
+        service.override_repository_standards_reports([{'report_id': i} for i in range(25)])
+        service.override_repository_standards_reports([{'report_id': i} for i in range(5)])
+
+        mock_session.assert_called_once()
+        self.assertEqual(mock_session.return_value.post.call_count, 4)
+        self.assertEqual(mock_session.return_value.post.return_value.close.call_count, 4)
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_records_latency_of_each_chunk(self, mock_session):
+        mock_session.return_value.post.return_value.status_code = 200
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key', options=UploadOptions(chunk_size=4))
+
+        service.override_repository_standards_reports([{'report_id': i} for i in range(10)])
+
+        self.assertEqual([upload.start_index for upload in service.chunk_uploads], [0, 4, 8])
+        self.assertEqual([upload.reports for upload in service.chunk_uploads], [4, 4, 2])
+        self.assertTrue(all(upload.status == 200 for upload in service.chunk_uploads))
+        self.assertTrue(all(upload.body_bytes > 0 for upload in service.chunk_uploads))
+        self.assertTrue(all(upload.seconds >= 0 for upload in service.chunk_uploads))
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_automatic_chunk_size_fits_max_chunk_bytes(self, mock_session):
+        mock_session.return_value.post.return_value.status_code = 200
+        report = {'name': 'x' * 90}
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key',
+            options=UploadOptions(chunk_size=None, max_chunk_bytes=350))
+
+        service.override_repository_standards_reports([report] * 10)
+
+        self.assertEqual([upload.reports for upload in service.chunk_uploads], [3, 3, 3, 1])
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_automatic_chunk_size_is_bounded(self, mock_session):
+        mock_session.return_value.post.return_value.status_code = 200
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key', options=UploadOptions(chunk_size=None))
+
+        service.override_repository_standards_reports([{'report_id': i} for i in range(250)])
+
+        self.assertEqual([upload.reports for upload in service.chunk_uploads], [100, 100, 50])
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_automatic_chunk_holds_report_larger_than_max_chunk_bytes(self, mock_session):
+        mock_session.return_value.post.return_value.status_code = 200
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key',
+            options=UploadOptions(chunk_size=None, max_chunk_bytes=10))
+
+        service.override_repository_standards_reports([{'name': 'repository'}] * 2)
+
+        self.assertEqual([upload.reports for upload in service.chunk_uploads], [1, 1])
+
+    def test_rejects_invalid_chunk_size(self):
+        for options in ({'chunk_size': 0}, {'chunk_size': None, 'max_chunk_bytes': 0}, {'wire_format': 'xml'}):
+            with self.assertRaises(ValueError):
+                UploadOptions(**options)
+
+    @mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+    def test_close(self, mock_session):
+        service = OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key')
+
+        service.close()
+
+        mock_session.return_value.close.assert_called_once_with()
+
+
+def decode(body):
+    return decode_reports(decompress_body(io.BytesIO(body), 1024 * 1024), JSON_CONTENT_TYPE)
+
+
+@mock.patch('cronjobs.services.operations_engineering_reports.sleep')
+@mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+class TestOperationsEngineeringReportsServiceConcurrentUpload(unittest.TestCase):
+
+    def __service(self, mock_session, **options):
+        reads_versioned_uploads(mock_session)
+        return OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key',
+            options=UploadOptions(chunk_size=10, **options))
+
+    @staticmethod
+    def __status_per_chunk(statuses):
+        """Answer each post with the next status queued for the chunk, keyed by its first report."""
+        def post(*_args, **kwargs):
+            first_report = decode(kwargs['data'])[0]['report_id']
+            status = statuses[first_report].pop(0)
+            if isinstance(status, Exception):
+                raise status
+            return mock.Mock(status_code=status)
+        return post
+
+    def test_uploads_every_chunk(self, mock_session, _mock_sleep):
+        mock_session.return_value.post.return_value.status_code = 200
+        service = self.__service(mock_session, max_in_flight=4)
+
+        service.override_repository_standards_reports([{'report_id': i} for i in range(95)])
+
+        self.assertEqual(mock_session.return_value.post.call_count, 10)
+        self.assertEqual([upload.start_index for upload in service.chunk_uploads], list(range(0, 95, 10)))
+
+    def test_bounds_chunks_in_flight(self, mock_session, _mock_sleep):
+        in_flight, most_in_flight, lock = [0], [0], threading.Lock()
+
+        def post(*_args, **_kwargs):
+            with lock:
+                in_flight[0] += 1
+                most_in_flight[0] = max(most_in_flight[0], in_flight[0])
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+            return mock.Mock(status_code=200)
+        mock_session.return_value.post.side_effect = post
+
+        self.__service(mock_session, max_in_flight=3).override_repository_standards_reports(
+            [{'report_id': i} for i in range(100)])
+
+        self.assertGreater(most_in_flight[0], 1)
+        self.assertLessEqual(most_in_flight[0], 3)
+
+    def test_retries_each_chunk_on_its_own(self, mock_session, mock_sleep):
+        mock_session.return_value.post.side_effect = self.__status_per_chunk({
+            0: [200],
+            10: [503, requests.ConnectionError("reset"), 200],
+            20: [200],
+        })
+        service = self.__service(mock_session, max_in_flight=2)
+
+        service.override_repository_standards_reports([{'report_id': i} for i in range(30)])
+
+        self.assertEqual([upload.attempts for upload in service.chunk_uploads], [1, 3, 1])
+        self.assertEqual(mock_sleep.call_args_list, [mock.call(1.0), mock.call(2.0)])
+
+    def test_reports_every_failed_range_once_all_chunks_are_tried(self, mock_session, _mock_sleep):
+        mock_session.return_value.post.side_effect = self.__status_per_chunk({
+            0: [200],
+            10: [500, 500, 500],
+            20: [400],
+            30: [200],
+            40: [503, 200],
+            50: [500, 500, 500],
+        })
+        service = self.__service(mock_session, max_in_flight=3)
+
+        with self.assertRaises(ValueError) as context:
+            service.override_repository_standards_reports([{'report_id': i} for i in range(55)])
+
+        self.assertIn('10-29, 50-54', str(context.exception))
+        self.assertEqual(
+            [(upload.start_index, upload.status, upload.attempts) for upload in service.chunk_uploads],
+            [(0, 200, 1), (10, 500, 3), (20, 400, 1), (30, 200, 1), (40, 200, 2), (50, 500, 3)])
+
+    def test_rejects_invalid_concurrency(self, mock_session, _mock_sleep):
+        for options in ({'max_in_flight': 0}, {'chunk_attempts': 0}):
+            with self.assertRaises(ValueError):
+                self.__service(mock_session, **options)
+
+
+@mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+class TestOperationsEngineeringReportsServiceSynchronise(unittest.TestCase):
+
+    def setUp(self):
+        self.unchanged = {'name': 'repo1', 'status': True}
+        self.changed = {'name': 'repo2', 'status': False}
+        self.new = {'name': 'repo3', 'status': True}
+
+    def __service(self, mock_session, stored_hashes):
+        mock_session.return_value.get.return_value = mock.Mock(
+            status_code=200, json=mock.Mock(return_value={'schema_version': 1, 'hashes': stored_hashes}))
+        mock_session.return_value.post.return_value.status_code = 200
+        reads_versioned_uploads(mock_session)
+        return OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key')
+
+    def test_uploads_only_new_and_changed_reports(self, mock_session):
+        service = self.__service(mock_session, {
+            'repo1': report_content_hash(self.unchanged),
+            'repo2': report_content_hash({'name': 'repo2', 'status': True}),
+        })
+
+        service.synchronise_repository_standards_reports([self.unchanged, self.changed, self.new])
+
+        mock_session.return_value.get.assert_any_call(
+            'https://example.com/api/v2/github-reports-manifest',
+            headers={'X-API-KEY': 'test_api_key', 'User-Agent': 'reports-service-layer'}, timeout=180)
+        mock_session.return_value.post.assert_called_once()
+        self.assertEqual(decode(mock_session.return_value.post.call_args.kwargs['data']), [self.changed, self.new])
+
+    def test_sends_nothing_when_nothing_changed(self, mock_session):
+        service = self.__service(mock_session, {'repo1': report_content_hash(self.unchanged)})
+
+        service.synchronise_repository_standards_reports([self.unchanged])
+
+        mock_session.return_value.post.assert_not_called()
+
+    def test_deletes_reports_of_repositories_that_are_gone(self, mock_session):
+        service = self.__service(mock_session, {
+            'repo1': report_content_hash(self.unchanged),
+            'repo2': report_content_hash(self.changed),
+            'archived': 'hash',
+        })
+
+        service.synchronise_repository_standards_reports([self.unchanged, self.changed])
+
+        mock_session.return_value.post.assert_called_once_with(
+            'https://example.com/api/v2/delete-github-reports',
+            headers={'X-API-KEY': 'test_api_key', 'User-Agent': 'reports-service-layer'},
+            json={'schema_version': 1, 'names': ['archived']}, timeout=180)
+
+    def test_keeps_reports_of_missing_repositories_when_not_deleting_missing(self, mock_session):
+        service = self.__service(mock_session, {
+            'repo1': report_content_hash(self.unchanged),
+            'repo2': report_content_hash(self.changed),
+            'beyond_search_limit': 'hash',
+        })
+
+        service.synchronise_repository_standards_reports([self.unchanged, self.changed], delete_missing=False)
+
+        mock_session.return_value.post.assert_not_called()
+
+    def test_refuses_to_delete_most_reports(self, mock_session):
+        service = self.__service(mock_session, {'repo1': 'hash', 'repo2': 'hash', 'repo3': 'hash'})
+
+        with self.assertRaises(ValueError):
+            service.synchronise_repository_standards_reports([self.unchanged])
+
+        deletes = [call for call in mock_session.return_value.post.call_args_list
+                   if call.args[0].endswith('delete-github-reports')]
+        self.assertEqual(deletes, [])
+
+    def test_fails_when_manifest_is_unavailable(self, mock_session):
+        service = self.__service(mock_session, {})
+        mock_session.return_value.get.return_value = mock.Mock(status_code=500)
+
+        with self.assertRaises(ValueError):
+            service.synchronise_repository_standards_reports([self.unchanged])
+
+        mock_session.return_value.post.assert_not_called()
+
+
+@mock.patch('cronjobs.services.operations_engineering_reports.sleep')
+@mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+class TestOperationsEngineeringReportsServiceIngestionJobs(unittest.TestCase):
+
+    def __service(self, mock_session, **options):
+        job_ids = iter(f'job{i}' for i in range(100))
+        mock_session.return_value.post.side_effect = lambda *args, **kwargs: mock.Mock(
+            status_code=202, json=mock.Mock(return_value={'job_id': next(job_ids)}))
+        return OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key',
+            options=UploadOptions(chunk_size=10, **options))
+
+    @staticmethod
+    def __answer_jobs(mock_session, statuses):
+        """Answer each status request with the next status queued for the job."""
+        def get(url, **_kwargs):
+            status = statuses[url.rsplit('/', 1)[1]].pop(0)
+            if status is None:
+                return mock.Mock(status_code=404)
+            job = status if isinstance(status, dict) else {'status': status}
+            return mock.Mock(status_code=200, json=mock.Mock(return_value=job))
+        mock_session.return_value.get.side_effect = get
+        reads_versioned_uploads(mock_session)
+
+    @staticmethod
+    def __job_requests(mock_session):
+        return [call for call in mock_session.return_value.get.call_args_list if '/api/v2/jobs/' in call.args[0]]
+
+    def test_waits_for_every_job(self, mock_session, mock_sleep):
+        service = self.__service(mock_session)
+        self.__answer_jobs(mock_session, {
+            'job0': ['running', 'succeeded'],
+            'job1': ['queued', 'running', 'succeeded'],
+        })
+
+        service.override_repository_standards_reports([{'report_id': i} for i in range(20)])
+
+        self.assertEqual([upload.job_id for upload in service.chunk_uploads], ['job0', 'job1'])
+        self.assertEqual(len(self.__job_requests(mock_session)), 5)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(self.__job_requests(mock_session)[0].args[0], 'https://example.com/api/v2/jobs/job0')
+
+    def test_reports_ranges_of_failed_and_unknown_jobs(self, mock_session, _mock_sleep):
+        service = self.__service(mock_session)
+        self.__answer_jobs(mock_session, {
+            'job0': ['failed'],
+            'job1': ['succeeded'],
+            'job2': [None],
+        })
+
+        with self.assertRaises(ValueError) as context:
+            service.override_repository_standards_reports([{'report_id': i} for i in range(25)])
+
+        self.assertIn('0-9, 20-24', str(context.exception))
+
+    def test_times_out_waiting_for_jobs(self, mock_session, _mock_sleep):
+        service = self.__service(mock_session, job_timeout_seconds=0)
+        self.__answer_jobs(mock_session, {'job0': ['running']})
+
+        with self.assertRaises(ValueError) as context:
+            service.override_repository_standards_reports([{'report_id': i} for i in range(5)])
+
+        self.assertIn('0-4', str(context.exception))
+
+    def test_fails_when_job_stores_none_of_the_reports(self, mock_session, _mock_sleep):
+        service = self.__service(mock_session)
+        self.__answer_jobs(mock_session, {
+            'job0': [{'status': 'succeeded', 'reports': 10, 'reports_written': 10}],
+            'job1': [{'status': 'succeeded', 'reports': 5, 'reports_written': 0}],
+        })
+
+        with self.assertRaises(ValueError) as context:
+            service.override_repository_standards_reports([{'report_id': i} for i in range(15)])
+
+        self.assertIn('10-14', str(context.exception))
+
+    def test_does_not_wait_when_asked_not_to(self, mock_session, _mock_sleep):
+        service = self.__service(mock_session, wait_for_jobs=False)
+        self.__answer_jobs(mock_session, {})
+
+        service.override_repository_standards_reports([{'report_id': i} for i in range(5)])
+
+        self.assertEqual(self.__job_requests(mock_session), [])
+        self.assertEqual(service.chunk_uploads[0].job_id, 'job0')
+
+
+@mock.patch('cronjobs.services.operations_engineering_reports.sleep')
+@mock.patch('cronjobs.services.operations_engineering_reports.requests.Session')
+class TestOperationsEngineeringReportsServicePublish(unittest.TestCase):
+
+    GENERATION = '20261018T120000000000Z-1a2b3c4d'
+
+    def __service(self, mock_session, publish_status=200):
+        def post(url, **_kwargs):
+            if url.endswith('/api/v2/generations'):
+                return mock.Mock(status_code=201, json=mock.Mock(return_value={'generation': self.GENERATION}))
+            if url.endswith('/publish'):
+                return mock.Mock(status_code=publish_status)
+            return mock.Mock(status_code=202, json=mock.Mock(return_value={'job_id': 'job0'}))
+        mock_session.return_value.post.side_effect = post
+        mock_session.return_value.get.return_value = mock.Mock(
+            status_code=200, json=mock.Mock(return_value={'status': 'succeeded'}))
+        reads_versioned_uploads(mock_session)
+        # Uploads to a generation wait for the jobs even when told not to
+        return OperationsEngineeringReportsService(
+            url='https://example.com', endpoint='reports', api_key='test_api_key',
+            options=UploadOptions(wait_for_jobs=False))
+
+    def test_publishes_generation_once_reports_are_stored(self, mock_session, _mock_sleep):
+        service = self.__service(mock_session)
+
+        service.publish_repository_standards_reports([{'name': 'repo1'}])
+
+        calls = mock_session.return_value.post.call_args_list
+        self.assertEqual([call.args[0] for call in calls], [
+            'https://example.com/api/v2/generations',
+            'https://example.com/reports',
+            f'https://example.com/api/v2/generations/{self.GENERATION}/publish',
+        ])
+        self.assertEqual(calls[1].kwargs['headers']['X-Report-Generation'], self.GENERATION)
+        mock_session.return_value.get.assert_called_with(
+            'https://example.com/api/v2/jobs/job0',
+            headers={'X-API-KEY': 'test_api_key', 'User-Agent': 'reports-service-layer'}, timeout=180)
+
+    def test_does_not_publish_when_reports_are_not_stored(self, mock_session, _mock_sleep):
+        service = self.__service(mock_session)
+        mock_session.return_value.get.return_value = mock.Mock(
+            status_code=200, json=mock.Mock(return_value={'status': 'failed'}))
+
+        with self.assertRaises(ValueError):
+            service.publish_repository_standards_reports([{'name': 'repo1'}])
+
+        self.assertFalse(any(call.args[0].endswith('/publish')
+                             for call in mock_session.return_value.post.call_args_list))
+
+    def test_raises_when_publish_is_rejected(self, mock_session, _mock_sleep):
+        service = self.__service(mock_session, publish_status=409)
+
+        with self.assertRaises(ValueError):
+            service.publish_repository_standards_reports([{'name': 'repo1'}])
+
+    def test_refuses_to_publish_no_reports(self, mock_session, _mock_sleep):
+        service = self.__service(mock_session)
+
+        with self.assertRaises(ValueError):
+            service.publish_repository_standards_reports([])
+
+        mock_session.return_value.post.assert_not_called()
+
+
+class TestIndexRanges(unittest.TestCase):
+
+    def test_merges_adjacent_chunks(self):
+        uploads = [ChunkUpload(30, 5, 0, 0, 500), ChunkUpload(0, 10, 0, 0, 500),
+                   ChunkUpload(10, 10, 0, 0, 500), ChunkUpload(40, 1, 0, 0, 500)]
+
+        self.assertEqual(_index_ranges(uploads), '0-19, 30-34, 40')
+
 
 if __name__ == '__main__':
     unittest.main()
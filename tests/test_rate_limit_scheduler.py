@@ -0,0 +1,81 @@
+import unittest
+from datetime import datetime, timezone
+
+from freezegun import freeze_time
+
+from cronjobs.services.rate_limit_scheduler import GraphQLRateLimitScheduler
+
+
+@freeze_time("2023-02-01 12:00:00")
+class TestGraphQLRateLimitScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = GraphQLRateLimitScheduler(reserve=0)
+
+    def __record(self, remaining, reset_at="2023-02-01T13:00:00Z", cost=1, limit=5000):
+        self.scheduler.record(
+            {"cost": cost, "limit": limit, "remaining": remaining, "resetAt": reset_at}
+        )
+
+    def test_does_not_wait_before_first_response(self):
+        self.assertEqual(self.scheduler.reserve_request(), 0)
+
+    def test_ignores_missing_rate_limit(self):
+        self.scheduler.record(None)
+        self.assertIsNone(self.scheduler.projected_finish_time())
+
+    def test_does_not_wait_when_budget_covers_demand(self):
+        self.__record(remaining=100)
+        self.scheduler.update_demand("test_org/public", 50)
+        self.assertEqual(self.scheduler.reserve_request(), 0)
+
+    def test_spreads_requests_when_demand_exceeds_budget(self):
+        self.__record(remaining=10)
+        self.scheduler.update_demand("test_org/public", 20)
+        self.assertEqual(self.scheduler.reserve_request(), 0)
+        self.assertEqual(self.scheduler.reserve_request(), 360)
+        self.assertEqual(self.scheduler.reserve_request(), 760)
+
+    def test_waits_for_reset_when_budget_exhausted(self):
+        self.__record(remaining=0)
+        self.assertEqual(self.scheduler.reserve_request(), 3605)
+
+    def test_does_not_wait_after_reset(self):
+        self.__record(remaining=0, reset_at="2023-02-01T11:59:00Z")
+        self.assertEqual(self.scheduler.reserve_request(), 0)
+
+    def test_keeps_reserve(self):
+        scheduler = GraphQLRateLimitScheduler(reserve=50)
+        scheduler.record(
+            {"cost": 1, "limit": 5000, "remaining": 50, "resetAt": "2023-02-01T13:00:00Z"}
+        )
+        self.assertEqual(scheduler.reserve_request(), 3605)
+
+    def test_sums_demand_across_streams(self):
+        self.scheduler.update_demand("test_org/public", 3)
+        self.scheduler.update_demand("test_org/private", 4)
+        self.scheduler.update_demand("test_org/public", 1)
+        self.assertEqual(self.scheduler.pages_remaining, 5)
+
+    def test_projected_finish_time_within_budget(self):
+        self.__record(remaining=100)
+        with freeze_time("2023-02-01 12:00:10"):
+            self.__record(remaining=99)
+            self.scheduler.update_demand("test_org/public", 10)
+            self.assertEqual(
+                self.scheduler.projected_finish_time(),
+                datetime(2023, 2, 1, 12, 1, 50, tzinfo=timezone.utc),
+            )
+
+    def test_projected_finish_time_past_reset(self):
+        self.__record(remaining=11, limit=100)
+        with freeze_time("2023-02-01 12:00:10"):
+            self.__record(remaining=10, limit=100)
+            self.scheduler.update_demand("test_org/public", 110)
+            self.assertEqual(
+                self.scheduler.projected_finish_time(),
+                datetime(2023, 2, 1, 13, 16, 40, tzinfo=timezone.utc),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
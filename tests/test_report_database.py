@@ -1,14 +1,22 @@
 import unittest
-from unittest.mock import ANY, MagicMock, patch
+from unittest.mock import ANY, MagicMock, call, patch
 
 from botocore.exceptions import ClientError
 
-from report_app.main.report_database import ReportDatabase
+from cronjobs.services.report_wire_format import report_content_hash
+from report_app.main import report_database as report_database_module
+from report_app.main.report_database import (GENERATION_POINTER,
+                                             ReportDatabase)
+
+GENERATION = '20261018T120000000000Z-1a2b3c4d'
 
 
 @patch.dict('os.environ', {'AWS_ROLE_ARN': 'arn:aws:iam::000000000000:role/test-role'})
 class TestReportDatabase(unittest.TestCase):
 
+    def setUp(self):
+        report_database_module._reports_cache.clear()
+
     @patch('boto3.client')
     @patch('boto3.resource')
     def test_client_creation(self, mock_resource, mock_client):
@@ -85,6 +93,7 @@ class TestReportDatabase(unittest.TestCase):
         mock_dynamodb_client = MagicMock()
         mock_resource.return_value = mock_dynamodb_client
 
+        mock_table.get_item.return_value = {}
         mock_table.scan.return_value = {"Items": [{"name": "test_item"}]}
 
         report_database = ReportDatabase('test_table')
@@ -122,13 +131,277 @@ class TestReportDatabase(unittest.TestCase):
     def test_add_repository_report_success(self, mock_create_client, mock_check_table_and_assign):
         mock_table = MagicMock()
         mock_table.put_item.return_value = None
+        mock_table.get_item.return_value = {}
         mock_check_table_and_assign.return_value = mock_table
 
         db = ReportDatabase('test_table')
 
         db.add_repository_report('test_key', {'test': 'value'})
 
-        mock_table.put_item.assert_called_once_with(Item={'name': 'test_key', 'data': {'test': 'value'}, 'stored_at': ANY})
+        mock_table.put_item.assert_called_once_with(Item={
+            'name': 'test_key', 'data': {'test': 'value'},
+            'content_hash': report_content_hash({'test': 'value'}), 'stored_at': ANY})
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_add_repository_reports_in_batches(self, mock_create_client, mock_check_table_and_assign):
+        mock_create_client.return_value.batch_write_item.return_value = {'UnprocessedItems': {}}
+        mock_check_table_and_assign.return_value.get_item.return_value = {}
+        reports = {f'repo{i}': {'name': f'repo{i}'} for i in range(30)}
+
+        batch_seconds = ReportDatabase('test_table').add_repository_reports(reports)
+
+        self.assertEqual(len(batch_seconds), 2)
+        calls = mock_create_client.return_value.batch_write_item.call_args_list
+        self.assertEqual([len(call.kwargs['RequestItems']['test_table']) for call in calls], [25, 5])
+        self.assertEqual(calls[0].kwargs['RequestItems']['test_table'][0], {'PutRequest': {'Item': {
+            'name': 'repo0', 'data': {'name': 'repo0'},
+            'content_hash': report_content_hash({'name': 'repo0'}), 'stored_at': ANY}}})
+
+    @patch('report_app.main.report_database.sleep')
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_add_repository_reports_retries_unprocessed_items(self, mock_create_client, mock_check_table_and_assign,
+                                                              mock_sleep):
+        unprocessed = {'test_table': [{'PutRequest': {'Item': {'name': 'repo1'}}}]}
+        mock_create_client.return_value.batch_write_item.side_effect = [
+            {'UnprocessedItems': unprocessed}, {'UnprocessedItems': unprocessed}, {}]
+
+        ReportDatabase('test_table').add_repository_reports({'repo0': {}, 'repo1': {}})
+
+        calls = mock_create_client.return_value.batch_write_item.call_args_list
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(calls[1].kwargs['RequestItems'], unprocessed)
+        self.assertEqual(mock_sleep.call_args_list, [call(0.05), call(0.1)])
+
+    @patch('report_app.main.report_database.sleep')
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_add_repository_reports_gives_up_on_unprocessed_items(self, mock_create_client,
+                                                                  mock_check_table_and_assign, mock_sleep):
+        unprocessed = {'test_table': [{'PutRequest': {'Item': {'name': 'repo1'}}}]}
+        mock_create_client.return_value.batch_write_item.return_value = {'UnprocessedItems': unprocessed}
+
+        with self.assertRaises(ClientError):
+            ReportDatabase('test_table').add_repository_reports({'repo1': {}})
+
+        self.assertEqual(mock_create_client.return_value.batch_write_item.call_count, 5)
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_add_repository_reports_failure(self, mock_create_client, mock_check_table_and_assign):
+        mock_create_client.return_value.batch_write_item.side_effect = ClientError(
+            {'Error': {'Code': 'ValidationException', 'Message': 'Error'}}, 'BatchWriteItem')
+
+        with self.assertRaises(ClientError):
+            ReportDatabase('test_table').add_repository_reports({'repo1': {}})
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_get_repository_report_hashes_pages_through_scan(self, mock_create_client, mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.scan.side_effect = [
+            {'Items': [{'name': 'repo1', 'content_hash': 'hash1'}], 'LastEvaluatedKey': {'name': 'repo1'}},
+            {'Items': [{'name': 'repo2'}]},
+        ]
+        mock_table.get_item.return_value = {}
+        mock_check_table_and_assign.return_value = mock_table
+
+        hashes = ReportDatabase('test_table').get_repository_report_hashes()
+
+        self.assertEqual(hashes, {'repo1': 'hash1', 'repo2': None})
+        self.assertEqual(mock_table.scan.call_args_list[1].kwargs['ExclusiveStartKey'], {'name': 'repo1'})
+        self.assertEqual(mock_table.scan.call_args_list[0].kwargs['ProjectionExpression'],
+                         '#name, repository, content_hash')
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_get_repository_report_hashes_failure(self, mock_create_client, mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.scan.side_effect = ClientError({'Error': {'Code': 'SomeErrorCode', 'Message': 'Error'}}, 'Scan')
+        mock_check_table_and_assign.return_value = mock_table
+
+        with self.assertRaises(ClientError):
+            ReportDatabase('test_table').get_repository_report_hashes()
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_delete_repository_reports(self, mock_create_client, mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.get_item.return_value = {}
+        mock_check_table_and_assign.return_value = mock_table
+
+        ReportDatabase('test_table').delete_repository_reports(['repo1', 'repo2'])
+
+        batch = mock_table.batch_writer.return_value.__enter__.return_value
+        self.assertEqual(batch.delete_item.call_args_list,
+                         [call(Key={'name': 'repo1'}), call(Key={'name': 'repo2'})])
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_add_repository_report_to_published_generation(self, mock_create_client, mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.get_item.return_value = {'Item': {'name': GENERATION_POINTER,
+                                                     'current_generation': GENERATION, 'revision': 3}}
+        mock_check_table_and_assign.return_value = mock_table
+
+        ReportDatabase('test_table').add_repository_report('repo1', {'test': 'value'})
+
+        mock_table.put_item.assert_called_once_with(Item={
+            'name': f'{GENERATION}#repo1', 'repository': 'repo1', 'generation': GENERATION,
+            'data': {'test': 'value'}, 'content_hash': report_content_hash({'test': 'value'}), 'stored_at': ANY})
+        mock_table.update_item.assert_called_once_with(
+            Key={'name': GENERATION_POINTER}, UpdateExpression='ADD revision :one',
+            ExpressionAttributeValues={':one': 1})
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_add_repository_reports_to_new_generation(self, mock_create_client, mock_check_table_and_assign):
+        mock_create_client.return_value.batch_write_item.return_value = {'UnprocessedItems': {}}
+
+        ReportDatabase('test_table').add_repository_reports({'repo1': {}}, generation=GENERATION)
+
+        request_items = mock_create_client.return_value.batch_write_item.call_args.kwargs['RequestItems']
+        self.assertEqual(request_items['test_table'][0]['PutRequest']['Item']['name'], f'{GENERATION}#repo1')
+        # Building a generation neither reads nor changes the published one
+        mock_check_table_and_assign.return_value.get_item.assert_not_called()
+        mock_check_table_and_assign.return_value.update_item.assert_not_called()
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_get_all_repository_reports_of_published_generation(self, mock_create_client,
+                                                                mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.get_item.return_value = {'Item': {'name': GENERATION_POINTER,
+                                                     'current_generation': GENERATION, 'revision': 0}}
+        mock_table.scan.return_value = {'Items': [{
+            'name': f'{GENERATION}#repo1', 'repository': 'repo1', 'generation': GENERATION, 'data': {}}]}
+        mock_check_table_and_assign.return_value = mock_table
+
+        reports = ReportDatabase('test_table').get_all_repository_reports()
+
+        self.assertEqual(reports, [{'name': 'repo1', 'data': {}}])
+        self.assertEqual(mock_table.scan.call_args.kwargs['ExpressionAttributeValues'], {':generation': GENERATION})
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_get_all_repository_reports_cached_until_revision_changes(self, mock_create_client,
+                                                                      mock_check_table_and_assign):
+        mock_table = MagicMock()
+        pointer = {'name': GENERATION_POINTER, 'current_generation': GENERATION, 'revision': 0}
+        mock_table.get_item.return_value = {'Item': pointer}
+        mock_table.scan.return_value = {'Items': [{'name': 'repo1', 'data': {}}]}
+        mock_check_table_and_assign.return_value = mock_table
+        database = ReportDatabase('test_table')
+
+        database.get_all_repository_reports()
+        database.get_all_repository_reports()
+        self.assertEqual(mock_table.scan.call_count, 1)
+
+        pointer['revision'] = 1
+        database.get_all_repository_reports()
+        self.assertEqual(mock_table.scan.call_count, 2)
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_get_repository_report_of_published_generation(self, mock_create_client, mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.get_item.side_effect = [
+            {'Item': {'name': GENERATION_POINTER, 'current_generation': GENERATION, 'revision': 0}},
+            {'Item': {'name': f'{GENERATION}#repo1', 'repository': 'repo1', 'generation': GENERATION, 'data': {}}},
+        ]
+        mock_check_table_and_assign.return_value = mock_table
+
+        report = ReportDatabase('test_table').get_repository_report('repo1')
+
+        self.assertEqual(report, {'name': 'repo1', 'data': {}})
+        self.assertEqual(mock_table.get_item.call_args.kwargs, {'Key': {'name': f'{GENERATION}#repo1'}})
+
+    def test_create_generation(self):
+        first, second = ReportDatabase.create_generation(), ReportDatabase.create_generation()
+
+        self.assertTrue(report_database_module.is_generation_id(first))
+        self.assertLess(first, second)
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_publish_generation(self, mock_create_client, mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.scan.return_value = {'Items': [{'name': f'{GENERATION}#repo1'}]}
+        mock_check_table_and_assign.return_value = mock_table
+
+        ReportDatabase('test_table').publish_generation(GENERATION)
+
+        mock_table.put_item.assert_called_once_with(
+            Item={'name': GENERATION_POINTER, 'current_generation': GENERATION, 'revision': 0},
+            ConditionExpression=ANY, ExpressionAttributeValues={':generation': GENERATION})
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_publish_superseded_generation(self, mock_create_client, mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.scan.return_value = {'Items': [{'name': f'{GENERATION}#repo1'}]}
+        mock_table.put_item.side_effect = ClientError(
+            {'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Failed'}}, 'PutItem')
+        mock_check_table_and_assign.return_value = mock_table
+
+        with self.assertRaises(ValueError):
+            ReportDatabase('test_table').publish_generation(GENERATION)
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_publish_empty_generation(self, mock_create_client, mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.scan.side_effect = [
+            {'Items': [], 'LastEvaluatedKey': {'name': 'repo1'}},
+            {'Items': []},
+        ]
+        mock_check_table_and_assign.return_value = mock_table
+
+        with self.assertRaises(ValueError):
+            ReportDatabase('test_table').publish_generation(GENERATION)
+
+        self.assertEqual(mock_table.scan.call_count, 2)
+        mock_table.put_item.assert_not_called()
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_publish_invalid_generation(self, mock_create_client, mock_check_table_and_assign):
+        with self.assertRaises(ValueError):
+            ReportDatabase('test_table').publish_generation('latest')
+
+        mock_check_table_and_assign.return_value.put_item.assert_not_called()
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_prune_generations(self, mock_create_client, mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.get_item.return_value = {'Item': {'name': GENERATION_POINTER,
+                                                     'current_generation': GENERATION, 'revision': 0}}
+        mock_table.scan.side_effect = [
+            {'Items': [{'name': 'old#repo1'}], 'LastEvaluatedKey': {'name': 'old#repo1'}},
+            {'Items': [{'name': 'repo2'}]},
+        ]
+        mock_check_table_and_assign.return_value = mock_table
+
+        deleted = ReportDatabase('test_table').prune_generations()
+
+        self.assertEqual(deleted, 2)
+        batch = mock_table.batch_writer.return_value.__enter__.return_value
+        self.assertEqual(batch.delete_item.call_args_list,
+                         [call(Key={'name': 'old#repo1'}), call(Key={'name': 'repo2'})])
+        self.assertEqual(mock_table.scan.call_args_list[0].kwargs['ExpressionAttributeValues'],
+                         {':pointer': GENERATION_POINTER, ':generation': GENERATION})
+
+    @patch.object(ReportDatabase, '_check_table_and_assign')
+    @patch.object(ReportDatabase, '_ReportDatabase__create_client')
+    def test_prune_generations_before_any_published(self, mock_create_client, mock_check_table_and_assign):
+        mock_table = MagicMock()
+        mock_table.get_item.return_value = {}
+        mock_check_table_and_assign.return_value = mock_table
+
+        self.assertEqual(ReportDatabase('test_table').prune_generations(), 0)
+        mock_table.scan.assert_not_called()
 
     @patch.object(ReportDatabase, '_check_table_and_assign')
     @patch.object(ReportDatabase, '_ReportDatabase__create_client')
@@ -0,0 +1,65 @@
+import unittest
+from time import sleep
+from unittest.mock import Mock, patch
+
+from cronjobs.services.report_pipeline import ReportPipeline
+
+
+class TestReportPipeline(unittest.TestCase):
+    def setUp(self):
+        self.pages = [
+            [{"name": "repo1"}, {"name": "repo2"}],
+            [{"name": "repo3"}],
+            [],
+        ]
+
+    def test_uploads_every_evaluated_page_in_order(self):
+        upload = Mock()
+        ReportPipeline(iter(self.pages), lambda repo: repo["name"], upload, queue_size=1).run()
+        self.assertEqual(
+            [mock_call.args[0] for mock_call in upload.call_args_list],
+            [["repo1", "repo2"], ["repo3"]],
+        )
+
+    def test_records_statistics_for_each_stage(self):
+        statistics = ReportPipeline(iter(self.pages), lambda repo: repo, Mock()).run()
+        self.assertEqual(statistics["fetch"].items, 3)
+        self.assertEqual(statistics["evaluate"].items, 3)
+        self.assertEqual(statistics["upload"].items, 3)
+        self.assertGreaterEqual(statistics["upload"].max_queue_depth, 0)
+
+    def test_records_queue_depth_only_when_a_page_is_taken(self):
+        def slow_pages():
+            for page in self.pages:
+                sleep(0.05)
+                yield page
+
+        with patch.object(ReportPipeline, "POLL_SECONDS", 0.01):
+            statistics = ReportPipeline(slow_pages(), lambda repo: repo, Mock()).run()
+        self.assertEqual(len(statistics["evaluate"].queue_depths), len(self.pages))
+        self.assertTrue(all(depth >= 1 for depth in statistics["evaluate"].queue_depths))
+
+    def test_raises_upload_error_and_stops_fetching(self):
+        fetched = []
+
+        def pages():
+            for page in [[{"name": f"repo{index}"}] for index in range(100)]:
+                fetched.append(page)
+                yield page
+
+        upload = Mock(side_effect=ValueError("Failed to send"))
+        with self.assertRaises(ValueError):
+            ReportPipeline(pages(), lambda repo: repo, upload, queue_size=1).run()
+        self.assertLess(len(fetched), 100)
+
+    def test_raises_fetch_error(self):
+        def pages():
+            yield [{"name": "repo1"}]
+            raise RuntimeError("Fetch failed")
+
+        with self.assertRaises(RuntimeError):
+            ReportPipeline(pages(), lambda repo: repo, Mock()).run()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import gzip
+import io
+import json
+import unittest
+from unittest.mock import patch
+
+import msgpack
+
+from cronjobs.services.report_wire_format import (JSON_CONTENT_TYPE,
+                                                  MSGPACK_CONTENT_TYPE,
+                                                  REPORTS_SCHEMA_VERSION,
+                                                  BodyTooLargeError,
+                                                  compress_body,
+                                                  decode_reports,
+                                                  decode_tombstones,
+                                                  decompress_body,
+                                                  encode_legacy_reports,
+                                                  encode_reports,
+                                                  report_content_hash)
+
+
+class TestReportWireFormat(unittest.TestCase):
+
+    def setUp(self):
+        self.reports = [
+            {"name": "repo1", "status": True, "report": {"has_license": True}},
+            {"name": "repo2", "status": False, "report": {"has_license": False}},
+        ]
+
+    def test_encodes_compact_json_with_schema_version(self):
+        body = encode_reports(self.reports, JSON_CONTENT_TYPE)
+
+        self.assertNotIn(b" ", body)
+        self.assertEqual(json.loads(body), {"schema_version": REPORTS_SCHEMA_VERSION, "reports": self.reports})
+
+    def test_round_trip(self):
+        body = encode_reports(self.reports, JSON_CONTENT_TYPE)
+
+        self.assertEqual(decode_reports(body, JSON_CONTENT_TYPE), self.reports)
+
+    def test_decodes_list_of_json_strings(self):
+        body = json.dumps([json.dumps(report, indent=4) for report in self.reports]).encode()
+
+        self.assertEqual(decode_reports(body, JSON_CONTENT_TYPE), self.reports)
+
+    def test_encodes_legacy_list_of_json_strings(self):
+        body = encode_legacy_reports(self.reports)
+
+        self.assertEqual([json.loads(report) for report in json.loads(body)], self.reports)
+        self.assertEqual(decode_reports(body, JSON_CONTENT_TYPE), self.reports)
+
+    def test_rejects_other_schema_version(self):
+        body = json.dumps({"schema_version": REPORTS_SCHEMA_VERSION + 1, "reports": self.reports}).encode()
+
+        self.assertRaises(ValueError, decode_reports, body, JSON_CONTENT_TYPE)
+
+    def test_rejects_body_without_reports(self):
+        for payload in ({"schema_version": REPORTS_SCHEMA_VERSION}, [1, 2], "repo1"):
+            self.assertRaises(ValueError, decode_reports, json.dumps(payload).encode(), JSON_CONTENT_TYPE)
+
+    def test_rejects_unsupported_content_type(self):
+        self.assertRaises(ValueError, encode_reports, self.reports, "text/plain")
+        self.assertRaises(ValueError, decode_reports, b"", "text/plain")
+
+    def test_msgpack_round_trip(self):
+        body = encode_reports(self.reports, MSGPACK_CONTENT_TYPE)
+
+        self.assertEqual(msgpack.unpackb(body), {"schema_version": REPORTS_SCHEMA_VERSION, "reports": self.reports})
+        self.assertEqual(decode_reports(body, MSGPACK_CONTENT_TYPE), self.reports)
+
+
+class TestReportContentHash(unittest.TestCase):
+
+    def test_hash_ignores_key_order(self):
+        self.assertEqual(
+            report_content_hash({"name": "repo1", "report": {"a": True, "b": False}}),
+            report_content_hash({"report": {"b": False, "a": True}, "name": "repo1"}))
+
+    def test_hash_survives_the_wire(self):
+        report = {"name": "repo1", "failed_rules": 3, "topics": ["a"], "status": False}
+        received = decode_reports(encode_reports([report], JSON_CONTENT_TYPE), JSON_CONTENT_TYPE)[0]
+
+        self.assertEqual(report_content_hash(received), report_content_hash(report))
+
+    def test_hash_changes_with_content(self):
+        self.assertNotEqual(report_content_hash({"name": "repo1", "status": True}),
+                            report_content_hash({"name": "repo1", "status": False}))
+
+
+class TestDecodeTombstones(unittest.TestCase):
+
+    def test_decodes_names(self):
+        body = json.dumps({"schema_version": REPORTS_SCHEMA_VERSION, "names": ["repo1", "repo2"]}).encode()
+
+        self.assertEqual(decode_tombstones(body), ["repo1", "repo2"])
+
+    def test_rejects_invalid_tombstones(self):
+        for payload in (["repo1"], {"schema_version": 99, "names": []},
+                        {"schema_version": REPORTS_SCHEMA_VERSION, "names": [1]}):
+            self.assertRaises(ValueError, decode_tombstones, json.dumps(payload).encode())
+
+
+class TestCompressedBody(unittest.TestCase):
+
+    def setUp(self):
+        self.body = json.dumps([{"name": f"repo{index}", "status": True} for index in range(1000)]).encode()
+
+    def test_round_trip(self):
+        compressed = compress_body(self.body)
+
+        self.assertLess(len(compressed), len(self.body) / 10)
+        self.assertEqual(decompress_body(io.BytesIO(compressed), len(self.body)), self.body)
+
+    def test_compression_is_deterministic(self):
+        self.assertEqual(compress_body(self.body), compress_body(self.body))
+
+    @patch("cronjobs.services.report_wire_format.DECOMPRESS_READ_BYTES", 16)
+    def test_decompresses_in_pieces(self):
+        self.assertEqual(decompress_body(io.BytesIO(compress_body(self.body)), len(self.body)), self.body)
+
+    def test_rejects_body_larger_than_limit_once_decompressed(self):
+        bomb = gzip.compress(b"\0" * 10_000_000)
+
+        with self.assertRaises(BodyTooLargeError):
+            decompress_body(io.BytesIO(bomb), 1024)
+
+    def test_rejects_invalid_gzip(self):
+        self.assertRaises(ValueError, decompress_body, io.BytesIO(b"not gzip"), 1024)
+
+    def test_rejects_truncated_gzip(self):
+        compressed = compress_body(self.body)
+
+        self.assertRaises(ValueError, decompress_body, io.BytesIO(compressed[:-10]), len(self.body))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 
 from report_app.main.repository_report import RepositoryReport
 
@@ -8,7 +8,7 @@ class TestRepositoryReport(unittest.TestCase):
 
     @patch('report_app.main.repository_report.ReportDatabase')
     def setUp(self, MockReportDatabase):
-        self.mock_data = ["{\"name\": \"repo1\", \"data\": {\"status\": true}}", "{\"name\": \"repo2\", \"data\": {\"status\": false}}"]
+        self.mock_data = [{"name": "repo1", "data": {"status": True}}, {"name": "repo2", "data": {"status": False}}]
         self.report = RepositoryReport(report_data=self.mock_data)
         self.mock_db_instance = MockReportDatabase.return_value
 
@@ -24,38 +24,34 @@ class TestRepositoryReport(unittest.TestCase):
         self.assertEqual(report.database_client, mock_db_instance)
 
     def test_update_all_github_reports_success(self):
-        self.report._add_report_to_db = Mock()
+        self.mock_db_instance.add_repository_reports.return_value = [0.1]
 
         self.report.update_all_github_reports()
 
-        self.assertEqual(self.report._add_report_to_db.call_count, len(self.mock_data))
+        self.mock_db_instance.add_repository_reports.assert_called_once_with({
+            "repo1": {"name": "repo1", "data": {"status": True}},
+            "repo2": {"name": "repo2", "data": {"status": False}},
+        }, None, None)
 
     @patch('report_app.main.repository_report.logger')
-    def test_update_all_github_reports_failure(self, mock_logger):
-        self.report._report_data = ["not a valid json"]
+    def test_update_all_github_reports_skips_report_without_name(self, mock_logger):
+        self.mock_db_instance.add_repository_reports.return_value = [0.1]
+        self.report._report_data = [{"data": {"status": True}}, {"name": "repo1"}]
 
         self.report.update_all_github_reports()
 
         mock_logger.error.assert_called_once()
+        self.mock_db_instance.add_repository_reports.assert_called_once_with({"repo1": {"name": "repo1"}}, None, None)
 
-    @patch('report_app.main.repository_report.ReportDatabase')
-    def test_add_report_to_db_success(self, MockReportDatabase):
-        mock_report = {"name": "repo1", "data": {"status": True}}
-        report = RepositoryReport(report_data=[])
-
-        report._add_report_to_db(mock_report)
-
-        MockReportDatabase.return_value.add_repository_report.assert_called_once_with("repo1", mock_report)
-
-    @patch('report_app.main.repository_report.ReportDatabase')
-    def test_add_report_to_db_failure(self, MockReportDatabase):
-        mock_report = {"name": "repo1", "data": {"status": True}}
-        MockReportDatabase.return_value.add_repository_report.side_effect = Exception("Database error")
-        report = RepositoryReport(report_data=[])
+    @patch('report_app.main.repository_report.logger')
+    def test_update_all_github_reports_failure(self, mock_logger):
+        self.mock_db_instance.add_repository_reports.side_effect = Exception("Database error")
 
         with self.assertRaises(Exception) as context:
-            report._add_report_to_db(mock_report)
+            self.report.update_all_github_reports()
+
         self.assertEqual(str(context.exception), "Database error")
+        mock_logger.error.assert_called_once()
 
 
 if __name__ == '__main__':
@@ -1,7 +1,15 @@
 import json
 import unittest
 
-from cronjobs.services.standards_service import RepositoryReport
+from unittest.mock import patch
+
+from cronjobs.services.standards_service import (COMPLIANCE_RULES,
+                                                 FAILED_RULE_BITS,
+                                                 FAILED_RULE_BITS_VERSION,
+                                                 BranchProtectionSummary,
+                                                 RepositoryReport,
+                                                 compliance_rule,
+                                                 evaluate_repositories)
 
 # pylint: disable=R0801
 
@@ -61,8 +69,12 @@ class TestCompliantRepositoryReport(unittest.TestCase):
     def test_report_output(self):
         self.assertEqual(self.to_json['status'], True)
 
+    def test_no_failed_rules(self):
+        self.assertEqual(self.to_json['failed_rules'], 0)
+        self.assertEqual(self.to_json['failed_rules_version'], FAILED_RULE_BITS_VERSION)
+
     def test_report_output_keys(self):
-        self.assertEqual(len(self.to_json.keys()), 9)
+        self.assertEqual(len(self.to_json.keys()), 11)
 
     def test_compliance_report(self):
         self.assertEqual(self.to_json['report']
@@ -114,8 +126,16 @@ class TestNonCompliantRepositoryReport(unittest.TestCase):
     def test_bad_data_report_output(self):
         self.assertEqual(self.to_json['status'], False)
 
+    def test_every_failed_rule_is_in_bitmask(self):
+        self.assertEqual(len(self.to_json['infractions']), 1)
+        self.assertEqual(
+            self.to_json['failed_rules'],
+            sum(FAILED_RULE_BITS[rule] for rule, result in self.to_json['report'].items() if result is False))
+        self.assertTrue(self.to_json['failed_rules'] & FAILED_RULE_BITS['has_license'])
+        self.assertFalse(self.to_json['failed_rules'] & FAILED_RULE_BITS['has_description'])
+
     def test_bad_data_report_output_keys(self):
-        self.assertEqual(len(self.to_json.keys()), 9)
+        self.assertEqual(len(self.to_json.keys()), 11)
 
     def test_bad_data_compliance_report(self):
         self.assertEqual(self.to_json['report']
@@ -197,5 +217,130 @@ class TestNonCompliantRepositoryReport(unittest.TestCase):
         self.assertEqual(to_json['report']['default_branch_main'], False)
 
 
+class TestComplianceRules(unittest.TestCase):
+    @staticmethod
+    def __rule(pattern="main", is_admin_enforced=True, requires_approving_reviews=True, approving_review_count=1):
+        return {
+            "node": {
+                "pattern": pattern,
+                "isAdminEnforced": is_admin_enforced,
+                "requiresApprovingReviews": requires_approving_reviews,
+                "requiredApprovingReviewCount": approving_review_count,
+            }
+        }
+
+    def test_summary_uses_last_rule_until_a_setting_is_missing(self):
+        summary = BranchProtectionSummary.from_repository({
+            "defaultBranchRef": {"name": "main"},
+            "branchProtectionRules": {"edges": [
+                self.__rule(pattern="release", is_admin_enforced=True, approving_review_count=0),
+                self.__rule(pattern="main", is_admin_enforced=None, requires_approving_reviews=False,
+                            approving_review_count=2),
+                self.__rule(pattern="other", is_admin_enforced=False, requires_approving_reviews=True),
+            ]},
+        })
+        self.assertTrue(summary.protects_default_branch)
+        self.assertTrue(summary.admin_enforced)
+        self.assertTrue(summary.requires_approving_reviews)
+        self.assertTrue(summary.requires_approval_count)
+
+    def test_summary_without_branch_protection_rules(self):
+        summary = BranchProtectionSummary.from_repository(
+            {"defaultBranchRef": {"name": "main"}, "branchProtectionRules": None})
+        self.assertEqual(summary, BranchProtectionSummary())
+
+    def test_each_rule_is_evaluated_once(self):
+        with patch.dict(COMPLIANCE_RULES, clear=True), patch.dict(FAILED_RULE_BITS, {"test_rule": 1 << 8}):
+            calls = []
+            compliance_rule("test_rule")(lambda facts: calls.append(facts) or True)
+            report = json.loads(RepositoryReport({
+                "branchProtectionRules": {"edges": []},
+                "defaultBranchRef": None,
+                "isPrivate": False,
+                "name": "repo_name",
+                "pushedAt": "2022-01-01",
+                "url": "https://github.com",
+                "repositoryTopics": None,
+            }).output)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(report["report"], {"test_rule": True})
+        self.assertTrue(report["status"])
+
+    def test_registered_rule_is_reported(self):
+        with patch.dict(COMPLIANCE_RULES), patch.dict(FAILED_RULE_BITS, {"has_topics": 1 << 8}):
+            compliance_rule("has_topics")(lambda facts: bool(facts.data["repositoryTopics"]["edges"]))
+            report = json.loads(RepositoryReport({
+                "branchProtectionRules": {"edges": []},
+                "defaultBranchRef": {"name": "main"},
+                "description": None,
+                "hasIssuesEnabled": True,
+                "isPrivate": False,
+                "licenseInfo": None,
+                "name": "repo_name",
+                "pushedAt": "2022-01-01",
+                "url": "https://github.com",
+                "repositoryTopics": {"edges": []},
+            }).output)
+        self.assertFalse(report["report"]["has_topics"])
+        self.assertNotIn("has_topics", COMPLIANCE_RULES)
+
+    def test_rule_without_bit_is_rejected(self):
+        self.assertRaises(ValueError, compliance_rule("has_topics"), lambda facts: True)
+
+    def test_duplicate_rule_names_are_rejected(self):
+        self.assertRaises(ValueError, compliance_rule("has_license"), lambda facts: True)
+
+
+class TestEvaluateRepositories(unittest.TestCase):
+    @staticmethod
+    def __repository(name, license_info=None, description="description"):
+        return {
+            "branchProtectionRules": {"edges": []},
+            "defaultBranchRef": {"name": "main"},
+            "description": description,
+            "hasIssuesEnabled": True,
+            "isPrivate": False,
+            "licenseInfo": license_info,
+            "name": name,
+            "pushedAt": "2022-01-01",
+            "url": "https://github.com",
+            "repositoryTopics": {"edges": []},
+        }
+
+    def setUp(self):
+        self.repositories = [
+            self.__repository("repo1", license_info={"name": "MIT"}),
+            self.__repository("repo2"),
+            self.__repository("repo3", description=None),
+        ]
+        self.batch = evaluate_repositories(self.repositories)
+
+    def test_one_column_per_rule(self):
+        self.assertEqual(list(self.batch.columns), list(COMPLIANCE_RULES))
+        self.assertEqual(self.batch.columns["has_license"], [True, False, False])
+        self.assertEqual(self.batch.columns["has_description"], [True, True, False])
+
+    def test_failure_counts(self):
+        self.assertEqual(self.batch.failure_counts["has_license"], 2)
+        self.assertEqual(self.batch.failure_counts["has_description"], 1)
+        self.assertEqual(self.batch.failure_counts["default_branch_main"], 0)
+
+    def test_report_data_matches_per_repository_evaluation(self):
+        self.assertEqual(
+            self.batch.report_data(),
+            [RepositoryReport(repository).data for repository in self.repositories],
+        )
+
+    def test_compliant(self):
+        self.assertEqual(self.batch.compliant, [False, False, False])
+        with patch.dict(COMPLIANCE_RULES, clear=True):
+            self.assertEqual(evaluate_repositories(self.repositories).compliant, [True, True, True])
+
+    def test_empty_organisation(self):
+        batch = evaluate_repositories([])
+        self.assertEqual(batch.report_data(), [])
+        self.assertEqual(set(batch.failure_counts.values()), {0})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,3 +1,6 @@
+import hashlib
+import hmac
+import json
 import os
 import unittest
 from unittest.mock import MagicMock, patch
@@ -5,6 +8,9 @@ from unittest.mock import MagicMock, patch
 from flask import current_app
 
 import report_app
+from cronjobs.services.report_wire_format import (JSON_CONTENT_TYPE,
+                                                  compress_body,
+                                                  encode_reports)
 from report_app.main.views import (_is_request_correct,
                                    display_badge_if_compliant,
                                    search_public_repositories)
@@ -71,6 +77,7 @@ class TestStandardsReportsViews(unittest.TestCase):
         self.client = app.test_client()
         self.index = "/index"
         self.update_endpoint = "/api/v2/update-github-reports"
+        self.generation = "20261018T120000000000Z-1a2b3c4d"
         self.public_landing_endpoint = "/public-github-repositories.html"
         self.private_landing_page = "/private-github-repositories.html"
 
@@ -139,22 +146,255 @@ class TestStandardsReportsViews(unittest.TestCase):
         self.assertEqual(result, expected_result)
 
     @patch('report_app.main.views._is_request_correct', return_value=True)
-    @patch('report_app.main.views.RepositoryReport')
-    def test_update_github_reports(self, mock_repository_report, mock_is_request_correct):
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_update_github_reports(self, mock_ingestion_jobs, mock_is_request_correct):
         request = MagicMock()
         request.method = "POST"
         request.headers = {"X-API-KEY": "correct_api_key"}
-        request.json = {"key": "value"}
+        request.json = [json.dumps({"name": "repo1"}, indent=4)]
 
         mock_is_request_correct.return_value = True
-        mock_repository_report.return_value = MagicMock()
+        mock_ingestion_jobs.return_value.submit.return_value = "job-id"
 
         response = self.client.post(self.update_endpoint, json=request.json, headers=request.headers)
 
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json, {
+            "message": "GitHub reports queued", "job_id": "job-id", "reports": 1, "status_url": "/api/v2/jobs/job-id"})
+
+        mock_ingestion_jobs.return_value.submit.assert_called_once_with([{"name": "repo1"}], None)
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_update_github_reports_compact_format(self, mock_ingestion_jobs, _mock_is_request_correct):
+        mock_ingestion_jobs.return_value.submit.return_value = "job-id"
+        body = encode_reports([{"name": "repo1"}, {"name": "repo2"}], JSON_CONTENT_TYPE)
+
+        response = self.client.post(self.update_endpoint, data=body, content_type=JSON_CONTENT_TYPE)
+
+        self.assertEqual(response.status_code, 202)
+        mock_ingestion_jobs.return_value.submit.assert_called_once_with([{"name": "repo1"}, {"name": "repo2"}], None)
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_update_github_reports_gzip(self, mock_ingestion_jobs, _mock_is_request_correct):
+        mock_ingestion_jobs.return_value.submit.return_value = "job-id"
+        body = compress_body(encode_reports([{"name": "repo1"}], JSON_CONTENT_TYPE))
+
+        response = self.client.post(self.update_endpoint, data=body, content_type=JSON_CONTENT_TYPE,
+                                    headers={"Content-Encoding": "gzip"})
+
+        self.assertEqual(response.status_code, 202)
+        mock_ingestion_jobs.return_value.submit.assert_called_once_with([{"name": "repo1"}], None)
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_update_github_reports_gzip_too_large(self, mock_ingestion_jobs, _mock_is_request_correct):
+        body = compress_body(encode_reports([{"name": "repo" * 1000}], JSON_CONTENT_TYPE))
+
+        with patch.dict(report_app.app.config, {"MAX_REPORTS_BODY_BYTES": 1024}):
+            response = self.client.post(self.update_endpoint, data=body, content_type=JSON_CONTENT_TYPE,
+                                        headers={"Content-Encoding": "gzip"})
+
+        self.assertEqual(response.status_code, 413)
+        mock_ingestion_jobs.return_value.submit.assert_not_called()
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_update_github_reports_uncompressed_too_large(self, mock_ingestion_jobs, _mock_is_request_correct):
+        body = encode_reports([{"name": "repo" * 1000}], JSON_CONTENT_TYPE)
+
+        with patch.dict(report_app.app.config, {"MAX_REPORTS_BODY_BYTES": 1024}):
+            response = self.client.post(self.update_endpoint, data=body, content_type=JSON_CONTENT_TYPE)
+
+        self.assertEqual(response.status_code, 413)
+        mock_ingestion_jobs.return_value.submit.assert_not_called()
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_update_github_reports_unsupported_content_encoding(self, mock_ingestion_jobs, _mock_is_request_correct):
+        response = self.client.post(self.update_endpoint, data=b"{}", content_type=JSON_CONTENT_TYPE,
+                                    headers={"Content-Encoding": "br"})
+
+        self.assertEqual(response.status_code, 415)
+        mock_ingestion_jobs.return_value.submit.assert_not_called()
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_update_github_reports_unsupported_schema_version(self, mock_ingestion_jobs, _mock_is_request_correct):
+        body = json.dumps({"schema_version": 99, "reports": []})
+
+        response = self.client.post(self.update_endpoint, data=body, content_type=JSON_CONTENT_TYPE)
+
+        self.assertEqual(response.status_code, 400)
+        mock_ingestion_jobs.return_value.submit.assert_not_called()
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_update_github_reports_unsupported_content_type(self, mock_ingestion_jobs, _mock_is_request_correct):
+        response = self.client.post(self.update_endpoint, data=b"name=repo1", content_type="text/plain")
+
+        self.assertEqual(response.status_code, 415)
+        mock_ingestion_jobs.return_value.submit.assert_not_called()
+
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_ingestion_job(self, mock_ingestion_jobs):
+        mock_ingestion_jobs.return_value.status.return_value = {"id": "job-id", "status": "succeeded"}
+
+        with patch.dict('os.environ', {'API_KEY': 'correct_api_key'}):
+            response = self.client.get("/api/v2/jobs/job-id", headers={"X-API-KEY": "correct_api_key"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"id": "job-id", "status": "succeeded"})
+        mock_ingestion_jobs.return_value.status.assert_called_once_with("job-id")
+
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_unknown_ingestion_job(self, mock_ingestion_jobs):
+        mock_ingestion_jobs.return_value.status.return_value = None
+
+        with patch.dict('os.environ', {'API_KEY': 'correct_api_key'}):
+            response = self.client.get("/api/v2/jobs/unknown", headers={"X-API-KEY": "correct_api_key"})
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_ingestion_job_incorrect_api_key(self, mock_ingestion_jobs):
+        with patch.dict('os.environ', {'API_KEY': 'correct_api_key'}):
+            response = self.client.get("/api/v2/jobs/job-id", headers={"X-API-KEY": "incorrect"})
+
+        self.assertEqual(response.status_code, 400)
+        mock_ingestion_jobs.assert_not_called()
+
+    def test_report_upload_formats(self):
+        with patch.dict('os.environ', {'API_KEY': 'correct_api_key'}):
+            response = self.client.get("/api/v2/report-upload-formats", headers={"X-API-KEY": "correct_api_key"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {
+            "schema_version": 1,
+            "content_types": ["application/json", "application/msgpack"],
+            "content_encodings": ["gzip"],
+        })
+
+    def test_report_upload_formats_incorrect_api_key(self):
+        with patch.dict('os.environ', {'API_KEY': 'correct_api_key'}):
+            response = self.client.get("/api/v2/report-upload-formats", headers={"X-API-KEY": "incorrect"})
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch('report_app.main.views.ReportDatabase')
+    def test_github_reports_manifest(self, mock_report_database):
+        mock_report_database.return_value.get_repository_report_hashes.return_value = {"repo1": "hash1"}
+
+        with patch.dict('os.environ', {'API_KEY': 'correct_api_key'}):
+            response = self.client.get("/api/v2/github-reports-manifest", headers={"X-API-KEY": "correct_api_key"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {"schema_version": 1, "hashes": {"repo1": "hash1"}})
+
+    @patch('report_app.main.views.ReportDatabase')
+    def test_github_reports_manifest_incorrect_api_key(self, mock_report_database):
+        with patch.dict('os.environ', {'API_KEY': 'correct_api_key'}):
+            response = self.client.get("/api/v2/github-reports-manifest", headers={"X-API-KEY": "incorrect"})
+
+        self.assertEqual(response.status_code, 400)
+        mock_report_database.assert_not_called()
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views.ReportDatabase')
+    def test_delete_github_reports(self, mock_report_database, _mock_is_request_correct):
+        response = self.client.post("/api/v2/delete-github-reports",
+                                    json={"schema_version": 1, "names": ["repo1", "repo2"]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["deleted"], 2)
+        mock_report_database.return_value.delete_repository_reports.assert_called_once_with(["repo1", "repo2"])
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views.ReportDatabase')
+    def test_delete_github_reports_invalid_body(self, mock_report_database, _mock_is_request_correct):
+        response = self.client.post("/api/v2/delete-github-reports", json=["repo1"])
+
+        self.assertEqual(response.status_code, 400)
+        mock_report_database.assert_not_called()
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_update_github_reports_to_generation(self, mock_ingestion_jobs, _mock_is_request_correct):
+        mock_ingestion_jobs.return_value.submit.return_value = "job-id"
+        body = encode_reports([{"name": "repo1"}], JSON_CONTENT_TYPE)
+
+        response = self.client.post(self.update_endpoint, data=body, content_type=JSON_CONTENT_TYPE,
+                                    headers={"X-Report-Generation": self.generation})
+
+        self.assertEqual(response.status_code, 202)
+        mock_ingestion_jobs.return_value.submit.assert_called_once_with([{"name": "repo1"}], self.generation)
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views._get_ingestion_jobs')
+    def test_update_github_reports_invalid_generation(self, mock_ingestion_jobs, _mock_is_request_correct):
+        body = encode_reports([{"name": "repo1"}], JSON_CONTENT_TYPE)
+
+        response = self.client.post(self.update_endpoint, data=body, content_type=JSON_CONTENT_TYPE,
+                                    headers={"X-Report-Generation": "../latest"})
+
+        self.assertEqual(response.status_code, 400)
+        mock_ingestion_jobs.return_value.submit.assert_not_called()
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views.ReportDatabase')
+    def test_create_generation(self, mock_report_database, _mock_is_request_correct):
+        mock_report_database.create_generation.return_value = self.generation
+
+        response = self.client.post("/api/v2/generations")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json, {"generation": self.generation})
+
+    @patch('report_app.main.views.Thread')
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views.ReportDatabase')
+    def test_publish_generation(self, mock_report_database, _mock_is_request_correct, mock_thread):
+        response = self.client.post(f"/api/v2/generations/{self.generation}/publish")
+
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json, {"message": "GitHub reports updated"})
+        mock_report_database.return_value.publish_generation.assert_called_once_with(self.generation)
+        mock_thread.return_value.start.assert_called_once()
+
+    @patch('report_app.main.views.Thread')
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views.ReportDatabase')
+    def test_publish_superseded_generation(self, mock_report_database, _mock_is_request_correct, mock_thread):
+        mock_report_database.return_value.publish_generation.side_effect = ValueError("Not newer")
+
+        response = self.client.post(f"/api/v2/generations/{self.generation}/publish")
+
+        self.assertEqual(response.status_code, 409)
+        mock_thread.assert_not_called()
+
+    @patch('report_app.main.views._is_request_correct', return_value=True)
+    @patch('report_app.main.views.ReportDatabase')
+    def test_publish_invalid_generation(self, mock_report_database, _mock_is_request_correct):
+        response = self.client.post("/api/v2/generations/latest/publish")
+
+        self.assertEqual(response.status_code, 400)
+        mock_report_database.assert_not_called()
+
+    @patch('report_app.main.views.render_template')
+    @patch('report_app.main.views.ReportDatabase')
+    def test_index_counts_every_failed_rule(self, mock_report_database, mock_render_template):
+        self.test_public_repository["data"]["report"] = {
+            'requires_approving_reviews': False, 'has_license': False}
+        self.test_private_repository["data"]["report"] = {'has_license': False}
+        mock_report_database.return_value.get_all_repository_reports.return_value = [
+            self.test_public_repository, self.test_private_repository]
+        mock_render_template.return_value = ""
 
-        mock_repository_report.return_value.update_all_github_reports.assert_called_once_with()
+        self.client.get(self.index)
+
+        self.assertEqual(
+            mock_render_template.call_args.kwargs["common_infractions"],
+            [("Repository has no license", 2), ("Requires approving reviews is not enabled", 1)])
 
     @patch('report_app.main.views.ReportDatabase')
     def test_display_badge_if_noncompliant(self, mock_report_database):
@@ -265,5 +505,77 @@ class TestStandardsReportsViews(unittest.TestCase):
         mock_report_database.assert_called_once_with(os.getenv("DYNAMODB_TABLE_NAME"))
         mock_report_database.return_value.get_all_public_repositories.assert_called_once_with()
 
+
+class TestGithubWebhookView(unittest.TestCase):
+
+    def setUp(self):
+        app = report_app.app
+        app.config["TESTING"] = True
+        self.ctx = app.app_context()
+        self.ctx.push()
+        self.client = app.test_client()
+        self.endpoint = "/api/v2/github-webhook"
+        self.body = json.dumps({"action": "edited", "repository": {"full_name": "ministryofjustice/test-repository"}}).encode()
+
+    def __headers(self, event, secret="test_secret"):
+        signature = "sha256=" + hmac.new(secret.encode(), self.body, hashlib.sha256).hexdigest()
+        return {"X-GitHub-Event": event, "X-Hub-Signature-256": signature, "Content-Type": "application/json"}
+
+    @patch.dict('os.environ', {'GITHUB_WEBHOOK_SECRET': 'test_secret'})
+    @patch('report_app.main.views._get_repository_event_queue')
+    def test_queues_repository_from_signed_event(self, mock_get_queue):
+        response = self.client.post(self.endpoint, data=self.body, headers=self.__headers("branch_protection_rule"))
+
+        self.assertEqual(response.status_code, 202)
+        mock_get_queue.return_value.put.assert_called_once_with("ministryofjustice/test-repository")
+
+    @patch.dict('os.environ', {'GITHUB_WEBHOOK_SECRET': 'test_secret'})
+    @patch('report_app.main.views.ReportDatabase')
+    @patch('report_app.main.views._get_repository_event_queue')
+    def test_deletes_report_of_archived_repository(self, mock_get_queue, mock_report_database):
+        self.body = json.dumps({
+            "action": "archived",
+            "repository": {"name": "test-repository", "full_name": "ministryofjustice/test-repository"},
+        }).encode()
+
+        response = self.client.post(self.endpoint, data=self.body, headers=self.__headers("repository"))
+
+        self.assertEqual(response.status_code, 200)
+        mock_report_database.return_value.delete_repository_reports.assert_called_once_with(["test-repository"])
+        mock_get_queue.return_value.put.assert_not_called()
+
+    @patch.dict('os.environ', {'GITHUB_WEBHOOK_SECRET': 'test_secret'})
+    @patch('report_app.main.views.ReportDatabase')
+    @patch('report_app.main.views._get_repository_event_queue')
+    def test_replaces_report_of_renamed_repository(self, mock_get_queue, mock_report_database):
+        self.body = json.dumps({
+            "action": "renamed",
+            "changes": {"repository": {"name": {"from": "old-repository"}}},
+            "repository": {"name": "test-repository", "full_name": "ministryofjustice/test-repository"},
+        }).encode()
+
+        response = self.client.post(self.endpoint, data=self.body, headers=self.__headers("repository"))
+
+        self.assertEqual(response.status_code, 202)
+        mock_report_database.return_value.delete_repository_reports.assert_called_once_with(["old-repository"])
+        mock_get_queue.return_value.put.assert_called_once_with("ministryofjustice/test-repository")
+
+    @patch.dict('os.environ', {'GITHUB_WEBHOOK_SECRET': 'test_secret'})
+    @patch('report_app.main.views._get_repository_event_queue')
+    def test_rejects_event_with_invalid_signature(self, mock_get_queue):
+        response = self.client.post(self.endpoint, data=self.body, headers=self.__headers("push", secret="wrong_secret"))
+
+        self.assertEqual(response.status_code, 403)
+        mock_get_queue.return_value.put.assert_not_called()
+
+    @patch.dict('os.environ', {'GITHUB_WEBHOOK_SECRET': 'test_secret'})
+    @patch('report_app.main.views._get_repository_event_queue')
+    def test_ignores_unrelated_event(self, mock_get_queue):
+        response = self.client.post(self.endpoint, data=self.body, headers=self.__headers("issues"))
+
+        self.assertEqual(response.status_code, 200)
+        mock_get_queue.return_value.put.assert_not_called()
+
+
 if __name__ == "__main__":
     unittest.main()